@@ -0,0 +1,311 @@
+"""
+Compactação de arquivos de questões: junta qualquer número de arquivos por execução
+em um único arquivo deduplicado e ordenado por ID.
+
+- Para cada ID vence a versão com `extracted_at` mais recente
+  (em empate, vence a que aparece no arquivo informado por último).
+- Ordenação externa (runs ordenados em disco + merge em k vias), com memória
+  limitada a `--chunk-size` questões, independente do tamanho total.
+- Gera também um índice (<arquivo>.idx: id, offset, tamanho) e estatísticas
+  (<arquivo>.stats.json: novas, atualizadas, inalteradas) em relação a um
+  arquivo base opcional.
+- Com `--zdict DIR`, cada questão é gravada comprimida com o dicionário treinado
+  (record_codec.py; treinado com uma amostra das entradas se DIR estiver vazio),
+  mantendo o acesso aleatório pelo índice.
+
+Uso:
+    python archive_compact.py output/*.jsonl -o arquivo.jsonl
+    python archive_compact.py output/novos_*.jsonl --base arquivo.jsonl -o arquivo_novo.jsonl
+    python archive_compact.py output/*.jsonl -o arquivo.zrec --zdict zdict/
+"""
+import argparse
+import heapq
+import json
+import os
+import shutil
+import tempfile
+import time
+from bisect import bisect_left
+
+from record_codec import DEFAULT_SAMPLE, DictionaryStore, load_codec, train_dictionary
+from records_io import dumps_record, expand_paths, iter_file_records, iter_records
+
+DEFAULT_CHUNK_SIZE = 100_000
+DEFAULT_FAN_IN = 64
+
+# Origem do registro dentro do merge
+SOURCE_BASE = 0
+SOURCE_NEW = 1
+
+
+def id_sort_key(question_id):
+    """Chave de ordenação do ID: numéricos em ordem numérica, depois os demais em ordem textual."""
+    text = str(question_id)
+    if text.isdigit():
+        return (0, int(text), text)
+    return (1, 0, text)
+
+
+def content_fingerprint(record):
+    """JSON canônico da questão sem `extracted_at` (para detectar se o conteúdo mudou)."""
+    stripped = {k: v for k, v in record.items() if k != 'extracted_at'}
+    return json.dumps(stripped, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+
+
+# ============================================================================
+# RUNS ORDENADOS
+# ============================================================================
+# Cada linha de um run: <source>\t<seq>\t<extracted_at>\t<id>\t<json>
+# `seq` é a ordem global de leitura, usada para desempate.
+
+def _run_line(source, seq, record):
+    return f"{source}\t{seq}\t{record.get('extracted_at') or ''}\t{record['id']}\t{dumps_record(record)}\n"
+
+
+def _parse_run_line(line):
+    source, seq, extracted_at, question_id, payload = line.rstrip('\n').split('\t', 4)
+    return (id_sort_key(question_id), extracted_at, int(seq)), int(source), payload
+
+
+def _iter_run(path):
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            yield _parse_run_line(line)
+
+
+def _write_run(entries, tmp_dir, run_index):
+    entries.sort(key=lambda e: e[0])
+    path = os.path.join(tmp_dir, f"run_{run_index:06d}.tsv")
+    with open(path, 'w', encoding='utf-8') as f:
+        for _, line in entries:
+            f.write(line)
+    return path
+
+
+def build_runs(sources, tmp_dir, chunk_size):
+    """Lê todas as entradas e grava runs ordenados de até `chunk_size` questões."""
+    runs = []
+    entries = []
+    seq = 0
+    total = 0
+    skipped = 0
+
+    for source, path in sources:
+        for record in iter_file_records(path):
+            if not isinstance(record, dict) or not record.get('id'):
+                skipped += 1
+                continue
+            record['id'] = str(record['id'])
+            key = (id_sort_key(record['id']), record.get('extracted_at') or '', seq)
+            entries.append((key, _run_line(source, seq, record)))
+            seq += 1
+            total += 1
+
+            if len(entries) >= chunk_size:
+                runs.append(_write_run(entries, tmp_dir, len(runs)))
+                entries = []
+
+    if entries:
+        runs.append(_write_run(entries, tmp_dir, len(runs)))
+
+    return runs, total, skipped
+
+
+def merge_runs(runs, tmp_dir, fan_in):
+    """Reduz o número de runs com merges intermediários até caber em um único merge."""
+    generation = 0
+    while len(runs) > fan_in:
+        merged = []
+        for i in range(0, len(runs), fan_in):
+            group = runs[i:i + fan_in]
+            path = os.path.join(tmp_dir, f"merge_{generation:03d}_{i // fan_in:06d}.tsv")
+            with open(path, 'w', encoding='utf-8') as out:
+                for key, source, payload in heapq.merge(*(_iter_run(r) for r in group), key=lambda e: e[0]):
+                    out.write(f"{source}\t{key[2]}\t{key[1]}\t{key[0][2]}\t{payload}\n")
+            for r in group:
+                os.remove(r)
+            merged.append(path)
+        runs = merged
+        generation += 1
+    return runs
+
+
+# ============================================================================
+# ÍNDICE
+# ============================================================================
+
+class ArchiveIndex:
+    """Índice de um arquivo compactado, com busca binária por ID."""
+
+    def __init__(self, archive_path, codec=None):
+        self.archive_path = archive_path
+        self.codec = codec
+        self.keys = []
+        self.entries = []
+        with open(archive_path + '.idx', encoding='utf-8') as f:
+            for line in f:
+                question_id, offset, length = line.rstrip('\n').split('\t')
+                self.keys.append(id_sort_key(question_id))
+                self.entries.append((question_id, int(offset), int(length)))
+
+    def __len__(self):
+        return len(self.entries)
+
+    def locate(self, question_id):
+        """Retorna (offset, tamanho) da questão no arquivo, ou None."""
+        key = id_sort_key(question_id)
+        pos = bisect_left(self.keys, key)
+        if pos < len(self.keys) and self.keys[pos] == key:
+            _, offset, length = self.entries[pos]
+            return offset, length
+        return None
+
+    def get(self, question_id):
+        """Lê uma única questão do arquivo pelo ID (acesso aleatório)."""
+        location = self.locate(question_id)
+        if location is None:
+            return None
+        offset, length = location
+        with open(self.archive_path, 'rb') as f:
+            f.seek(offset)
+            return self._decode(f.read(length))
+
+    def records(self):
+        """Itera todas as questões na ordem do arquivo (leitura sequencial)."""
+        with open(self.archive_path, 'rb') as f:
+            for _, offset, length in self.entries:
+                f.seek(offset)
+                yield self._decode(f.read(length))
+
+    def _decode(self, data):
+        if data[:1] == b'{':
+            return json.loads(data.decode('utf-8'))
+        if not self.codec:
+            raise ValueError(f"{self.archive_path}: arquivo comprimido com dicionário - informe o codec")
+        return self.codec.decode(data)
+
+
+# ============================================================================
+# COMPACTAÇÃO
+# ============================================================================
+
+def compact(inputs, output, base=None, chunk_size=DEFAULT_CHUNK_SIZE, fan_in=DEFAULT_FAN_IN, tmp_dir=None,
+            codec=None):
+    """Compacta os arquivos de entrada (e o base, se houver) em `output`."""
+    started = time.time()
+    sources = []
+    if base:
+        sources.append((SOURCE_BASE, base))
+    sources.extend((SOURCE_NEW, path) for path in expand_paths(inputs))
+
+    work_dir = tempfile.mkdtemp(prefix='compact_', dir=tmp_dir)
+    stats = {'new': 0, 'updated': 0, 'unchanged': 0, 'total': 0, 'records_read': 0, 'invalid': 0}
+
+    try:
+        runs, stats['records_read'], stats['invalid'] = build_runs(sources, work_dir, chunk_size)
+        runs = merge_runs(runs, work_dir, fan_in)
+        stats['runs'] = len(runs)
+
+        tmp_output = output + '.tmp'
+        offset = 0
+        with open(tmp_output, 'wb') as out, open(output + '.idx.tmp', 'w', encoding='utf-8') as idx:
+            current_key = None
+            base_payload = None
+            winner = None
+
+            def flush():
+                nonlocal offset
+                if winner is None:
+                    return
+                source, payload = winner
+                if base_payload is None:
+                    stats['new'] += 1
+                elif source == SOURCE_BASE:
+                    stats['unchanged'] += 1
+                elif content_fingerprint(json.loads(payload)) == content_fingerprint(json.loads(base_payload)):
+                    stats['unchanged'] += 1
+                else:
+                    stats['updated'] += 1
+
+                if codec:
+                    encoded = codec.encode(json.loads(payload))
+                    out.write(encoded)
+                    idx.write(f"{current_key[2]}\t{offset}\t{len(encoded)}\n")
+                    offset += len(encoded)
+                else:
+                    encoded = payload.encode('utf-8')
+                    out.write(encoded + b'\n')
+                    idx.write(f"{current_key[2]}\t{offset}\t{len(encoded)}\n")
+                    offset += len(encoded) + 1
+                stats['total'] += 1
+
+            for key, source, payload in heapq.merge(*(_iter_run(r) for r in runs), key=lambda e: e[0]):
+                id_key = key[0]
+                if id_key != current_key:
+                    flush()
+                    current_key = id_key
+                    base_payload = None
+                    winner = None
+                if source == SOURCE_BASE:
+                    base_payload = payload
+                # Entradas chegam em ordem crescente de (extracted_at, seq): a última vence
+                winner = (source, payload)
+            flush()
+
+        os.replace(tmp_output, output)
+        os.replace(output + '.idx.tmp', output + '.idx')
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    if codec:
+        stats['zdict'] = {'dir': codec.store.directory, 'version': codec.version}
+    stats['bytes'] = offset
+    stats['elapsed_s'] = round(time.time() - started, 2)
+    with open(output + '.stats.json', 'w', encoding='utf-8') as f:
+        json.dump(stats, f, indent=2)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compacta arquivos de questões (dedup por ID, mais recente vence)")
+    parser.add_argument('inputs', nargs='+', help="Arquivos JSON/JSONL (aceita glob e diretórios)")
+    parser.add_argument('-o', '--output', required=True, help="Arquivo JSONL compactado de saída")
+    parser.add_argument('--base', help="Arquivo compactado anterior (para estatísticas novas/atualizadas)")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help="Questões por run em memória")
+    parser.add_argument('--fan-in', type=int, default=DEFAULT_FAN_IN, help="Máximo de runs abertos por merge")
+    parser.add_argument('--tmp-dir', help="Diretório para runs temporários")
+    parser.add_argument('--zdict', metavar='DIR', help="Comprime cada questão com o dicionário de DIR")
+    args = parser.parse_args()
+
+    codec = None
+    if args.zdict:
+        codec = load_codec(args.zdict)
+        if codec is None:
+            sample = []
+            for record in iter_records(args.inputs):
+                sample.append(record)
+                if len(sample) >= DEFAULT_SAMPLE:
+                    break
+            data, samples = train_dictionary(sample)
+            version = DictionaryStore(args.zdict).save(data, samples)
+            print(f"📖 Dicionário v{version} treinado com {samples} questões → {args.zdict}/")
+            codec = load_codec(args.zdict)
+
+    stats = compact(args.inputs, args.output, args.base, args.chunk_size, args.fan_in, args.tmp_dir, codec)
+
+    print("\n" + "="*70)
+    print("🗜️  COMPACTAÇÃO CONCLUÍDA")
+    print("="*70)
+    print(f"📥 Registros lidos: {stats['records_read']} (inválidos: {stats['invalid']})")
+    print(f"📚 Questões no arquivo: {stats['total']}")
+    print(f"🆕 Novas: {stats['new']}")
+    print(f"🔄 Atualizadas: {stats['updated']}")
+    print(f"⏸️  Inalteradas: {stats['unchanged']}")
+    print(f"💾 Tamanho: {stats['bytes'] / 1048576:.1f} MiB"
+          + (f" (dicionário v{stats['zdict']['version']})" if codec else ""))
+    print(f"⏱️  Tempo: {stats['elapsed_s']}s")
+    print("="*70)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,476 @@
+"""
+Reenvio em massa (backfill) de questões arquivadas para um destino.
+
+Para popular um banco novo ou reenviar o histórico após mudança de esquema sem
+rodar o scraper de novo: lê arquivos de questões (JSONL/JSON, .gz, arquivos
+compactados .zrec do archive_compact.py), aplica transformações opcionais e
+envia em lotes para um destino:
+
+- webhook   -> mesmo envelope/Idempotency-Key do scraper (NDJSON em streaming com --stream)
+- postgrest -> upsert em uma tabela via REST do Supabase/PostgREST (a transformação
+               deve produzir as colunas da tabela)
+- jsonl     -> arquivo local (conferência, carga por outra ferramenta)
+
+Controles: `--concurrency` lotes em voo, `--rate` questões/s (limite global),
+`--batch-size`, `--retries` com backoff exponencial (erros de rede, 408, 429 e
+5xx; demais 4xx e erros inesperados vão direto para `<estado>.failed.jsonl`).
+Uma questão em que a transformação levanta exceção também vai para lá, como falha.
+
+O cursor em `--state` guarda quantas questões da sequência de entrada já foram
+concluídas (todos os lotes anteriores confirmados ou registrados como falha);
+rodar de novo com o mesmo estado continua dali. Ao final imprime a
+reconciliação lidas / enviadas / confirmadas / falhas e sai com código 1 se
+alguma questão falhou (enviada sem confirmação ou rejeitada na transformação).
+
+Transformações: `--transform modulo:funcao` (questão -> questão, ou None para
+pular), aplicadas na ordem informada.
+
+Uso:
+    python backfill.py arquivo.jsonl --sink webhook --url https://.../webhook/x --rate 50
+    python backfill.py output/ --sink postgrest --url https://xyz.supabase.co \\
+        --table questoes_concurso --transform meu_mapa:para_linha --concurrency 4
+    python backfill.py arquivo.zrec --zdict zdict/ --sink jsonl --output conferencia.jsonl
+"""
+import argparse
+import importlib
+import json
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import requests
+
+from archive_compact import ArchiveIndex
+from content_hashes import batch_idempotency_key, ensure_annotated
+from ndjson_upload import post_ndjson
+from record_codec import load_codec
+from records_io import dumps_record, expand_paths, iter_file_records
+
+DEFAULT_STATE = 'backfill_state.json'
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+
+class RetryableError(Exception):
+    """Falha temporária: o lote é reenviado (`retry_after` em segundos, se o destino informar)."""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class PermanentError(Exception):
+    """O destino recusou o lote: vai para o arquivo de falhas sem novas tentativas."""
+
+
+def _check_response(response):
+    if response.status_code in (200, 201, 202, 204):
+        return
+    message = f"HTTP {response.status_code}: {response.text[:200]}"
+    if response.status_code in RETRYABLE_STATUS:
+        retry_after = response.headers.get('Retry-After')
+        raise RetryableError(message, float(retry_after) if retry_after and retry_after.isdigit() else None)
+    raise PermanentError(message)
+
+
+# ============================================================================
+# DESTINOS
+# ============================================================================
+
+class WebhookSink:
+    """POST no webhook com o mesmo envelope do scraper; confirmadas = lote inteiro em 2xx."""
+
+    def __init__(self, url, stream=False, gzip=True, label='Backfill'):
+        self.url = url
+        self.stream = stream
+        self.gzip = gzip
+        self.label = label
+        self.local = threading.local()
+
+    def _session(self):
+        if not hasattr(self.local, 'session'):
+            self.local.session = requests.Session()
+        return self.local.session
+
+    def send(self, batch, batch_number):
+        payload = {
+            "timestamp": datetime.now().isoformat(),
+            "total_questions": len(batch),
+            "source": f"TEC Scraper - {self.label}",
+            "account": self.label,
+            "batch_number": batch_number,
+            "backfill": True,
+        }
+        headers = {
+            "User-Agent": "TEC-Scraper/2.0",
+            "Idempotency-Key": batch_idempotency_key([ensure_annotated(r) for r in batch]),
+        }
+        try:
+            if self.stream:
+                response = post_ndjson(self.url, payload, batch, headers=headers, compress=self.gzip,
+                                       timeout=120, session=self._session())
+            else:
+                payload["data"] = batch
+                response = self._session().post(self.url, json=payload, headers=headers, timeout=60)
+        except requests.RequestException as e:
+            raise RetryableError(str(e))
+        _check_response(response)
+        return len(batch)
+
+    def close(self):
+        pass
+
+
+class PostgrestSink:
+    """Upsert em lote via PostgREST (Supabase); confirmadas = linhas devolvidas pelo banco."""
+
+    def __init__(self, url, table, key, on_conflict='id'):
+        self.endpoint = f"{url.rstrip('/')}/rest/v1/{table}"
+        self.params = {'on_conflict': on_conflict, 'select': on_conflict}
+        self.headers = {
+            'apikey': key,
+            'Authorization': f"Bearer {key}",
+            'Content-Type': 'application/json',
+            'Prefer': 'resolution=merge-duplicates,return=representation',
+        }
+        self.local = threading.local()
+
+    def send(self, batch, batch_number):
+        if not hasattr(self.local, 'session'):
+            self.local.session = requests.Session()
+        try:
+            response = self.local.session.post(self.endpoint, params=self.params, headers=self.headers,
+                                               data=json.dumps(batch, ensure_ascii=False).encode('utf-8'),
+                                               timeout=60)
+        except requests.RequestException as e:
+            raise RetryableError(str(e))
+        _check_response(response)
+        try:
+            return len(response.json())
+        except ValueError:
+            return len(batch)
+
+    def close(self):
+        pass
+
+
+class JsonlSink:
+    """Anexa as questões a um arquivo JSONL."""
+
+    def __init__(self, path):
+        self.lock = threading.Lock()
+        self.file = open(path, 'a', encoding='utf-8')
+
+    def send(self, batch, batch_number):
+        data = ''.join(dumps_record(record) + '\n' for record in batch)
+        with self.lock:
+            self.file.write(data)
+            self.file.flush()
+        return len(batch)
+
+    def close(self):
+        self.file.close()
+
+
+# ============================================================================
+# ENTRADA, TRANSFORMAÇÕES E CONTROLE DE TAXA
+# ============================================================================
+
+def iter_inputs(paths, codec=None):
+    """Questões de todos os arquivos, em ordem determinística (base do cursor)."""
+    for path in expand_paths(paths):
+        if not path.endswith(('.jsonl', '.jsonl.gz', '.json', '.json.gz')) and os.path.exists(path + '.idx'):
+            yield from ArchiveIndex(path, codec).records()
+        else:
+            yield from iter_file_records(path)
+
+
+def load_transforms(specs):
+    """'modulo:funcao' -> funções importadas, na ordem."""
+    transforms = []
+    if os.getcwd() not in sys.path:
+        sys.path.insert(0, os.getcwd())
+    for spec in specs or []:
+        module_name, _, func_name = spec.partition(':')
+        if not func_name:
+            raise ValueError(f"transformação inválida: {spec} (use modulo:funcao)")
+        transforms.append(getattr(importlib.import_module(module_name), func_name))
+    return transforms
+
+
+def apply_transforms(record, transforms):
+    for transform in transforms:
+        record = transform(record)
+        if record is None:
+            return None
+    return record
+
+
+class RateLimiter:
+    """Limite global de questões/s (agenda virtual: cada lote reserva len/rate segundos)."""
+
+    def __init__(self, rate):
+        self.rate = rate
+        self.lock = threading.Lock()
+        self.next_time = time.monotonic()
+
+    def acquire(self, count):
+        if not self.rate:
+            return
+        with self.lock:
+            now = time.monotonic()
+            start = max(now, self.next_time)
+            self.next_time = start + count / self.rate
+        if start > now:
+            time.sleep(start - now)
+
+
+# ============================================================================
+# CURSOR E EXECUÇÃO
+# ============================================================================
+
+class BackfillState:
+    """Cursor persistente + contadores da reconciliação."""
+
+    COUNTERS = ('read', 'skipped', 'sent', 'acked', 'failed', 'retries', 'batches')
+
+    def __init__(self, path, inputs, restart=False):
+        self.path = path
+        self.failed_path = f"{path}.failed.jsonl"
+        self.lock = threading.Lock()
+        self.data = {'inputs': inputs, 'position': 0, 'counters': dict.fromkeys(self.COUNTERS, 0)}
+        if os.path.exists(path) and not restart:
+            with open(path, encoding='utf-8') as f:
+                saved = json.load(f)
+            if saved.get('inputs') != inputs:
+                raise ValueError(f"{path} é de outra lista de entradas ({saved.get('inputs')}) - use --restart")
+            self.data = saved
+        # Lotes concluídos fora de ordem: início -> fim (o cursor só avança sem lacunas)
+        self.completed = {}
+
+    @property
+    def position(self):
+        return self.data['position']
+
+    @property
+    def counters(self):
+        return self.data['counters']
+
+    def add(self, **values):
+        with self.lock:
+            for key, value in values.items():
+                self.counters[key] += value
+
+    def complete(self, start, end):
+        with self.lock:
+            self.completed[start] = end
+            while self.data['position'] in self.completed:
+                self.data['position'] = self.completed.pop(self.data['position'])
+            self.save()
+
+    def record_failure(self, batch, error):
+        with self.lock:
+            with open(self.failed_path, 'a', encoding='utf-8') as f:
+                for record in batch:
+                    f.write(dumps_record({'error': error, 'record': record}) + '\n')
+
+    def save(self):
+        self.data['updated_at'] = datetime.now().isoformat(timespec='seconds')
+        temp = self.path + '.tmp'
+        with open(temp, 'w', encoding='utf-8') as f:
+            json.dump(self.data, f, ensure_ascii=False, indent=2)
+        os.replace(temp, self.path)
+
+
+def send_with_retries(sink, batch, batch_number, state, retries, backoff):
+    """Envia um lote. Retorna (confirmadas, erro ou None)."""
+    attempt = 0
+    while True:
+        try:
+            return sink.send(batch, batch_number), None
+        except RetryableError as e:
+            if attempt >= retries:
+                return 0, f"{e} (após {attempt + 1} tentativas)"
+            delay = e.retry_after or backoff * (2 ** attempt) * random.uniform(0.8, 1.2)
+            attempt += 1
+            state.add(retries=1)
+            print(f"🔁 Lote {batch_number}: {e} - nova tentativa {attempt}/{retries} em {delay:.1f}s")
+            time.sleep(delay)
+        except PermanentError as e:
+            return 0, str(e)
+
+
+def start_progress(state, started, interval, stop_event, in_flight):
+    """Imprime a vazão a cada `interval` segundos."""
+    def run():
+        last_acked, last_time = state.counters['acked'], time.time()
+        while not stop_event.wait(interval):
+            now = time.time()
+            acked = state.counters['acked']
+            print(f"📤 lidas {state.counters['read']} | enviadas {state.counters['sent']} | "
+                  f"confirmadas {acked} | falhas {state.counters['failed']} | em voo {in_flight()} | "
+                  f"{(acked - last_acked) / (now - last_time):.1f} q/s "
+                  f"(média {acked / max(now - started, 1e-9):.1f})")
+            last_acked, last_time = acked, now
+
+    thread = threading.Thread(target=run, name="BackfillProgress", daemon=True)
+    thread.start()
+    return thread
+
+
+def run_backfill(records, sink, state, transforms=(), batch_size=100, concurrency=2, rate=0.0,
+                 retries=5, backoff=2.0, progress_interval=10):
+    """Lê, transforma e envia; retorna os contadores finais."""
+    limiter = RateLimiter(rate)
+    slots = threading.Semaphore(concurrency)
+    in_flight = [0]
+    in_flight_lock = threading.Lock()
+    stop_event = threading.Event()
+    started = time.time()
+    skip = state.position
+    if skip:
+        print(f"♻️  Retomando do cursor: {skip} questões já concluídas")
+    start_progress(state, started, progress_interval, stop_event, lambda: in_flight[0])
+
+    # Contadores só mudam quando o lote conclui, junto com o cursor: retomar não conta duas vezes
+    def worker(batch, start, end, batch_number, skipped, rejected):
+        try:
+            acked, error = 0, None
+            for record, reason in rejected:
+                try:
+                    state.record_failure([record], reason)
+                except OSError as e:
+                    print(f"⚠️  Lote {batch_number}: não foi possível gravar em {state.failed_path}: {e}")
+            if batch:
+                try:
+                    acked, error = send_with_retries(sink, batch, batch_number, state, retries, backoff)
+                except Exception as e:
+                    # Erro fora da classificação do destino (disco, serialização, bug): o lote
+                    # conta como falha e o cursor avança, em vez de travar nesta posição
+                    acked, error = 0, f"{type(e).__name__}: {e}"
+                if error:
+                    print(f"❌ Lote {batch_number} ({len(batch)} questões): {error}")
+                    try:
+                        state.record_failure(batch, error)
+                    except OSError as e:
+                        print(f"⚠️  Lote {batch_number}: não foi possível gravar em {state.failed_path}: {e}")
+            state.add(read=end - start, skipped=skipped, sent=len(batch), acked=acked,
+                      failed=(len(batch) - acked if error else 0) + len(rejected), batches=1 if batch else 0)
+            state.complete(start, end)
+        finally:
+            with in_flight_lock:
+                in_flight[0] -= 1
+            slots.release()
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="Backfill") as executor:
+        def submit(batch, start, end, batch_number, skipped, rejected):
+            slots.acquire()
+            with in_flight_lock:
+                in_flight[0] += 1
+            limiter.acquire(len(batch))
+            executor.submit(worker, batch, start, end, batch_number, skipped, rejected)
+
+        batch, batch_start, position, skipped, batch_number = [], skip, 0, 0, 0
+        rejected = []
+        for record in records:
+            position += 1
+            if position <= skip:
+                continue
+            try:
+                transformed = apply_transforms(record, transforms)
+            except Exception as e:
+                # Transformação do usuário falhou nesta questão: registrada com o lote, o resto segue
+                rejected.append((record, f"transformação: {type(e).__name__}: {e}"))
+            else:
+                if transformed is None:
+                    skipped += 1
+                else:
+                    batch.append(transformed)
+            if len(batch) + len(rejected) >= batch_size:
+                batch_number += 1
+                submit(batch, batch_start, position, batch_number, skipped, rejected)
+                batch, batch_start, skipped, rejected = [], position, 0, []
+        if batch_start < position:
+            submit(batch, batch_start, position, batch_number + 1, skipped, rejected)
+
+    stop_event.set()
+    state.data['elapsed_s'] = round(state.data.get('elapsed_s', 0) + time.time() - started, 1)
+    state.save()
+    sink.close()
+    return state.counters
+
+
+def build_sink(args):
+    if args.sink == 'webhook':
+        if not args.url:
+            raise SystemExit("--url é obrigatório para o destino webhook")
+        return WebhookSink(args.url, stream=args.stream, gzip=not args.no_gzip)
+    if args.sink == 'postgrest':
+        key = os.environ.get(args.key_env)
+        if not (args.url and args.table and key):
+            raise SystemExit(f"postgrest precisa de --url, --table e da chave em ${args.key_env}")
+        return PostgrestSink(args.url, args.table, key, args.on_conflict)
+    if not args.output:
+        raise SystemExit("--output é obrigatório para o destino jsonl")
+    return JsonlSink(args.output)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reenvio em massa de questões arquivadas")
+    parser.add_argument('inputs', nargs='+', help="Arquivos/diretórios/padrões de questões ou .zrec")
+    parser.add_argument('--sink', choices=['webhook', 'postgrest', 'jsonl'], required=True)
+    parser.add_argument('--url', help="URL do webhook ou do projeto Supabase/PostgREST")
+    parser.add_argument('--stream', action='store_true', help="webhook: envia cada lote como NDJSON em streaming")
+    parser.add_argument('--no-gzip', action='store_true', help="webhook: NDJSON sem gzip")
+    parser.add_argument('--table', help="postgrest: tabela de destino")
+    parser.add_argument('--on-conflict', default='id', help="postgrest: coluna única do upsert")
+    parser.add_argument('--key-env', default='SUPABASE_SERVICE_ROLE_KEY', help="postgrest: variável com a chave")
+    parser.add_argument('--output', help="jsonl: arquivo de saída")
+    parser.add_argument('--zdict', help="Diretório do dicionário para ler arquivos .zrec")
+    parser.add_argument('--transform', action='append', help="modulo:funcao aplicada a cada questão")
+    parser.add_argument('--batch-size', type=int, default=100)
+    parser.add_argument('--concurrency', type=int, default=2, help="Lotes em voo ao mesmo tempo")
+    parser.add_argument('--rate', type=float, default=0.0, help="Questões por segundo (0 = sem limite)")
+    parser.add_argument('--retries', type=int, default=5)
+    parser.add_argument('--backoff', type=float, default=2.0, help="Espera inicial entre tentativas (s)")
+    parser.add_argument('--state', default=DEFAULT_STATE, help="Arquivo do cursor")
+    parser.add_argument('--restart', action='store_true', help="Ignora o cursor salvo e começa do zero")
+    parser.add_argument('--progress', type=int, default=10, help="Intervalo do painel de vazão (s)")
+    args = parser.parse_args()
+
+    inputs = expand_paths(args.inputs)
+    state = BackfillState(args.state, inputs, restart=args.restart)
+    codec = load_codec(args.zdict) if args.zdict else None
+    sink = build_sink(args)
+    print(f"🚚 Backfill de {len(inputs)} arquivo(s) → {args.sink} | lotes de {args.batch_size} | "
+          f"{args.concurrency} em voo | {f'{args.rate:g} q/s' if args.rate else 'sem limite de taxa'}")
+
+    try:
+        counters = run_backfill(iter_inputs(inputs, codec), sink, state, load_transforms(args.transform),
+                                args.batch_size, args.concurrency, args.rate, args.retries, args.backoff,
+                                args.progress)
+    except KeyboardInterrupt:
+        state.save()
+        print(f"\n⏸️  Interrompido - cursor salvo em {args.state} (posição {state.position})")
+        raise SystemExit(130)
+
+    elapsed = state.data.get('elapsed_s') or 0
+    print("\n" + "=" * 60)
+    print("🧾 RECONCILIAÇÃO")
+    print("=" * 60)
+    print(f"   Lidas:        {counters['read']} ({counters['skipped']} puladas pelas transformações)")
+    print(f"   Enviadas:     {counters['sent']} em {counters['batches']} lotes ({counters['retries']} reenvios)")
+    print(f"   Confirmadas:  {counters['acked']}")
+    print(f"   Falhas:       {counters['failed']}" + (f" → {state.failed_path}" if counters['failed'] else ''))
+    print(f"   Vazão média:  {counters['acked'] / max(elapsed, 1e-9):.1f} q/s em {elapsed:.0f}s")
+    if counters['sent'] != counters['acked']:
+        print(f"⚠️  {counters['sent'] - counters['acked']} questões enviadas sem confirmação")
+    if counters['sent'] != counters['acked'] or counters['failed']:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
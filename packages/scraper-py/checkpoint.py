@@ -0,0 +1,211 @@
+"""
+Checkpoint local do estado de cada conta, para retomar após uma queda do processo.
+
+Por conta são guardados:
+- contadores (novas, puladas, webhook ok/falha), última questão processada e URL
+- lote pendente ainda não enviado ao webhook
+- IDs novos adicionados ao conjunto compartilhado desde o início da execução
+
+Também guarda um snapshot da lista de IDs baixada do webhook, para que o
+--resume não precise baixá-la de novo.
+
+Tudo fica em um único SQLite (WAL). As alterações são acumuladas em memória e
+gravadas em uma transação a cada `interval` questões, barato o bastante para
+interval=1. Com um `codec` (record_codec.RecordCodec), as questões do lote
+pendente são gravadas comprimidas com o dicionário treinado.
+"""
+import json
+import sqlite3
+import threading
+import time
+import zlib
+
+STATUS_RUNNING = 'running'
+STATUS_FINISHED = 'finished'
+
+COUNTER_FIELDS = ['question_count', 'skipped_count', 'webhook_success', 'webhook_failed']
+
+
+class CheckpointStore:
+    """Armazenamento SQLite compartilhado por todas as contas do processo."""
+
+    def __init__(self, path, codec=None):
+        self.path = path
+        self.codec = codec
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(
+            "CREATE TABLE IF NOT EXISTS worker_state ("
+            " account TEXT PRIMARY KEY, status TEXT NOT NULL, state TEXT NOT NULL, updated_at REAL NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS pending ("
+            " account TEXT NOT NULL, seq INTEGER NOT NULL, record TEXT NOT NULL, PRIMARY KEY (account, seq));"
+            "CREATE TABLE IF NOT EXISTS seen_ids ("
+            " account TEXT NOT NULL, id TEXT NOT NULL, PRIMARY KEY (account, id));"
+            "CREATE TABLE IF NOT EXISTS id_snapshot ("
+            " name TEXT PRIMARY KEY, ids BLOB NOT NULL, count INTEGER NOT NULL, saved_at REAL NOT NULL);"
+        )
+        self.conn.commit()
+
+    # --- snapshot da lista de IDs do webhook --------------------------------
+
+    def save_id_snapshot(self, ids, name='webhook'):
+        """Guarda a lista de IDs baixada (comprimida em um único blob)."""
+        blob = zlib.compress('\n'.join(sorted(ids)).encode('utf-8'), 1)
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO id_snapshot (name, ids, count, saved_at) VALUES (?, ?, ?, ?)",
+                (name, blob, len(ids), time.time()),
+            )
+            self.conn.commit()
+
+    def load_id_snapshot(self, max_age=None, name='webhook'):
+        """Retorna (ids, idade em segundos) do snapshot, ou (None, None) se ausente/antigo."""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT ids, saved_at FROM id_snapshot WHERE name = ?", (name,)
+            ).fetchone()
+        if row is None:
+            return None, None
+        age = time.time() - row[1]
+        if max_age is not None and age > max_age:
+            return None, age
+        text = zlib.decompress(row[0]).decode('utf-8')
+        return set(text.split('\n')) if text else set(), age
+
+    # --- estado por conta ----------------------------------------------------
+
+    def load(self, account):
+        """Retorna o checkpoint de uma conta: {'status', 'state', 'pending', 'seen_ids'} ou None."""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT status, state, updated_at FROM worker_state WHERE account = ?", (account,)
+            ).fetchone()
+            if row is None:
+                return None
+            pending = [
+                self._decode_record(r[0]) for r in self.conn.execute(
+                    "SELECT record FROM pending WHERE account = ? ORDER BY seq", (account,)
+                )
+            ]
+            seen = {r[0] for r in self.conn.execute("SELECT id FROM seen_ids WHERE account = ?", (account,))}
+        return {
+            'status': row[0],
+            'state': json.loads(row[1]),
+            'updated_at': row[2],
+            'pending': pending,
+            'seen_ids': seen,
+        }
+
+    def _encode_record(self, record):
+        if self.codec:
+            return sqlite3.Binary(self.codec.encode(record))
+        return json.dumps(record, ensure_ascii=False)
+
+    def _decode_record(self, value):
+        # BLOB = questão comprimida pelo codec; TEXT = JSON (checkpoints sem codec)
+        if isinstance(value, bytes):
+            if not self.codec:
+                raise ValueError("Checkpoint com questões comprimidas: informe o codec (dicionário)")
+            return self.codec.decode(value)
+        return json.loads(value)
+
+    def all_seen_ids(self):
+        """IDs novos registrados por todas as contas."""
+        with self.lock:
+            return {r[0] for r in self.conn.execute("SELECT id FROM seen_ids")}
+
+    def reset(self, account):
+        """Apaga o checkpoint de uma conta (início de uma execução nova)."""
+        with self.lock:
+            self.conn.execute("DELETE FROM worker_state WHERE account = ?", (account,))
+            self.conn.execute("DELETE FROM pending WHERE account = ?", (account,))
+            self.conn.execute("DELETE FROM seen_ids WHERE account = ?", (account,))
+            self.conn.commit()
+
+    def write(self, account, status, state, new_ids, pending_ops):
+        """Grava em uma transação o estado, os IDs novos e as operações no lote pendente."""
+        with self.lock:
+            cur = self.conn.cursor()
+            cur.execute(
+                "INSERT OR REPLACE INTO worker_state (account, status, state, updated_at) VALUES (?, ?, ?, ?)",
+                (account, status, json.dumps(state, ensure_ascii=False), time.time()),
+            )
+            if new_ids:
+                cur.executemany(
+                    "INSERT OR IGNORE INTO seen_ids (account, id) VALUES (?, ?)",
+                    [(account, i) for i in new_ids],
+                )
+            for op, seq, record in pending_ops:
+                if op == 'add':
+                    cur.execute(
+                        "INSERT OR REPLACE INTO pending (account, seq, record) VALUES (?, ?, ?)",
+                        (account, seq, self._encode_record(record)),
+                    )
+                else:
+                    cur.execute("DELETE FROM pending WHERE account = ?", (account,))
+            self.conn.commit()
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+class AccountCheckpoint:
+    """Estado de checkpoint de uma conta, com gravação a cada `interval` questões."""
+
+    def __init__(self, store, account, interval=1):
+        self.store = store
+        self.account = account
+        self.interval = max(1, interval)
+        self.state = {field: 0 for field in COUNTER_FIELDS}
+        self.state.update({'last_question_id': None, 'last_url': None})
+        self.status = STATUS_RUNNING
+        self._new_ids = []
+        self._pending_ops = []
+        self._pending_seq = 0
+        self._dirty = 0
+
+    def start_fresh(self):
+        """Descarta qualquer checkpoint anterior da conta."""
+        self.store.reset(self.account)
+
+    def restore(self):
+        """Carrega o checkpoint salvo. Retorna o dict de `CheckpointStore.load` ou None."""
+        saved = self.store.load(self.account)
+        if saved is None:
+            return None
+        self.state.update(saved['state'])
+        self._pending_seq = len(saved['pending'])
+        return saved
+
+    def add_seen_id(self, question_id):
+        self._new_ids.append(str(question_id))
+
+    def add_pending(self, record):
+        self._pending_ops.append(('add', self._pending_seq, record))
+        self._pending_seq += 1
+
+    def clear_pending(self):
+        self._pending_ops.append(('clear', 0, None))
+        self._pending_seq = 0
+
+    def update(self, **fields):
+        """Atualiza o estado e grava se o intervalo foi atingido."""
+        self.state.update(fields)
+        self._dirty += 1
+        if self._dirty >= self.interval:
+            self.flush()
+
+    def flush(self):
+        """Grava imediatamente o que estiver acumulado."""
+        self.store.write(self.account, self.status, self.state, self._new_ids, self._pending_ops)
+        self._new_ids = []
+        self._pending_ops = []
+        self._dirty = 0
+
+    def finish(self):
+        """Marca a conta como finalizada normalmente."""
+        self.status = STATUS_FINISHED
+        self.flush()
@@ -0,0 +1,403 @@
+"""
+Exportação colunar das questões extraídas para análises rápidas de cobertura.
+
+Layout de uma exportação (um diretório):
+- meta.json                 -> versão, número de linhas e descrição das colunas
+- <coluna>.codes + .dict.json -> colunas de baixa cardinalidade (dicionário)
+- <coluna>.txt + .off       -> colunas de texto longo (blob UTF-8 + offsets)
+- <coluna>.num              -> colunas numéricas (array binário)
+
+Uso:
+    python columnar_export.py export output/*.jsonl -o colunar/
+    python columnar_export.py count colunar/ --by materia,ano
+    python columnar_export.py bench output/*.jsonl
+"""
+import argparse
+import json
+import os
+import time
+import unicodedata
+from array import array
+from collections import Counter
+from itertools import compress
+
+from records_io import iter_records
+
+FORMAT_VERSION = 1
+
+# Colunas codificadas por dicionário (baixa cardinalidade)
+DICT_COLUMNS = ['materia', 'assunto', 'banca', 'orgao', 'cargo', 'ano', 'gabarito']
+
+# Colunas de texto longo, guardadas separadamente
+TEXT_COLUMNS = ['id', 'concurso', 'enunciado', 'comentario', 'alternativas', 'extracted_at']
+
+# Colunas numéricas derivadas
+NUMERIC_COLUMNS = ['n_alternativas', 'total_imagens']
+
+# Prefixos (sem acento) das chaves de `detalhes` usadas em cada coluna
+DETALHES_PREFIXES = {
+    'banca': 'banca',
+    'orgao': 'orgao',
+    'cargo': 'cargo',
+    'ano': 'ano',
+}
+
+
+def strip_accents(text):
+    """Remove acentos de um texto (NFKD + descarte de marcas combinantes)."""
+    normalized = unicodedata.normalize('NFKD', text)
+    return ''.join(c for c in normalized if not unicodedata.combining(c))
+
+
+def detalhes_value(detalhes, prefix):
+    """Busca em `detalhes` o valor da primeira chave que começa com o prefixo (sem acento)."""
+    if not detalhes:
+        return None
+    for key, value in detalhes.items():
+        if strip_accents(key).startswith(prefix):
+            return value
+    return None
+
+
+def record_to_row(record):
+    """Converte uma questão no dicionário de valores por coluna."""
+    detalhes = record.get('detalhes') or {}
+    alternativas = record.get('alternativas') or []
+
+    row = {
+        'materia': record.get('materia'),
+        'assunto': record.get('assunto'),
+        'gabarito': record.get('gabarito'),
+        'id': str(record.get('id', '')),
+        'concurso': record.get('concurso'),
+        'enunciado': record.get('enunciado'),
+        'comentario': record.get('comentario'),
+        'alternativas': json.dumps(alternativas, ensure_ascii=False) if alternativas else None,
+        'extracted_at': record.get('extracted_at'),
+        'n_alternativas': len(alternativas),
+        'total_imagens': record.get('total_imagens', 0) or 0,
+    }
+    for column, prefix in DETALHES_PREFIXES.items():
+        row[column] = detalhes_value(detalhes, prefix)
+    return row
+
+
+# ============================================================================
+# ESCRITA
+# ============================================================================
+
+class ColumnarWriter:
+    """Escreve questões em formato colunar de forma incremental (streaming)."""
+
+    def __init__(self, out_dir):
+        self.out_dir = out_dir
+        os.makedirs(out_dir, exist_ok=True)
+
+        self.rows = 0
+        # Código 0 é reservado para valor ausente (None)
+        self.dictionaries = {col: {None: 0} for col in DICT_COLUMNS}
+        self.codes = {col: array('I') for col in DICT_COLUMNS}
+        self.numbers = {col: array('I') for col in NUMERIC_COLUMNS}
+
+        self.text_files = {}
+        self.offsets = {}
+        self.text_positions = {}
+        for col in TEXT_COLUMNS:
+            self.text_files[col] = open(os.path.join(out_dir, f"{col}.txt"), 'wb')
+            self.offsets[col] = array('Q', [0])
+            self.text_positions[col] = 0
+
+    def append(self, record):
+        """Adiciona uma questão."""
+        row = record_to_row(record)
+
+        for col in DICT_COLUMNS:
+            value = row[col]
+            dictionary = self.dictionaries[col]
+            code = dictionary.get(value)
+            if code is None:
+                code = len(dictionary)
+                dictionary[value] = code
+            self.codes[col].append(code)
+
+        for col in TEXT_COLUMNS:
+            value = row[col]
+            encoded = value.encode('utf-8') if value else b''
+            self.text_files[col].write(encoded)
+            self.text_positions[col] += len(encoded)
+            self.offsets[col].append(self.text_positions[col])
+
+        for col in NUMERIC_COLUMNS:
+            self.numbers[col].append(row[col])
+
+        self.rows += 1
+
+    def close(self):
+        """Grava dicionários, códigos, offsets e o meta.json."""
+        columns = {}
+
+        for col in DICT_COLUMNS:
+            values = [None] * len(self.dictionaries[col])
+            for value, code in self.dictionaries[col].items():
+                values[code] = value
+
+            # Reduz o tamanho do código quando o dicionário é pequeno
+            typecode = 'B' if len(values) <= 0xFF else 'H' if len(values) <= 0xFFFF else 'I'
+            with open(os.path.join(self.out_dir, f"{col}.codes"), 'wb') as f:
+                array(typecode, self.codes[col]).tofile(f)
+            with open(os.path.join(self.out_dir, f"{col}.dict.json"), 'w', encoding='utf-8') as f:
+                json.dump(values, f, ensure_ascii=False)
+
+            columns[col] = {'kind': 'dict', 'typecode': typecode, 'cardinality': len(values) - 1}
+
+        for col in TEXT_COLUMNS:
+            self.text_files[col].close()
+            with open(os.path.join(self.out_dir, f"{col}.off"), 'wb') as f:
+                self.offsets[col].tofile(f)
+            columns[col] = {'kind': 'text', 'typecode': 'Q'}
+
+        for col in NUMERIC_COLUMNS:
+            with open(os.path.join(self.out_dir, f"{col}.num"), 'wb') as f:
+                self.numbers[col].tofile(f)
+            columns[col] = {'kind': 'numeric', 'typecode': 'I'}
+
+        meta = {
+            'version': FORMAT_VERSION,
+            'rows': self.rows,
+            'columns': columns,
+        }
+        with open(os.path.join(self.out_dir, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2)
+
+        return meta
+
+
+def export_records(records, out_dir):
+    """Exporta um iterável de questões e retorna o meta.json gerado."""
+    writer = ColumnarWriter(out_dir)
+    for record in records:
+        writer.append(record)
+    return writer.close()
+
+
+def _read_meta(directory):
+    with open(os.path.join(directory, 'meta.json'), encoding='utf-8') as f:
+        return json.load(f)
+
+
+# ============================================================================
+# LEITURA E CONSULTAS
+# ============================================================================
+
+class ColumnarTable:
+    """Acesso somente leitura a uma exportação colunar, com carga preguiçosa das colunas."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.meta = _read_meta(directory)
+        if self.meta.get('version') != FORMAT_VERSION:
+            raise ValueError(f"Versão de exportação não suportada: {self.meta.get('version')}")
+
+        self.rows = self.meta['rows']
+        self._codes = {}
+        self._dicts = {}
+        self._numbers = {}
+        self._offsets = {}
+
+    def _load_array(self, filename, typecode):
+        values = array(typecode)
+        path = os.path.join(self.directory, filename)
+        with open(path, 'rb') as f:
+            values.frombytes(f.read())
+        return values
+
+    def kind(self, column):
+        """Retorna o tipo de armazenamento da coluna ('dict', 'text' ou 'numeric')."""
+        if column not in self.meta['columns']:
+            raise KeyError(f"Coluna desconhecida: {column}")
+        return self.meta['columns'][column]['kind']
+
+    def codes(self, column):
+        """Array de códigos de uma coluna de dicionário."""
+        if column not in self._codes:
+            typecode = self.meta['columns'][column]['typecode']
+            self._codes[column] = self._load_array(f"{column}.codes", typecode)
+        return self._codes[column]
+
+    def dictionary(self, column):
+        """Lista de valores de uma coluna de dicionário (índice = código)."""
+        if column not in self._dicts:
+            path = os.path.join(self.directory, f"{column}.dict.json")
+            with open(path, encoding='utf-8') as f:
+                self._dicts[column] = json.load(f)
+        return self._dicts[column]
+
+    def numbers(self, column):
+        """Array de uma coluna numérica."""
+        if column not in self._numbers:
+            self._numbers[column] = self._load_array(f"{column}.num", 'I')
+        return self._numbers[column]
+
+    def text(self, column, row):
+        """Lê o valor de uma coluna de texto em uma linha (acesso aleatório)."""
+        if column not in self._offsets:
+            self._offsets[column] = self._load_array(f"{column}.off", 'Q')
+        offsets = self._offsets[column]
+        start, end = offsets[row], offsets[row + 1]
+        if start == end:
+            return None
+        with open(os.path.join(self.directory, f"{column}.txt"), 'rb') as f:
+            f.seek(start)
+            return f.read(end - start).decode('utf-8')
+
+    def code_of(self, column, value):
+        """Código de um valor em uma coluna de dicionário (None se não existir)."""
+        try:
+            return self.dictionary(column).index(value)
+        except ValueError:
+            return None
+
+    def mask(self, **filters):
+        """Máscara de linhas (bytes 0/1) em que todas as colunas têm o valor pedido."""
+        result = None
+        for column, value in filters.items():
+            code = self.code_of(column, value)
+            if code is None:
+                return bytes(self.rows)
+            current = bytes(c == code for c in self.codes(column))
+            result = current if result is None else bytes(a & b for a, b in zip(result, current))
+        return result if result is not None else bytes([1]) * self.rows
+
+
+def value_counts(table, column, mask=None):
+    """Contagem de linhas por valor de uma coluna de dicionário, em ordem decrescente."""
+    codes = table.codes(column)
+    if mask is not None:
+        codes = compress(codes, mask)
+    counts = Counter(codes)
+    dictionary = table.dictionary(column)
+    return [(dictionary[code], count) for code, count in counts.most_common()]
+
+
+def group_count(table, columns, mask=None):
+    """Contagem de linhas agrupadas por várias colunas de dicionário."""
+    if isinstance(columns, str):
+        columns = [columns]
+    if len(columns) == 1:
+        return [((value,), count) for value, count in value_counts(table, columns[0], mask)]
+
+    code_arrays = [table.codes(col) for col in columns]
+    keys = zip(*code_arrays)
+    if mask is not None:
+        keys = compress(keys, mask)
+    counts = Counter(keys)
+
+    dictionaries = [table.dictionary(col) for col in columns]
+    return [
+        (tuple(d[c] for d, c in zip(dictionaries, key)), count)
+        for key, count in counts.most_common()
+    ]
+
+
+def numeric_sum(table, column, mask=None):
+    """Soma de uma coluna numérica (opcionalmente filtrada)."""
+    values = table.numbers(column)
+    if mask is not None:
+        values = compress(values, mask)
+    return sum(values)
+
+
+# ============================================================================
+# BENCHMARK
+# ============================================================================
+
+def scan_jsonl_counts(paths, columns):
+    """Referência: contagem agrupada lendo todas as questões em JSON."""
+    counts = Counter()
+    for record in iter_records(paths):
+        row = record_to_row(record)
+        counts[tuple(row[col] for col in columns)] += 1
+    return counts
+
+
+def run_benchmark(paths, columns, out_dir, repeat=3):
+    """Compara a contagem agrupada via varredura JSONL e via exportação colunar."""
+    start = time.perf_counter()
+    meta = export_records(iter_records(paths), out_dir)
+    export_time = time.perf_counter() - start
+
+    scan_times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        expected = scan_jsonl_counts(paths, columns)
+        scan_times.append(time.perf_counter() - start)
+
+    columnar_times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        table = ColumnarTable(out_dir)
+        result = dict(group_count(table, columns))
+        columnar_times.append(time.perf_counter() - start)
+
+    if result != dict(expected):
+        raise AssertionError("Resultado colunar difere da varredura JSONL")
+
+    scan_best = min(scan_times)
+    columnar_best = min(columnar_times)
+    return {
+        'rows': meta['rows'],
+        'group_by': columns,
+        'export_s': round(export_time, 4),
+        'jsonl_scan_s': round(scan_best, 4),
+        'columnar_s': round(columnar_best, 4),
+        'speedup': round(scan_best / columnar_best, 1) if columnar_best > 0 else None,
+    }
+
+
+# ============================================================================
+# CLI
+# ============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(description="Exportação colunar de questões extraídas")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p_export = sub.add_parser('export', help="Exporta arquivos JSON/JSONL para formato colunar")
+    p_export.add_argument('inputs', nargs='+')
+    p_export.add_argument('-o', '--output', required=True)
+
+    p_count = sub.add_parser('count', help="Contagem agrupada sobre uma exportação")
+    p_count.add_argument('directory')
+    p_count.add_argument('--by', default='materia', help="Colunas separadas por vírgula")
+    p_count.add_argument('--where', action='append', default=[], help="Filtro coluna=valor")
+    p_count.add_argument('--top', type=int, default=50)
+
+    p_bench = sub.add_parser('bench', help="Benchmark contra varredura JSONL")
+    p_bench.add_argument('inputs', nargs='+')
+    p_bench.add_argument('--by', default='materia,assunto')
+    p_bench.add_argument('--workdir', default='colunar_bench')
+    p_bench.add_argument('--repeat', type=int, default=3)
+
+    args = parser.parse_args()
+
+    if args.command == 'export':
+        meta = export_records(iter_records(args.inputs), args.output)
+        print(f"✅ {meta['rows']} questões exportadas para {args.output}")
+        for col in DICT_COLUMNS:
+            print(f"   {col}: {meta['columns'][col]['cardinality']} valores distintos")
+
+    elif args.command == 'count':
+        table = ColumnarTable(args.directory)
+        filters = dict(item.split('=', 1) for item in args.where)
+        mask = table.mask(**filters) if filters else None
+        columns = args.by.split(',')
+        for key, count in group_count(table, columns, mask)[:args.top]:
+            print(f"{count:>8}  {' | '.join(str(v) for v in key)}")
+
+    elif args.command == 'bench':
+        result = run_benchmark(args.inputs, args.by.split(','), args.workdir, args.repeat)
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""
+Painel de terminal em tela cheia, redesenhado por uma única thread.
+
+As contas não escrevem mais no console: publicam eventos curtos (`event`) em
+uma fila, sem bloquear. A thread do painel consome a fila e redesenha algumas
+vezes por segundo:
+- por conta: estado (e motivo da pausa), novas, puladas, taxa 1m, webhook,
+  lote pendente, tempo sem atividade e a última ação
+- totais e taxas do StatsReporter, profundidade da fila de eventos
+- erros recentes (tudo o que vai para stderr: avisos/erros do logging)
+- mensagens recentes (tudo o que vai para stdout: prints, respostas de comandos)
+
+Enquanto o painel está ativo, sys.stdout e sys.stderr viram filas para ele (um
+print de qualquer thread não bagunça a tela). A última linha fica livre para
+os comandos do console (status | pause|resume|drain|stop <conta|all>).
+"""
+import logging
+import queue
+import shutil
+import sys
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+ALT_SCREEN_ON = '\x1b[?1049h\x1b[H'
+ALT_SCREEN_OFF = '\x1b[?1049l'
+CLEAR_LINE = '\x1b[K'
+HOME = '\x1b[H'
+SAVE_CURSOR = '\x1b7'
+RESTORE_CURSOR = '\x1b8'
+
+STREAM_OUT = 'stdout'
+STREAM_ERR = 'stderr'
+
+
+class ConsoleHandler(logging.StreamHandler):
+    """StreamHandler que sempre escreve no sys.stderr atual (o painel o substitui enquanto está ativo)."""
+
+    @property
+    def stream(self):
+        return sys.stderr
+
+    @stream.setter
+    def stream(self, value):
+        pass
+
+
+class _QueueWriter:
+    """Substituto de stdout/stderr: cada linha completa vira um item na fila do painel."""
+
+    def __init__(self, dashboard, stream_name):
+        self.dashboard = dashboard
+        self.stream_name = stream_name
+        self.buffer = ''
+        self.lock = threading.Lock()
+
+    def write(self, text):
+        with self.lock:
+            self.buffer += text
+            if '\n' not in self.buffer:
+                return len(text)
+            *lines, self.buffer = self.buffer.split('\n')
+        for line in lines:
+            if line.strip():
+                self.dashboard.push((self.stream_name, None, line.strip()))
+        return len(text)
+
+    def flush(self):
+        pass
+
+    def isatty(self):
+        return False
+
+
+class Dashboard:
+    """Renderizador único do console enquanto a extração roda."""
+
+    def __init__(self, control_plane, stats_reporter, refresh=0.25, max_messages=6, max_queue=10000):
+        self.control_plane = control_plane
+        self.stats_reporter = stats_reporter
+        self.refresh = refresh
+        self.events = queue.Queue(maxsize=max_queue)
+        self.dropped = 0
+        self.last_action = {}
+        self.errors = deque(maxlen=max_messages)
+        self.messages = deque(maxlen=max_messages)
+        self.snapshot = None
+        self.started = None
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.real_stdout = None
+        self.real_stderr = None
+
+    @staticmethod
+    def supported():
+        return sys.stdout.isatty()
+
+    # --- produtores (qualquer thread) ----------------------------------------
+
+    def push(self, item):
+        try:
+            self.events.put_nowait(item)
+        except queue.Full:
+            self.dropped += 1
+
+    def event(self, account, text):
+        """Última ação de uma conta (ex.: '✓ 123456 | Português'). Não bloqueia."""
+        self.push(('event', account, text))
+
+    def on_stats(self, snapshot):
+        """Listener do StatsReporter."""
+        self.snapshot = snapshot
+
+    # --- ciclo de vida ---------------------------------------------------------
+
+    def start(self):
+        self.started = time.time()
+        self.real_stdout, self.real_stderr = sys.stdout, sys.stderr
+        height = shutil.get_terminal_size((120, 40)).lines
+        self.real_stdout.write(f"{ALT_SCREEN_ON}\x1b[{height};1H")
+        self.real_stdout.flush()
+        sys.stdout = _QueueWriter(self, STREAM_OUT)
+        sys.stderr = _QueueWriter(self, STREAM_ERR)
+        self.thread = threading.Thread(target=self._run, name="Dashboard", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Restaura o console e repete os erros recentes (não se perdem ao sair da tela cheia)."""
+        if not self.thread:
+            return
+        self.stop_event.set()
+        self.thread.join(timeout=2)
+        self.thread = None
+        sys.stdout, sys.stderr = self.real_stdout, self.real_stderr
+        self.real_stdout.write(ALT_SCREEN_OFF)
+        self.real_stdout.flush()
+        self._drain()
+        if self.errors:
+            print("⚠️  Erros recentes exibidos no painel:")
+            for line in self.errors:
+                print(f"   {line}")
+
+    # --- renderização ----------------------------------------------------------
+
+    def _drain(self):
+        while True:
+            try:
+                kind, account, text = self.events.get_nowait()
+            except queue.Empty:
+                return
+            stamp = datetime.now().strftime('%H:%M:%S')
+            if kind == 'event':
+                self.last_action[account] = (time.time(), text)
+            elif kind == STREAM_ERR:
+                self.errors.append(f"{stamp} {text}")
+            else:
+                self.messages.append(f"{stamp} {text}")
+
+    def _run(self):
+        while not self.stop_event.wait(self.refresh):
+            try:
+                self._drain()
+                self.real_stdout.write(self.render())
+                self.real_stdout.flush()
+            except Exception as e:
+                self.errors.append(f"painel: {e}")
+
+    def render(self):
+        width, height = shutil.get_terminal_size((120, 40))
+        now = time.time()
+        snapshot = self.snapshot or {}
+        totals = snapshot.get('totals') or self.stats_reporter.totals()
+        rate = (snapshot.get('rate_new') or {}).get('1m', 0.0)
+        elapsed = int(now - self.started)
+        statuses = self.control_plane.statuses()['workers']
+        accounts = snapshot.get('accounts', {})
+
+        lines = [
+            f"🚀 TEC Concursos Scraper  ⏱️ {elapsed // 3600:02d}:{elapsed % 3600 // 60:02d}:{elapsed % 60:02d}  "
+            f"🆕 {totals['new']} ({rate:.1f}/min)  ⏭️ {totals['skipped']}  "
+            f"📤 ✓{totals['webhook_success']} ✗{totals['webhook_failed']}  "
+            f"📨 fila {self.events.qsize()}" + (f" (descartados {self.dropped})" if self.dropped else ''),
+            '─' * width,
+            f"{'Conta':14} {'Estado':22} {'Novas':>6} {'Pul.':>6} {'/min':>6} {'Webhook':>9} "
+            f"{'Lote':>5} {'Parada':>7}  Última ação",
+        ]
+        for status in statuses:
+            name = status['name']
+            counters = accounts.get(name, {})
+            state = status.get('state', '?')
+            if status.get('pause_reason'):
+                state = f"{state} ({status['pause_reason']})"
+            action_time, action = self.last_action.get(name, (None, ''))
+            idle = now - action_time if action_time else counters.get('idle_s')
+            lines.append(
+                f"{name[:14]:14} {state[:22]:22} {status.get('question_count', counters.get('new', 0)):>6} "
+                f"{status.get('skipped_count', counters.get('skipped', 0)):>6} "
+                f"{(counters.get('rate_new') or {}).get('1m', 0.0):>6.1f} "
+                f"{counters.get('webhook_success', 0):>5}/{counters.get('webhook_failed', 0):<3} "
+                f"{status.get('pending', 0):>5} {f'{idle:.0f}s' if idle is not None else '-':>7}  {action}"
+            )
+
+        lines += ['─' * width, "⚠️  Erros recentes"] + [f"  {line}" for line in self.errors]
+        lines += ["💬 Mensagens"] + [f"  {line}" for line in self.messages]
+        body = height - 1
+        lines = [line[:width] for line in lines][:body - 1]
+        lines += [''] * (body - 1 - len(lines))
+        lines.append("Comandos (digite na última linha): status | pause|resume|drain|stop <conta|all> | ENTER")
+        # A última linha da tela é do operador: o painel salva o cursor, redesenha acima e o devolve
+        return SAVE_CURSOR + HOME + (CLEAR_LINE + '\n').join(lines) + CLEAR_LINE + RESTORE_CURSOR
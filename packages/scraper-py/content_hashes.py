@@ -0,0 +1,201 @@
+"""
+Hashes de conteúdo por campo, chaves de idempotência e modo delta de envio.
+
+Cada questão recebe:
+- `content_hashes`: hash estável de cada grupo de campos (enunciado, alternativas,
+  comentário, detalhes, imagens, classificação) + hash geral do conteúdo
+- `idempotency_key`: "<id>:<hash geral>" (igual em reenvios do mesmo conteúdo)
+
+No modo delta, o envio consulta um armazenamento local (SQLite) com os hashes da
+última versão confirmada de cada ID e manda apenas questões novas ou os campos
+que mudaram.
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+HASH_VERSION = 1
+
+# Grupo de hash -> campos da questão que ele cobre
+HASHED_FIELDS = {
+    'enunciado': ['enunciado'],
+    'alternativas': ['alternativas'],
+    'comentario': ['comentario'],
+    'detalhes': ['detalhes'],
+    'imagens': ['imagens_enunciado', 'imagens_comentario', 'alternativas'],
+    'classificacao': ['materia', 'assunto', 'concurso', 'gabarito'],
+}
+
+
+def _digest(value):
+    canonical = json.dumps(value, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+    return hashlib.blake2b(canonical.encode('utf-8'), digest_size=8).hexdigest()
+
+
+def _field_values(record):
+    alternativas = record.get('alternativas') or []
+    return {
+        'enunciado': record.get('enunciado'),
+        'alternativas': [[alt.get('letter'), alt.get('text')] for alt in alternativas],
+        'comentario': record.get('comentario'),
+        'detalhes': record.get('detalhes') or {},
+        'imagens': [
+            record.get('imagens_enunciado') or [],
+            [[alt.get('letter'), alt.get('imagens') or []] for alt in alternativas],
+            record.get('imagens_comentario') or [],
+        ],
+        'classificacao': [record.get(k) for k in HASHED_FIELDS['classificacao']],
+    }
+
+
+def compute_field_hashes(record):
+    """Calcula o hash de cada grupo de campos da questão."""
+    return {field: _digest(value) for field, value in _field_values(record).items()}
+
+
+def combine_hashes(field_hashes):
+    """Hash geral do conteúdo a partir dos hashes por campo."""
+    joined = '|'.join(f"{field}={field_hashes[field]}" for field in sorted(field_hashes))
+    return hashlib.blake2b(joined.encode('utf-8'), digest_size=8).hexdigest()
+
+
+def idempotency_key(question_id, content_hash):
+    """Chave de idempotência de uma versão da questão."""
+    return f"{question_id}:{content_hash}"
+
+
+def annotate_record(record):
+    """Adiciona `content_hashes` e `idempotency_key` à questão (in-place) e a retorna."""
+    fields = compute_field_hashes(record)
+    content = combine_hashes(fields)
+    record['content_hashes'] = {'v': HASH_VERSION, 'campos': fields, 'conteudo': content}
+    record['idempotency_key'] = idempotency_key(record.get('id'), content)
+    return record
+
+
+def ensure_annotated(record):
+    """Garante que a questão tem hashes da versão atual (recalcula se faltarem)."""
+    hashes = record.get('content_hashes')
+    if not hashes or hashes.get('v') != HASH_VERSION:
+        annotate_record(record)
+    return record
+
+
+def batch_idempotency_key(records):
+    """Chave de idempotência de um lote (independe da ordem das questões)."""
+    keys = sorted(r.get('idempotency_key', '') for r in records)
+    return hashlib.blake2b('\n'.join(keys).encode('utf-8'), digest_size=16).hexdigest()
+
+
+# ============================================================================
+# ARMAZENAMENTO DE HASHES CONFIRMADOS
+# ============================================================================
+
+class HashStore:
+    """Hashes da última versão confirmada (ACK do webhook) de cada questão, em SQLite."""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS acked ("
+            " id TEXT PRIMARY KEY,"
+            " content_hash TEXT NOT NULL,"
+            " field_hashes TEXT NOT NULL,"
+            " acked_at REAL NOT NULL)"
+        )
+        self.conn.commit()
+
+    def get_many(self, question_ids):
+        """Retorna {id: (hash geral, hashes por campo)} para os IDs conhecidos."""
+        result = {}
+        ids = [str(i) for i in question_ids]
+        with self.lock:
+            for start in range(0, len(ids), 500):
+                chunk = ids[start:start + 500]
+                placeholders = ','.join('?' * len(chunk))
+                rows = self.conn.execute(
+                    f"SELECT id, content_hash, field_hashes FROM acked WHERE id IN ({placeholders})", chunk
+                )
+                for question_id, content_hash, field_hashes in rows:
+                    result[question_id] = (content_hash, json.loads(field_hashes))
+        return result
+
+    def ack(self, records):
+        """Registra as versões confirmadas de um lote de questões."""
+        now = time.time()
+        rows = []
+        for record in records:
+            hashes = record.get('content_hashes')
+            if not hashes:
+                continue
+            rows.append((str(record['id']), hashes['conteudo'], json.dumps(hashes['campos']), now))
+        if not rows:
+            return
+        with self.lock:
+            self.conn.executemany(
+                "INSERT INTO acked (id, content_hash, field_hashes, acked_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET content_hash=excluded.content_hash, "
+                "field_hashes=excluded.field_hashes, acked_at=excluded.acked_at",
+                rows,
+            )
+            self.conn.commit()
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+# ============================================================================
+# MODO DELTA
+# ============================================================================
+
+def delta_record(record, acked_fields):
+    """Monta o registro parcial com apenas os campos que mudaram desde o último ACK."""
+    fields = record['content_hashes']['campos']
+    changed = sorted(f for f, h in fields.items() if acked_fields.get(f) != h)
+
+    partial = {
+        'id': record['id'],
+        'delta': True,
+        'changed_fields': changed,
+        'content_hashes': record['content_hashes'],
+        'idempotency_key': record['idempotency_key'],
+        'extracted_at': record.get('extracted_at'),
+    }
+    for field in changed:
+        for key in HASHED_FIELDS[field]:
+            if key in record:
+                partial[key] = record[key]
+    return partial
+
+
+def plan_delta(records, store):
+    """
+    Separa o que precisa ser enviado.
+
+    Retorna (payload, full_records): `payload` contém questões novas inteiras e
+    registros parciais das alteradas; `full_records` são as versões completas
+    correspondentes, a confirmar no armazenamento após o ACK.
+    """
+    for record in records:
+        ensure_annotated(record)
+
+    known = store.get_many(r['id'] for r in records)
+    payload = []
+    full_records = []
+    for record in records:
+        previous = known.get(str(record['id']))
+        if previous is None:
+            payload.append(record)
+        elif previous[0] == record['content_hashes']['conteudo']:
+            continue
+        else:
+            payload.append(delta_record(record, previous[1]))
+        full_records.append(record)
+    return payload, full_records
@@ -0,0 +1,425 @@
+"""
+Canal de controle local por conta (substitui os `input()` de pausa).
+
+Cada conta registra um `WorkerControl` com seu próprio Event de retomada: uma
+conta pausada espera sozinha, sem segurar locks compartilhados, e as demais
+seguem em velocidade total.
+
+Comandos por conta: status, pause, resume, drain, stop
+- pause/resume: pausa no próximo ponto seguro / libera a conta
+- drain: termina a questão atual, envia o lote pendente e encerra normalmente
+- stop:  encerra já; o lote pendente fica no checkpoint para o --resume
+
+Os comandos chegam por:
+- HTTP em loopback, com o token da execução no cabeçalho X-Control-Token (gerado
+  a cada início, impresso no console e gravado em .control_token); pedidos com
+  cabeçalho Origin (vindos de uma página no navegador) são recusados
+- console: "resume conta1", "pause all", "status" ou ENTER (libera a etapa atual
+  ou retoma a única conta pausada)
+
+Cliente de linha de comando:
+    python control_plane.py status
+    python control_plane.py resume conta1
+    python control_plane.py barrier start
+"""
+import argparse
+import hmac
+import json
+import os
+import secrets
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+DEFAULT_TOKEN_FILE = '.control_token'
+TOKEN_HEADER = 'X-Control-Token'
+
+COMMANDS = ('pause', 'resume', 'drain', 'stop')
+
+STATE_STARTING = 'starting'
+STATE_RUNNING = 'running'
+STATE_PAUSED = 'paused'
+STATE_DRAINING = 'draining'
+STATE_STOPPED = 'stopped'
+
+
+class WorkerControl:
+    """Estado de controle de uma conta."""
+
+    def __init__(self, name):
+        self.name = name
+        self.state = STATE_STARTING
+        self.pause_reason = None
+        self.paused_since = None
+        self.pause_requested = False
+        self.drain_requested = False
+        self.stop_requested = False
+        self.resume_event = threading.Event()
+        self.info = {}
+        self.total_paused_s = 0.0
+
+    # --- comandos (chamados pelo operador) ---------------------------------
+
+    def pause(self, reason='operador'):
+        self.pause_requested = True
+        self.pause_reason = reason
+        self.resume_event.clear()
+
+    def resume(self):
+        self.pause_requested = False
+        self.resume_event.set()
+
+    def drain(self):
+        self.drain_requested = True
+        if self.state != STATE_STOPPED:
+            self.state = STATE_DRAINING
+        self.resume_event.set()
+
+    def stop(self):
+        self.stop_requested = True
+        self.resume_event.set()
+
+    # --- lado da conta -----------------------------------------------------
+
+    @property
+    def should_exit(self):
+        return self.stop_requested or self.drain_requested
+
+    def update(self, **info):
+        """Atualiza as informações exibidas no status (contadores, última questão)."""
+        self.info.update(info)
+
+    def set_running(self):
+        if self.state == STATE_STARTING:
+            self.state = STATE_RUNNING
+
+    def wait_if_paused(self):
+        """
+        Ponto seguro do loop: espera enquanto houver pausa pedida.
+        Retorna False se a conta deve encerrar (drain/stop).
+        """
+        if self.pause_requested and not self.should_exit:
+            self.wait_for_operator(self.pause_reason or 'operador')
+        return not self.should_exit
+
+    def wait_for_operator(self, reason):
+        """Pausa a conta até `resume`, `drain` ou `stop`. Retorna o tempo pausado."""
+        self.pause_requested = True
+        self.pause_reason = reason
+        self.resume_event.clear()
+        self.state = STATE_PAUSED
+        self.paused_since = time.time()
+
+        while not self.resume_event.wait(0.5):
+            if self.should_exit:
+                break
+
+        paused = time.time() - self.paused_since
+        self.total_paused_s += paused
+        self.pause_requested = False
+        self.pause_reason = None
+        self.paused_since = None
+        if self.state == STATE_PAUSED:
+            self.state = STATE_DRAINING if self.drain_requested else STATE_RUNNING
+        return paused
+
+    def finish(self):
+        self.state = STATE_STOPPED
+        self.resume_event.set()
+
+    def status(self):
+        status = {
+            'name': self.name,
+            'state': self.state,
+            'pause_reason': self.pause_reason,
+            'paused_for_s': round(time.time() - self.paused_since, 1) if self.paused_since else None,
+            'total_paused_s': round(self.total_paused_s, 1),
+            'drain_requested': self.drain_requested,
+            'stop_requested': self.stop_requested,
+        }
+        status.update(self.info)
+        return status
+
+
+class ControlPlane:
+    """Registro de contas + etapas globais (login/início), com servidor HTTP e console opcionais."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.workers = {}
+        self.barriers = {}
+        self.barrier_order = []
+        self.server = None
+        self.http_token = None
+        self.token_file = None
+
+    # --- registro ------------------------------------------------------------
+
+    def register(self, name):
+        with self.lock:
+            if name not in self.workers:
+                self.workers[name] = WorkerControl(name)
+            return self.workers[name]
+
+    def attach(self, name, worker):
+        """Registra um controle externo (ex.: WorkerProxy de uma conta em outro processo)."""
+        with self.lock:
+            self.workers[name] = worker
+            return worker
+
+    def get(self, name):
+        with self.lock:
+            return self.workers.get(name)
+
+    def statuses(self):
+        with self.lock:
+            workers = list(self.workers.values())
+        return {
+            'workers': [w.status() for w in workers],
+            'barriers': {name: event.is_set() for name, event in self.barriers.items()},
+        }
+
+    def command(self, target, command):
+        """Aplica um comando a uma conta (ou a todas com target='all'). Retorna as contas afetadas."""
+        if command not in COMMANDS:
+            raise ValueError(f"Comando desconhecido: {command}")
+        with self.lock:
+            if target == 'all':
+                targets = list(self.workers.values())
+            else:
+                targets = [self.workers[target]] if target in self.workers else []
+        for worker in targets:
+            getattr(worker, command)()
+        return [w.name for w in targets]
+
+    # --- etapas globais ------------------------------------------------------
+
+    def barrier(self, name):
+        with self.lock:
+            if name not in self.barriers:
+                self.barriers[name] = threading.Event()
+                self.barrier_order.append(name)
+            return self.barriers[name]
+
+    def release_barrier(self, name):
+        event = self.barrier(name)
+        event.set()
+
+    def wait_barrier(self, name, prompt):
+        """Aguarda a liberação de uma etapa (ENTER no console ou comando HTTP)."""
+        event = self.barrier(name)
+        print(prompt, end='', flush=True)
+        while not event.wait(0.5):
+            pass
+        print()
+
+    def _waiting_barrier(self):
+        with self.lock:
+            for name in self.barrier_order:
+                if not self.barriers[name].is_set():
+                    return name
+        return None
+
+    # --- console -------------------------------------------------------------
+
+    def handle_console_line(self, line):
+        """Interpreta uma linha digitada no console."""
+        parts = line.strip().split()
+        if not parts:
+            barrier = self._waiting_barrier()
+            if barrier:
+                self.release_barrier(barrier)
+                return
+            paused = [w for w in self.workers.values() if w.state == STATE_PAUSED]
+            if len(paused) == 1:
+                paused[0].resume()
+                print(f"▶️  [{paused[0].name}] retomada")
+            elif paused:
+                names = ', '.join(w.name for w in paused)
+                print(f"⚠️  Várias contas pausadas ({names}) - use: resume <conta> | resume all")
+            return
+
+        if parts[0] == 'status':
+            print_statuses(self.statuses())
+            return
+
+        if parts[0] in COMMANDS and len(parts) == 2:
+            affected = self.command(parts[1], parts[0])
+            print(f"✓ {parts[0]} → {', '.join(affected) if affected else 'nenhuma conta encontrada'}")
+            return
+
+        print("Comandos: status | pause|resume|drain|stop <conta|all> | ENTER")
+
+    def start_console(self):
+        """Lê comandos do stdin em uma thread própria (a única que lê o console)."""
+        def reader():
+            for line in sys.stdin:
+                try:
+                    self.handle_console_line(line)
+                except Exception as e:
+                    print(f"⚠️  Erro no comando: {e}")
+
+        thread = threading.Thread(target=reader, name="ControlConsole", daemon=True)
+        thread.start()
+        return thread
+
+    # --- HTTP ----------------------------------------------------------------
+
+    def start_http(self, host=DEFAULT_HOST, port=DEFAULT_PORT, token_file=DEFAULT_TOKEN_FILE):
+        """
+        Inicia o servidor HTTP de controle em loopback. Comandos (POST) exigem o
+        token desta execução em X-Control-Token; qualquer pedido com Origin é
+        recusado (uma página aberta no navegador não consegue mandar comandos).
+        """
+        plane = self
+        token = secrets.token_urlsafe(24)
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def _reply(self, code, body):
+                data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+                self.send_response(code)
+                self.send_header('Content-Type', 'application/json; charset=utf-8')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _allowed(self, require_token):
+                if self.headers.get('Origin') is not None:
+                    self._reply(403, {'error': 'origem não permitida'})
+                    return False
+                if require_token and not hmac.compare_digest(self.headers.get(TOKEN_HEADER, ''), token):
+                    self._reply(401, {'error': f'token inválido ({TOKEN_HEADER})'})
+                    return False
+                return True
+
+            def do_GET(self):
+                if not self._allowed(require_token=False):
+                    return
+                parts = [p for p in self.path.split('/') if p]
+                if parts in ([], ['status']):
+                    return self._reply(200, plane.statuses())
+                if len(parts) == 2 and parts[0] == 'workers':
+                    worker = plane.get(parts[1])
+                    if worker:
+                        return self._reply(200, worker.status())
+                return self._reply(404, {'error': 'não encontrado'})
+
+            def do_POST(self):
+                if not self._allowed(require_token=True):
+                    return
+                parts = [p for p in self.path.split('/') if p]
+                if len(parts) == 3 and parts[0] == 'workers' and parts[2] in COMMANDS:
+                    affected = plane.command(parts[1], parts[2])
+                    if affected:
+                        return self._reply(200, {'ok': True, 'workers': affected})
+                    return self._reply(404, {'error': 'conta não encontrada'})
+                if len(parts) == 2 and parts[0] == 'barriers':
+                    plane.release_barrier(parts[1])
+                    return self._reply(200, {'ok': True, 'barrier': parts[1]})
+                return self._reply(404, {'error': 'não encontrado'})
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.http_token = token
+        if token_file:
+            # Só o dono lê: o cliente (python control_plane.py ...) pega o token daqui
+            fd = os.open(token_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, 'w') as f:
+                f.write(token)
+            self.token_file = token_file
+        thread = threading.Thread(target=self.server.serve_forever, name="ControlHTTP", daemon=True)
+        thread.start()
+        return self.server
+
+    def shutdown(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+        if self.token_file:
+            try:
+                os.remove(self.token_file)
+            except OSError:
+                pass
+            self.token_file = None
+        self.http_token = None
+        self.token_file = None
+
+
+def print_statuses(statuses):
+    """Imprime o status de todas as contas."""
+    print("\n" + "="*70)
+    print("🎛️  STATUS DAS CONTAS")
+    print("="*70)
+    for worker in statuses['workers']:
+        line = f"  [{worker['name']}] {worker['state']}"
+        if worker.get('pause_reason'):
+            line += f" ({worker['pause_reason']}, {worker.get('paused_for_s')}s)"
+        if 'question_count' in worker:
+            line += f" - Novas: {worker['question_count']} | Puladas: {worker.get('skipped_count', 0)}"
+        print(line)
+    print("="*70 + "\n")
+
+
+# ============================================================================
+# CLIENTE
+# ============================================================================
+
+def _read_token(path=DEFAULT_TOKEN_FILE):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def _request(url, method='GET', token=None):
+    req = urllib.request.Request(url, method=method, data=b'' if method == 'POST' else None)
+    if token:
+        req.add_header(TOKEN_HEADER, token)
+    try:
+        with urllib.request.urlopen(req, timeout=5) as response:
+            return json.loads(response.read().decode('utf-8'))
+    except urllib.error.HTTPError as e:
+        return json.loads(e.read().decode('utf-8'))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Controle das contas de um scraper em execução")
+    parser.add_argument('command', choices=('status', 'barrier') + COMMANDS)
+    parser.add_argument('target', nargs='?', help="Nome da conta, 'all', ou nome da etapa (barrier)")
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--token', help=f"Token da execução (padrão: $CONTROL_TOKEN ou {DEFAULT_TOKEN_FILE})")
+    args = parser.parse_args()
+    token = args.token or os.environ.get('CONTROL_TOKEN') or _read_token()
+
+    base = f"http://{args.host}:{args.port}"
+    if args.command == 'status':
+        url = f"{base}/workers/{args.target}" if args.target else f"{base}/status"
+        result = _request(url)
+        if 'workers' in result:
+            print_statuses(result)
+        else:
+            print(json.dumps(result, ensure_ascii=False, indent=2))
+        return
+
+    if not args.target:
+        parser.error(f"{args.command} requer a conta (ou 'all') / nome da etapa")
+    if args.command == 'barrier':
+        print(json.dumps(_request(f"{base}/barriers/{args.target}", 'POST', token), ensure_ascii=False))
+    else:
+        print(json.dumps(_request(f"{base}/workers/{args.target}/{args.command}", 'POST', token),
+                         ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,422 @@
+"""
+Serviço local de deduplicação de IDs para vários processos/máquinas.
+
+Um daemon é dono do índice de IDs já extraídos; cada scraper consulta o
+daemon em vez de manter o próprio `shared_ids` baixado de /webhook/q. Assim
+as extrações novas de um processo são vistas pelos outros na hora, e só o
+daemon sincroniza com o webhook.
+
+Protocolo: uma linha JSON por requisição/resposta, em socket Unix ou TCP.
+Todas as operações recebem lotes de IDs:
+- contains {"ids": [...]}            -> [bool] já extraído
+- claim    {"ids": [...], "client"}  -> [bool] True = este cliente pode extrair
+                                        (reserva por `claim_ttl` segundos)
+- add      {"ids": [...]}            -> registra como extraídos (libera a reserva)
+- release  {"ids": [...], "client"}  -> desiste da reserva
+- stats                              -> tamanhos, reservas, última sincronização
+
+Persistência em <data>/:
+- upstream.bin  -> snapshot mmap da última sincronização com o webhook (id_snapshot.py)
+- added.log     -> IDs adicionados pelos clientes desde então (um por linha)
+
+Uso:
+    python dedup_service.py serve --listen unix:/tmp/tec_dedup.sock --data dedup/
+    python dedup_service.py serve --listen tcp:0.0.0.0:8766 --sync-interval 600
+    python dedup_service.py stats --connect unix:/tmp/tec_dedup.sock
+    python dedup_service.py bench --connect unix:/tmp/tec_dedup.sock --batch 50
+"""
+import argparse
+import json
+import os
+import signal
+import socket
+import socketserver
+import threading
+import time
+import uuid
+
+import requests
+
+from id_snapshot import IdSnapshot, write_id_snapshot
+
+DEFAULT_ADDRESS = 'unix:/tmp/tec_dedup.sock'
+DEFAULT_UPSTREAM = 'https://n8n.appcodigodavida.com.br/webhook/q'
+DEFAULT_CLAIM_TTL = 300
+DEFAULT_SYNC_INTERVAL = 900
+
+
+def parse_address(address):
+    """'unix:/caminho' -> (AF_UNIX, caminho); 'tcp:host:porta' ou 'host:porta' -> (AF_INET, (host, porta))."""
+    if address.startswith('unix:'):
+        return socket.AF_UNIX, address[5:]
+    if address.startswith('tcp:'):
+        address = address[4:]
+    host, _, port = address.rpartition(':')
+    return socket.AF_INET, (host or '127.0.0.1', int(port))
+
+
+# ============================================================================
+# ÍNDICE (LADO DO DAEMON)
+# ============================================================================
+
+class IdIndex:
+    """IDs extraídos + reservas temporárias, com persistência em disco."""
+
+    def __init__(self, data_dir, claim_ttl=DEFAULT_CLAIM_TTL):
+        self.data_dir = data_dir
+        self.claim_ttl = claim_ttl
+        self.lock = threading.Lock()
+        self.ids = set()
+        self.claims = {}
+        self.last_sync = None
+        self.upstream_count = 0
+        os.makedirs(data_dir, exist_ok=True)
+        self.upstream_path = os.path.join(data_dir, 'upstream.bin')
+        self.log_path = os.path.join(data_dir, 'added.log')
+
+        if os.path.exists(self.upstream_path):
+            snapshot = IdSnapshot(self.upstream_path)
+            self.ids.update(snapshot)
+            self.upstream_count = len(snapshot)
+            snapshot.close()
+        if os.path.exists(self.log_path):
+            with open(self.log_path, encoding='utf-8') as f:
+                self.ids.update(line.strip() for line in f if line.strip())
+        self.log = open(self.log_path, 'a', encoding='utf-8')
+
+    def contains(self, ids):
+        with self.lock:
+            return [str(i) in self.ids for i in ids]
+
+    def claim(self, ids, client):
+        now = time.time()
+        result = []
+        with self.lock:
+            for question_id in map(str, ids):
+                if question_id in self.ids:
+                    result.append(False)
+                    continue
+                holder = self.claims.get(question_id)
+                if holder and holder[0] != client and holder[1] > now:
+                    result.append(False)
+                    continue
+                self.claims[question_id] = (client, now + self.claim_ttl)
+                result.append(True)
+        return result
+
+    def add(self, ids):
+        added = 0
+        with self.lock:
+            for question_id in map(str, ids):
+                self.claims.pop(question_id, None)
+                if question_id not in self.ids:
+                    self.ids.add(question_id)
+                    self.log.write(question_id + '\n')
+                    added += 1
+            if added:
+                self.log.flush()
+        return added
+
+    def release(self, ids, client):
+        with self.lock:
+            for question_id in map(str, ids):
+                holder = self.claims.get(question_id)
+                if holder and holder[0] == client:
+                    del self.claims[question_id]
+        return True
+
+    def expire_claims(self):
+        now = time.time()
+        with self.lock:
+            for question_id in [i for i, (_, expires) in self.claims.items() if expires <= now]:
+                del self.claims[question_id]
+
+    def stats(self):
+        with self.lock:
+            return {
+                'ids': len(self.ids),
+                'upstream': self.upstream_count,
+                'claims': len(self.claims),
+                'last_sync': self.last_sync,
+            }
+
+    def sync_upstream(self, url, timeout=60):
+        """Baixa a lista do webhook, regrava o snapshot e compacta o added.log."""
+        response = requests.get(url, timeout=timeout)
+        response.raise_for_status()
+        upstream = {str(item['id']) for item in response.json() if 'id' in item}
+        write_id_snapshot(self.upstream_path, upstream)
+
+        with self.lock:
+            new = len(upstream - self.ids)
+            self.ids |= upstream
+            # IDs que o webhook já conhece não precisam mais ficar no log local
+            local = [i for i in self.ids if i not in upstream]
+            self.log.close()
+            temp = self.log_path + '.tmp'
+            with open(temp, 'w', encoding='utf-8') as f:
+                f.writelines(i + '\n' for i in local)
+            os.replace(temp, self.log_path)
+            self.log = open(self.log_path, 'a', encoding='utf-8')
+            self.upstream_count = len(upstream)
+            self.last_sync = time.time()
+        return len(upstream), new
+
+    def close(self):
+        with self.lock:
+            self.log.flush()
+            os.fsync(self.log.fileno())
+            self.log.close()
+
+
+def _handler_for(index):
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            for line in self.rfile:
+                try:
+                    request = json.loads(line)
+                    op = request.get('op')
+                    ids = request.get('ids', [])
+                    if op == 'contains':
+                        result = index.contains(ids)
+                    elif op == 'claim':
+                        result = index.claim(ids, request.get('client'))
+                    elif op == 'add':
+                        result = index.add(ids)
+                    elif op == 'release':
+                        result = index.release(ids, request.get('client'))
+                    elif op == 'stats':
+                        result = index.stats()
+                    else:
+                        raise ValueError(f"operação desconhecida: {op}")
+                    reply = {'ok': True, 'result': result}
+                except Exception as e:
+                    reply = {'ok': False, 'error': str(e)}
+                self.wfile.write(json.dumps(reply, separators=(',', ':')).encode('utf-8') + b'\n')
+                self.wfile.flush()
+    return Handler
+
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class _TcpServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def server_bind(self):
+        self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        super().server_bind()
+
+
+def serve(address, index, upstream=None, sync_interval=DEFAULT_SYNC_INTERVAL):
+    """Inicia o daemon (bloqueia). Sincroniza com o webhook em uma thread própria."""
+    family, target = parse_address(address)
+    if family == socket.AF_UNIX:
+        if os.path.exists(target):
+            os.unlink(target)
+        server = _UnixServer(target, _handler_for(index))
+    else:
+        server = _TcpServer(target, _handler_for(index))
+
+    stop_event = threading.Event()
+
+    def maintenance():
+        next_sync = time.time() if upstream and index.last_sync is None else time.time() + sync_interval
+        while not stop_event.wait(5):
+            index.expire_claims()
+            if upstream and time.time() >= next_sync:
+                try:
+                    total, new = index.sync_upstream(upstream)
+                    print(f"🔄 Webhook: {total} IDs ({new} novos para o daemon)")
+                except Exception as e:
+                    print(f"⚠️  Falha ao sincronizar com o webhook: {e}")
+                next_sync = time.time() + sync_interval
+
+    def on_term(signum, frame):
+        raise KeyboardInterrupt
+
+    signal.signal(signal.SIGTERM, on_term)
+    threading.Thread(target=maintenance, name="DedupMaintenance", daemon=True).start()
+    print(f"🧮 Dedup: {index.stats()['ids']} IDs | escutando em {address}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop_event.set()
+        server.server_close()
+        index.close()
+        if family == socket.AF_UNIX and os.path.exists(target):
+            os.unlink(target)
+
+
+# ============================================================================
+# CLIENTE
+# ============================================================================
+
+class DedupClient:
+    """Conexão persistente com o daemon (thread-safe: uma requisição por vez)."""
+
+    def __init__(self, address=DEFAULT_ADDRESS, timeout=5, client_id=None):
+        self.address = address
+        self.timeout = timeout
+        self.client_id = client_id or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self.lock = threading.Lock()
+        self.sock = None
+        self.reader = None
+
+    def _connect(self):
+        family, target = parse_address(self.address)
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        if family == socket.AF_INET:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        sock.connect(target)
+        self.sock = sock
+        self.reader = sock.makefile('rb')
+
+    def _call(self, op, **fields):
+        request = json.dumps(dict(fields, op=op), separators=(',', ':')).encode('utf-8') + b'\n'
+        with self.lock:
+            for attempt in (1, 2):
+                try:
+                    if self.sock is None:
+                        self._connect()
+                    self.sock.sendall(request)
+                    line = self.reader.readline()
+                    if not line:
+                        raise ConnectionError("conexão fechada pelo daemon")
+                    break
+                except OSError:
+                    self.close_socket()
+                    if attempt == 2:
+                        raise
+        reply = json.loads(line)
+        if not reply.get('ok'):
+            raise RuntimeError(f"dedup: {reply.get('error')}")
+        return reply['result']
+
+    def contains(self, ids):
+        return self._call('contains', ids=list(ids))
+
+    def claim(self, ids):
+        return self._call('claim', ids=list(ids), client=self.client_id)
+
+    def add(self, ids):
+        return self._call('add', ids=list(ids))
+
+    def release(self, ids):
+        return self._call('release', ids=list(ids), client=self.client_id)
+
+    def stats(self):
+        return self._call('stats')
+
+    def close_socket(self):
+        if self.sock is not None:
+            try:
+                self.reader.close()
+                self.sock.close()
+            except OSError:
+                pass
+        self.sock = None
+        self.reader = None
+
+
+class ServiceIdIndex:
+    """
+    Substitui o `shared_ids` do scraper: `id in index` reserva o ID no daemon
+    (False = esta conta pode extrair) e `index.add(id)` o registra como extraído.
+    Se o daemon cair, segue com um conjunto local (no pior caso, extrai de novo
+    uma questão que outro processo já pegou) e volta a usá-lo quando responder.
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self.local = set()
+        self.unsent = []
+        self.offline = False
+
+    def _call(self, method, ids):
+        try:
+            result = getattr(self.client, method)(ids)
+        except (OSError, RuntimeError) as e:
+            if not self.offline:
+                print(f"⚠️  Dedup indisponível ({e}) - usando conjunto local até reconectar")
+            self.offline = True
+            return None
+        if self.offline:
+            self.offline = False
+            print("🧮 Dedup reconectado")
+            unsent, self.unsent = self.unsent, []
+            if unsent and self._call('add', unsent) is None:
+                self.unsent.extend(unsent)
+        return result
+
+    def __contains__(self, question_id):
+        question_id = str(question_id)
+        if question_id in self.local:
+            return True
+        result = self._call('claim', [question_id])
+        return not result[0] if result is not None else False
+
+    def add(self, question_id):
+        question_id = str(question_id)
+        self.local.add(question_id)
+        if self._call('add', [question_id]) is None:
+            self.unsent.append(question_id)
+
+    def __len__(self):
+        try:
+            return self.client.stats()['ids']
+        except (OSError, RuntimeError):
+            return len(self.local)
+
+
+# ============================================================================
+# CLI
+# ============================================================================
+
+def run_benchmark(address, batch, calls):
+    client = DedupClient(address)
+    ids = [f"bench-{uuid.uuid4().hex[:8]}-{i}" for i in range(batch)]
+    client.contains(ids)
+    for op in ('contains', 'claim'):
+        started = time.perf_counter()
+        for _ in range(calls):
+            getattr(client, op)(ids)
+        elapsed = time.perf_counter() - started
+        print(f"  {op:9} lote de {batch:4}: {elapsed / calls * 1e6:8.1f} µs/chamada | "
+              f"{elapsed / (calls * batch) * 1e6:6.2f} µs/ID")
+    client.release(ids)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serviço de deduplicação de IDs compartilhado")
+    sub = parser.add_subparsers(dest='command', required=True)
+    p_serve = sub.add_parser('serve', help="Inicia o daemon")
+    p_serve.add_argument('--listen', default=DEFAULT_ADDRESS, help="unix:/caminho ou tcp:host:porta")
+    p_serve.add_argument('--data', default='dedup_data', help="Diretório de persistência")
+    p_serve.add_argument('--upstream', default=DEFAULT_UPSTREAM, help="URL da lista de IDs ('' desativa)")
+    p_serve.add_argument('--sync-interval', type=int, default=DEFAULT_SYNC_INTERVAL)
+    p_serve.add_argument('--claim-ttl', type=int, default=DEFAULT_CLAIM_TTL)
+    p_stats = sub.add_parser('stats', help="Estado do daemon")
+    p_stats.add_argument('--connect', default=DEFAULT_ADDRESS)
+    p_bench = sub.add_parser('bench', help="Latência das chamadas em lote")
+    p_bench.add_argument('--connect', default=DEFAULT_ADDRESS)
+    p_bench.add_argument('--batch', type=int, default=50)
+    p_bench.add_argument('--calls', type=int, default=2000)
+    args = parser.parse_args()
+
+    if args.command == 'serve':
+        serve(args.listen, IdIndex(args.data, args.claim_ttl), args.upstream or None, args.sync_interval)
+    elif args.command == 'stats':
+        print(json.dumps(DedupClient(args.connect).stats(), indent=2))
+    else:
+        for batch in sorted({1, args.batch}):
+            run_benchmark(args.connect, batch, args.calls)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""
+Detector de deriva de esquema: taxa de preenchimento por campo em janela móvel.
+
+Quando o layout do site muda, `extract_question_data` continua devolvendo
+questões, mas com valores sentinela ("Matéria não encontrada", "Sem
+classificação", `detalhes = {}`...). Este módulo acompanha, por conta, as
+últimas `window` questões e sinaliza `schema_drift` quando algum campo fica
+abaixo do limite mínimo de preenchimento.
+
+Cada conta tem sua própria janela (deque + contadores), atualizada em O(1) por
+questão. Um lock protege as janelas: `observe` roda na thread da conta, mas
+`reset` também é chamado pela conta que pausa as demais (DRIFT_ALL_ACCOUNTS).
+
+`observe` devolve o relatório enquanto a janela estiver abaixo do limite;
+`set_alerting` diz quando a conta entra ou sai desse estado, para avisar uma
+vez por episódio e não a cada questão.
+"""
+import json
+import os
+import threading
+from collections import deque
+from datetime import datetime
+
+CONDITION = 'schema_drift'
+
+SENTINELS = {
+    'materia': {'Matéria não encontrada'},
+    'assunto': {'Sem classificação'},
+    'concurso': {'Concurso não encontrado'},
+    'enunciado': {'Enunciado não encontrado'},
+}
+
+
+def _filled_text(field):
+    sentinels = SENTINELS.get(field, set())
+
+    def check(record):
+        value = record.get(field)
+        return bool(value) and value not in sentinels
+    return check
+
+
+# Campo -> função que diz se a questão tem o campo preenchido de verdade
+FIELD_CHECKS = {
+    'materia': _filled_text('materia'),
+    'assunto': _filled_text('assunto'),
+    'concurso': _filled_text('concurso'),
+    'enunciado': _filled_text('enunciado'),
+    'gabarito': lambda r: bool(r.get('gabarito')),
+    'comentario': lambda r: bool(r.get('comentario')),
+    'detalhes': lambda r: bool(r.get('detalhes')),
+    'alternativas': lambda r: len(r.get('alternativas') or []) >= 2,
+}
+
+# Taxa mínima de preenchimento por campo na janela (comentário falta com frequência)
+DEFAULT_THRESHOLDS = {
+    'materia': 0.90,
+    'assunto': 0.80,
+    'concurso': 0.80,
+    'enunciado': 0.95,
+    'gabarito': 0.80,
+    'comentario': 0.10,
+    'detalhes': 0.70,
+    'alternativas': 0.95,
+}
+
+
+class AccountWindow:
+    """Janela móvel das últimas questões de uma conta."""
+
+    def __init__(self, window):
+        self.window = window
+        self.rows = deque()
+        self.filled = {field: 0 for field in FIELD_CHECKS}
+        self.total = 0
+        self.snapshots = 0
+        self.alerting = False
+
+    def add(self, flags):
+        self.rows.append(flags)
+        for field, ok in flags.items():
+            self.filled[field] += ok
+        if len(self.rows) > self.window:
+            old = self.rows.popleft()
+            for field, ok in old.items():
+                self.filled[field] -= ok
+        self.total += 1
+
+    def rates(self):
+        n = len(self.rows)
+        return {field: self.filled[field] / n for field in FIELD_CHECKS} if n else {}
+
+
+class FillRateMonitor:
+    """Taxas de preenchimento por campo e por conta, com limites mínimos."""
+
+    def __init__(self, window=50, min_samples=20, thresholds=None, checks=None):
+        self.window = window
+        # `checks` troca a verificação de campos de FIELD_CHECKS (mesmas chaves)
+        self.checks = dict(FIELD_CHECKS)
+        if checks:
+            self.checks.update(checks)
+        self.min_samples = min_samples
+        self.thresholds = dict(DEFAULT_THRESHOLDS)
+        if thresholds:
+            self.thresholds.update(thresholds)
+        self.accounts = {}
+        self.lock = threading.Lock()
+
+    def _account(self, account):
+        if account not in self.accounts:
+            self.accounts[account] = AccountWindow(self.window)
+        return self.accounts[account]
+
+    def observe(self, account, record):
+        """
+        Registra uma questão. Retorna (campos_faltando, relatório_de_deriva).
+        O relatório é None enquanto todas as taxas estão acima dos limites.
+        """
+        flags = {field: check(record) for field, check in self.checks.items()}
+        missing = [field for field, ok in flags.items() if not ok]
+        with self.lock:
+            window = self._account(account)
+            window.add(flags)
+            size = len(window.rows)
+            rates = window.rates()
+
+        if size < self.min_samples:
+            return missing, None
+        failing = {
+            field: round(rate, 3) for field, rate in rates.items()
+            if rate < self.thresholds.get(field, 0.0)
+        }
+        if not failing:
+            return missing, None
+        return missing, {
+            'condition': CONDITION,
+            'account': account,
+            'window': size,
+            'failing': failing,
+            'thresholds': {field: self.thresholds[field] for field in failing},
+            'rates': {field: round(rate, 3) for field, rate in rates.items()},
+        }
+
+    def reset(self, account):
+        """Recomeça a janela da conta (ex.: depois que o operador corrigiu o problema)."""
+        with self.lock:
+            snapshots = self._account(account).snapshots
+            self.accounts[account] = AccountWindow(self.window)
+            self.accounts[account].snapshots = snapshots
+
+    def set_alerting(self, account, alerting):
+        """Atualiza o estado de alerta da conta. True se mudou (entrou ou saiu de schema_drift)."""
+        with self.lock:
+            window = self._account(account)
+            changed = window.alerting != alerting
+            window.alerting = alerting
+            return changed
+
+    def should_snapshot(self, account, limit):
+        """True (e conta o snapshot) se a conta ainda não atingiu o limite de snapshots."""
+        with self.lock:
+            window = self._account(account)
+            if window.snapshots >= limit:
+                return False
+            window.snapshots += 1
+            return True
+
+
+def write_snapshot(out_dir, account, record, missing, page_source=None, url=None, report=None):
+    """Grava HTML da página, a questão extraída e o contexto em <out_dir>/drift_<conta>_<ts>/."""
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+    path = os.path.join(out_dir, f"drift_{account.replace(' ', '_')}_{timestamp}")
+    os.makedirs(path, exist_ok=True)
+    if page_source is not None:
+        with open(os.path.join(path, 'page.html'), 'w', encoding='utf-8') as f:
+            f.write(page_source)
+    with open(os.path.join(path, 'record.json'), 'w', encoding='utf-8') as f:
+        json.dump(record, f, ensure_ascii=False, indent=2)
+    with open(os.path.join(path, 'context.json'), 'w', encoding='utf-8') as f:
+        json.dump({'account': account, 'url': url, 'missing': missing, 'report': report,
+                   'ts': datetime.now().isoformat(timespec='seconds')}, f, ensure_ascii=False, indent=2)
+    return path
@@ -0,0 +1,110 @@
+"""
+Resolução do chromedriver uma única vez por processo, com cache em disco.
+
+Mesma ordem do setup_driver original:
+1. `chromedriver` no PATH
+2. caminho gravado no cache em disco (se o arquivo ainda existe e o cache não expirou)
+3. None -> o Selenium resolve sozinho (Selenium Manager)
+4. só se o Chrome não abrir com os passos anteriores: webdriver-manager
+   (`install_chromedriver`, download/verificação de versão pela rede), gravando
+   o resultado no cache para as próximas contas e execuções
+
+As threads das contas chamam `resolve_chromedriver` ao mesmo tempo; só a
+primeira faz o trabalho, as demais esperam o lock e recebem o mesmo resultado.
+webdriver-manager só é importado quando o passo 4 é necessário.
+"""
+import json
+import os
+import shutil
+import threading
+import time
+
+DEFAULT_CACHE_PATH = '.chromedriver_cache.json'
+DEFAULT_MAX_AGE = 24 * 3600
+
+_lock = threading.Lock()
+_resolved = {}
+
+
+def _read_cache(cache_path, max_age):
+    try:
+        with open(cache_path, encoding='utf-8') as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if max_age is not None and time.time() - cached.get('resolved_at', 0) > max_age:
+        return None
+    path = cached.get('path')
+    if path and os.path.isfile(path) and os.access(path, os.X_OK):
+        return path
+    return None
+
+
+def _write_cache(cache_path, path):
+    try:
+        with open(cache_path, 'w', encoding='utf-8') as f:
+            json.dump({'path': path, 'resolved_at': time.time()}, f)
+    except OSError:
+        pass
+
+
+def _resolve(cache_path, max_age, logger):
+    path = shutil.which('chromedriver')
+    if path:
+        return path, 'PATH'
+
+    path = _read_cache(cache_path, max_age)
+    if path:
+        return path, 'cache'
+
+    return None, 'selenium-manager'
+
+
+def resolve_chromedriver(cache_path=DEFAULT_CACHE_PATH, max_age=DEFAULT_MAX_AGE, logger=None):
+    """
+    Retorna o caminho do chromedriver (ou None para deixar o Selenium resolver).
+    Resolvido uma vez por processo; chamadas seguintes retornam o mesmo resultado.
+    """
+    with _lock:
+        if cache_path not in _resolved:
+            started = time.perf_counter()
+            path, source = _resolve(cache_path, max_age, logger)
+            _resolved[cache_path] = path
+            if logger:
+                logger.info(f"🔧 chromedriver: {path or 'automático'} (via {source}, "
+                            f"{time.perf_counter() - started:.2f}s)")
+        return _resolved[cache_path]
+
+
+def install_chromedriver(cache_path=DEFAULT_CACHE_PATH, logger=None):
+    """
+    Fallback quando o Chrome não abriu com o PATH/cache/Selenium Manager: baixa o
+    chromedriver pelo webdriver-manager (uma vez por processo) e o grava no cache.
+    Retorna o caminho ou None se o webdriver-manager também falhar.
+    """
+    with _lock:
+        if _resolved.get(cache_path):
+            return _resolved[cache_path]
+        started = time.perf_counter()
+        try:
+            from webdriver_manager.chrome import ChromeDriverManager
+            path = ChromeDriverManager().install()
+        except Exception as e:
+            if logger:
+                logger.error(f"webdriver-manager indisponível: {e}")
+            return None
+        _resolved[cache_path] = path
+        _write_cache(cache_path, path)
+        if logger:
+            logger.info(f"🔧 chromedriver: {path} (via webdriver-manager, {time.perf_counter() - started:.2f}s)")
+        return path
+
+
+def invalidate_chromedriver(cache_path=DEFAULT_CACHE_PATH):
+    """Descarta o caminho resolvido (ex.: driver incompatível após atualização do Chrome)."""
+    with _lock:
+        _resolved[cache_path] = None
+        try:
+            os.remove(cache_path)
+        except OSError:
+            pass
@@ -0,0 +1,288 @@
+"""
+Campos derivados calculados uma vez, na saída do scraper.
+
+O app refaz a cada leitura o parse de `alternativas` (parsedAlternativas), o
+tipo da questão etc. Este estágio calcula esses valores em lote e os grava junto
+da questão, em `derivados`:
+
+    {"versao": 1,
+     "alternativas": [{"letter": "A", "text": "..."}],   # parsedAlternativas
+     "n_alternativas": 5,
+     "tipo": "multipla_escolha" | "certo_errado" | "indefinido",
+     "gabarito": "A",                                     # letra da alternativa correta
+     "tamanho_enunciado": 812, "tamanho_comentario": 2210, "tamanho_alternativas": 640,
+     "tem_imagens_enunciado": false, "tem_imagens_alternativas": false,
+     "tem_imagens_comentario": true, "tem_imagens": true,
+     "ano": 2019}
+
+O lote é processado coluna a coluna: cada campo é calculado para todas as
+questões de uma vez, e o tipo e o ano são memorizados por valor distinto
+(poucas combinações se repetem muito). Questões que já têm `derivados` na
+versão atual são puladas.
+
+O gabarito segue o normalizeGabarito do app: em Certo/Errado com alternativas
+"Certo"/"Errado", C/E viram a letra da alternativa correspondente.
+
+Uso:
+    python enrichment.py enrich output/*.jsonl -o enriquecidas.jsonl --workers 4
+    python enrichment.py bench --records 50000          # questões sintéticas
+    python enrichment.py bench output/ --records 20000
+"""
+import argparse
+import json
+import re
+import time
+from multiprocessing import Pool
+
+from columnar_export import detalhes_value, strip_accents
+from records_io import dumps_record, expand_paths, iter_file_records, iter_records, open_text
+
+DERIVED_VERSION = 2
+DEFAULT_BATCH_SIZE = 2000
+
+TYPE_MULTIPLE = 'multipla_escolha'
+TYPE_TRUE_FALSE = 'certo_errado'
+TYPE_UNKNOWN = 'indefinido'
+
+YEAR_RE = re.compile(r'\b(19[5-9]\d|20\d\d)\b')
+TRUE_FALSE_TEXTS = {'certo', 'errado'}
+TRUE_FALSE_GABARITO = {'C': 'C', 'E': 'E', 'CERTO': 'C', 'ERRADO': 'E'}
+
+
+def parse_alternativas(alternativas):
+    """
+    Lista ou string JSON -> [{'letter', 'text'}]. Aceita letter/letra e
+    text/texto/conteudo; letra em maiúscula sem ")"/"." e, se faltar, pela posição.
+    """
+    if not alternativas:
+        return []
+    if isinstance(alternativas, str):
+        try:
+            alternativas = json.loads(alternativas)
+        except ValueError:
+            return []
+    if not isinstance(alternativas, list):
+        return []
+    parsed = []
+    for index, alt in enumerate(alternativas):
+        fallback = chr(65 + index)
+        if isinstance(alt, str):
+            parsed.append({'letter': fallback, 'text': alt})
+            continue
+        if not isinstance(alt, dict):
+            continue
+        letter = str(alt.get('letter') or alt.get('letra') or fallback).strip().rstrip(').').upper() or fallback
+        parsed.append({'letter': letter, 'text': alt.get('text') or alt.get('texto') or alt.get('conteudo') or ''})
+    return parsed
+
+
+def _question_type(letters, texts, gabarito, tipo_detalhe):
+    if len(letters) == 2 and (set(letters) == {'C', 'E'} or set(texts) == TRUE_FALSE_TEXTS):
+        return TYPE_TRUE_FALSE
+    if len(letters) >= 3:
+        return TYPE_MULTIPLE
+    tipo = strip_accents(tipo_detalhe or '').lower()
+    if 'certo' in tipo:
+        return TYPE_TRUE_FALSE
+    if 'multipla' in tipo:
+        return TYPE_MULTIPLE
+    if gabarito in ('CERTO', 'ERRADO'):
+        return TYPE_TRUE_FALSE
+    return TYPE_UNKNOWN
+
+
+def _normalize_gabarito(gabarito, tipo, alternativas):
+    if not gabarito:
+        return None
+    value = gabarito.upper().replace('LETRA', '').strip().rstrip(').')
+    if any(a['letter'] == value for a in alternativas) or tipo != TYPE_TRUE_FALSE:
+        return value
+    value = TRUE_FALSE_GABARITO.get(value, value)
+    # Como o app: C/E apontam para a alternativa com o texto "Certo"/"Errado"
+    wanted = {'C': 'certo', 'E': 'errado'}.get(value)
+    for alt in alternativas:
+        if alt['text'].strip().lower() == wanted:
+            return alt['letter']
+    return value
+
+
+def _year(text):
+    if not text:
+        return None
+    years = YEAR_RE.findall(str(text))
+    return int(years[-1]) if years else None
+
+
+def _has_alternative_images(alternativas):
+    return isinstance(alternativas, list) and any(isinstance(a, dict) and a.get('imagens') for a in alternativas)
+
+
+def enrich_batch(records, force=False):
+    """Calcula `derivados` para as questões do lote (no próprio dicionário). Retorna o lote."""
+    todo = [r for r in records if force or (r.get('derivados') or {}).get('versao') != DERIVED_VERSION]
+    if not todo:
+        return records
+
+    alternativas = [parse_alternativas(r.get('alternativas')) for r in todo]
+    n_alternativas = [len(alts) for alts in alternativas]
+    raw_gabaritos = [(r.get('gabarito') or '').strip().upper() for r in todo]
+    detalhes = [r.get('detalhes') or {} for r in todo]
+
+    type_cache = {}
+    tipos = []
+    for alts, gabarito, det in zip(alternativas, raw_gabaritos, detalhes):
+        letters = tuple(a['letter'] for a in alts)
+        texts = tuple(a['text'].strip().lower() for a in alts) if len(alts) == 2 else ()
+        key = (letters, texts, gabarito, detalhes_value(det, 'tipo'))
+        tipo = type_cache.get(key)
+        if tipo is None:
+            tipo = type_cache[key] = _question_type(*key)
+        tipos.append(tipo)
+    gabaritos = [_normalize_gabarito(g, t, alts) for g, t, alts in zip(raw_gabaritos, tipos, alternativas)]
+
+    year_cache = {}
+    anos = []
+    for record, det in zip(todo, detalhes):
+        source = detalhes_value(det, 'ano') or record.get('concurso')
+        if source not in year_cache:
+            year_cache[source] = _year(source)
+        anos.append(year_cache[source])
+
+    tamanho_enunciado = [len(r.get('enunciado') or '') for r in todo]
+    tamanho_comentario = [len(r.get('comentario') or '') for r in todo]
+    tamanho_alternativas = [sum(len(a['text']) for a in alts) for alts in alternativas]
+    img_enunciado = [bool(r.get('imagens_enunciado')) for r in todo]
+    img_comentario = [bool(r.get('imagens_comentario')) for r in todo]
+    img_alternativas = [_has_alternative_images(r.get('alternativas')) for r in todo]
+
+    columns = (alternativas, n_alternativas, tipos, gabaritos, tamanho_enunciado, tamanho_comentario,
+               tamanho_alternativas, img_enunciado, img_alternativas, img_comentario, anos)
+    for record, (alts, n, tipo, gabarito, t_enun, t_com, t_alt, i_enun, i_alt, i_com, ano) in zip(todo, zip(*columns)):
+        record['derivados'] = {
+            'versao': DERIVED_VERSION,
+            'alternativas': alts,
+            'n_alternativas': n,
+            'tipo': tipo,
+            'gabarito': gabarito,
+            'tamanho_enunciado': t_enun,
+            'tamanho_comentario': t_com,
+            'tamanho_alternativas': t_alt,
+            'tem_imagens_enunciado': i_enun,
+            'tem_imagens_alternativas': i_alt,
+            'tem_imagens_comentario': i_com,
+            'tem_imagens': i_enun or i_alt or i_com,
+            'ano': ano,
+        }
+    return records
+
+
+def enrich_record(record, force=False):
+    """Uma única questão (usado pelo scraper durante a extração)."""
+    return enrich_batch([record], force)[0]
+
+
+def iter_batches(records, size):
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _enrich_lines(batch):
+    # Processo auxiliar: entra e sai JSON (mais barato que fazer pickle dos dicionários)
+    return [dumps_record(r) for r in enrich_batch([json.loads(line) for line in batch])]
+
+
+def _iter_lines(paths):
+    """Linhas JSON das questões; JSONL passa direto, sem parse no processo principal."""
+    for path in expand_paths(paths):
+        base = path[:-3] if path.endswith('.gz') else path
+        if base.endswith('.jsonl'):
+            with open_text(path) as f:
+                yield from (line for line in f if line.strip())
+        else:
+            yield from (dumps_record(r) for r in iter_file_records(path))
+
+
+def enrich_files(paths, output, batch_size=DEFAULT_BATCH_SIZE, workers=1):
+    """Enriquece arquivos de questões em `output` (JSONL). Retorna quantas foram gravadas."""
+    count = 0
+    with open_text(output, 'wt') as f:
+        if workers > 1:
+            with Pool(workers) as pool:
+                for result in pool.imap(_enrich_lines, iter_batches(_iter_lines(paths), batch_size)):
+                    f.writelines(line + '\n' for line in result)
+                    count += len(result)
+        else:
+            for batch in iter_batches(iter_records(paths), batch_size):
+                f.writelines(dumps_record(r) + '\n' for r in enrich_batch(batch))
+                count += len(batch)
+    return count
+
+
+def run_benchmark(records, batch_size, workers):
+    """Questões/s: uma a uma x em lote x lote em vários processos; custo de leitura no cliente."""
+    def timed(label, func):
+        started = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - started
+        print(f"  {label:34} {len(records) / elapsed:10,.0f} q/s")
+
+    print(f"{len(records)} questões, lotes de {batch_size}")
+    timed("uma a uma (enrich_record)", lambda: [enrich_record(r, force=True) for r in records])
+    timed("em lote (enrich_batch)",
+          lambda: [enrich_batch(b, force=True) for b in iter_batches(records, batch_size)])
+    if workers > 1:
+        lines = [dumps_record(r) for r in records]
+        with Pool(workers) as pool:
+            pool.map(_enrich_lines, [lines[:10]] * workers)
+            timed(f"em lote, {workers} processos (com JSON)",
+                  lambda: list(pool.imap(_enrich_lines, iter_batches(lines, batch_size))))
+
+    # O que cada cliente deixa de fazer: parse do JSON de alternativas a cada leitura
+    as_strings = [json.dumps(r.get('alternativas') or [], ensure_ascii=False) for r in records]
+    timed("cliente: parse de alternativas", lambda: [parse_alternativas(s) for s in as_strings])
+    timed("cliente: ler `derivados` pronto", lambda: [r['derivados']['alternativas'] for r in records])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Campos derivados das questões")
+    sub = parser.add_subparsers(dest='command', required=True)
+    p_enrich = sub.add_parser('enrich', help="Grava as questões com `derivados`")
+    p_enrich.add_argument('inputs', nargs='+', help="Arquivos/diretórios/padrões de questões")
+    p_enrich.add_argument('-o', '--output', required=True, help="JSONL de saída (.gz comprime)")
+    p_enrich.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    p_enrich.add_argument('--workers', type=int, default=1, help="Processos (lotes em paralelo)")
+    p_bench = sub.add_parser('bench', help="Vazão do estágio")
+    p_bench.add_argument('inputs', nargs='*', help="Arquivos de questões (padrão: sintéticas)")
+    p_bench.add_argument('--records', type=int, default=50000)
+    p_bench.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    p_bench.add_argument('--workers', type=int, default=1, help="Mede também o lote em N processos")
+    args = parser.parse_args()
+
+    if args.command == 'enrich':
+        started = time.time()
+        count = enrich_files(args.inputs, args.output, args.batch_size, args.workers)
+        elapsed = time.time() - started
+        print(f"🧮 {count} questões enriquecidas em {elapsed:.1f}s ({count / max(elapsed, 1e-9):,.0f} q/s) "
+              f"→ {args.output}")
+        return
+
+    if args.inputs:
+        records = []
+        for record in iter_records(args.inputs):
+            records.append(record)
+            if len(records) >= args.records:
+                break
+    else:
+        from record_codec import synthetic_records
+        records = synthetic_records(args.records)
+    run_benchmark(records, args.batch_size, args.workers)
+
+
+if __name__ == "__main__":
+    main()
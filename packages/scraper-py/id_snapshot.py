@@ -0,0 +1,88 @@
+"""
+Snapshot somente leitura do índice de IDs, mapeado em memória (mmap).
+
+Usado no modo multiprocesso: o supervisor grava o arquivo uma vez e cada
+processo de conta o mapeia, compartilhando as mesmas páginas do cache do SO
+em vez de cada um manter uma cópia do set de IDs.
+
+Layout (little-endian):
+- cabeçalho: magic (8 bytes), nº de IDs numéricos (u64), tamanho do bloco extra (u64)
+- IDs numéricos ordenados, u64 cada (busca binária direto no mmap)
+- bloco extra: IDs não numéricos em UTF-8, um por linha (carregados em um set)
+"""
+import mmap
+import os
+import struct
+from array import array
+from bisect import bisect_left
+
+MAGIC = b'TECIDS01'
+HEADER = struct.Struct('<8sQQ')
+MAX_U64_DIGITS = 19
+
+
+def _as_number(question_id):
+    """ID numérico canônico (sem zeros à esquerda) -> int; caso contrário None."""
+    text = str(question_id)
+    if text.isdigit() and len(text) <= MAX_U64_DIGITS and (text == '0' or text[0] != '0'):
+        return int(text)
+    return None
+
+
+def write_id_snapshot(path, ids):
+    """Grava o snapshot de forma atômica. Retorna o número de IDs gravados."""
+    numbers = array('Q')
+    extras = []
+    for question_id in ids:
+        number = _as_number(question_id)
+        if number is None:
+            extras.append(str(question_id))
+        else:
+            numbers.append(number)
+    numbers = array('Q', sorted(set(numbers)))
+    extra_block = '\n'.join(sorted(set(extras))).encode('utf-8')
+
+    temp = f"{path}.tmp"
+    with open(temp, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, len(numbers), len(extra_block)))
+        numbers.tofile(f)
+        f.write(extra_block)
+    os.replace(temp, path)
+    return len(numbers) + (len(extra_block.split(b'\n')) if extra_block else 0)
+
+
+class IdSnapshot:
+    """Consulta `id in snapshot` por busca binária sobre o arquivo mapeado."""
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'rb')
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, count, extra_size = HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path}: não é um snapshot de IDs")
+        start = HEADER.size
+        end = start + count * 8
+        self.numbers = memoryview(self.map)[start:end].cast('Q')
+        extra = self.map[end:end + extra_size].decode('utf-8')
+        self.extras = set(extra.split('\n')) if extra else set()
+
+    def __contains__(self, question_id):
+        number = _as_number(question_id)
+        if number is None:
+            return str(question_id) in self.extras
+        index = bisect_left(self.numbers, number)
+        return index < len(self.numbers) and self.numbers[index] == number
+
+    def __len__(self):
+        return len(self.numbers) + len(self.extras)
+
+    def __iter__(self):
+        for number in self.numbers:
+            yield str(number)
+        yield from self.extras
+
+    def close(self):
+        self.numbers.release()
+        self.map.close()
+        self.file.close()
@@ -0,0 +1,335 @@
+"""
+Download e cache local das imagens das questões, endereçado por conteúdo.
+
+Cada URL única é baixada uma vez por um pool limitado de threads (uma sessão
+HTTP por thread, reaproveitando conexões) e gravada em
+<root>/objects/<aa>/<sha256><ext>. Um manifesto SQLite guarda URL → hash entre
+execuções: URLs já vistas não são baixadas de novo, e imagens idênticas em URLs
+diferentes ocupam um único arquivo.
+
+A questão recebe `imagens_hashes: {url: sha256}` (só as imagens obtidas), para
+que o fluxo de upload envie cada objeto uma única vez.
+
+Uso:
+    python image_cache.py fetch arquivo.jsonl -o com_imagens.jsonl --dir imagens/
+    python image_cache.py bench --images 200 --refs 1000      # contra um servidor HTTP local
+"""
+import argparse
+import hashlib
+import mimetypes
+import os
+import random
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from records_io import dumps_record, iter_records, open_text
+
+DEFAULT_WORKERS = 4
+DEFAULT_MAX_PENDING = 64
+DEFAULT_TIMEOUT = 20
+MAX_IMAGE_BYTES = 20 * 1024 * 1024
+
+EXTENSIONS = {
+    'image/png': '.png', 'image/jpeg': '.jpg', 'image/gif': '.gif',
+    'image/webp': '.webp', 'image/svg+xml': '.svg', 'image/bmp': '.bmp',
+}
+
+
+def record_image_urls(record):
+    """URLs de imagem de uma questão (enunciado, alternativas, comentário), sem repetição."""
+    urls = list(record.get('imagens_enunciado') or [])
+    for alternativa in record.get('alternativas') or []:
+        urls.extend(alternativa.get('imagens') or [])
+    urls.extend(record.get('imagens_comentario') or [])
+    return list(dict.fromkeys(urls))
+
+
+class ImageCache:
+    """Pool limitado de downloads + armazenamento por hash + manifesto URL → hash."""
+
+    def __init__(self, root, workers=DEFAULT_WORKERS, max_pending=DEFAULT_MAX_PENDING,
+                 timeout=DEFAULT_TIMEOUT, user_agent='TEC-Scraper/2.0'):
+        self.root = root
+        self.objects_dir = os.path.join(root, 'objects')
+        os.makedirs(self.objects_dir, exist_ok=True)
+        self.timeout = timeout
+        self.user_agent = user_agent
+
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(os.path.join(root, 'manifest.sqlite3'), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS images ("
+            " url TEXT PRIMARY KEY, hash TEXT NOT NULL, path TEXT NOT NULL,"
+            " size INTEGER NOT NULL, content_type TEXT, fetched_at REAL NOT NULL)"
+        )
+        self.conn.commit()
+
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='ImageCache')
+        self.slots = threading.BoundedSemaphore(max_pending)
+        self.in_flight = {}
+        self.local = threading.local()
+        self.stats = {'hits': 0, 'downloads': 0, 'dedup_objects': 0, 'failures': 0, 'bytes': 0}
+
+    def _count(self, key, amount=1):
+        with self.lock:
+            self.stats[key] += amount
+
+    # --- manifesto -------------------------------------------------------------
+
+    def lookup(self, url):
+        """Entrada do manifesto para a URL (se o objeto ainda existe), ou None."""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT hash, path, size, content_type FROM images WHERE url = ?", (url,)
+            ).fetchone()
+        if row and os.path.exists(os.path.join(self.root, row[1])):
+            return {'hash': row[0], 'path': row[1], 'size': row[2], 'content_type': row[3]}
+        return None
+
+    def _remember(self, url, entry):
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO images (url, hash, path, size, content_type, fetched_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (url, entry['hash'], entry['path'], entry['size'], entry['content_type'], time.time()),
+            )
+            self.conn.commit()
+
+    # --- download ----------------------------------------------------------------
+
+    def _session(self):
+        session = getattr(self.local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            session.headers['User-Agent'] = self.user_agent
+            self.local.session = session
+        return session
+
+    def _download(self, url):
+        response = self._session().get(url, timeout=self.timeout, stream=True)
+        response.raise_for_status()
+        content_type = (response.headers.get('Content-Type') or '').split(';')[0].strip() or None
+
+        digest = hashlib.sha256()
+        chunks = []
+        size = 0
+        for chunk in response.iter_content(65536):
+            size += len(chunk)
+            if size > MAX_IMAGE_BYTES:
+                response.close()
+                raise ValueError(f"imagem maior que {MAX_IMAGE_BYTES} bytes")
+            digest.update(chunk)
+            chunks.append(chunk)
+        content_hash = digest.hexdigest()
+
+        extension = EXTENSIONS.get(content_type) or os.path.splitext(url.split('?')[0])[1][:5] \
+            or mimetypes.guess_extension(content_type or '') or ''
+        relative = os.path.join('objects', content_hash[:2], content_hash + extension)
+        target = os.path.join(self.root, relative)
+        if os.path.exists(target):
+            self._count('dedup_objects')
+        else:
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            temp = f"{target}.{threading.get_ident()}.tmp"
+            with open(temp, 'wb') as f:
+                for chunk in chunks:
+                    f.write(chunk)
+            os.replace(temp, target)
+
+        self._count('downloads')
+        self._count('bytes', size)
+        return {'hash': content_hash, 'path': relative, 'size': size, 'content_type': content_type}
+
+    def _fetch(self, url):
+        try:
+            entry = self._download(url)
+            self._remember(url, entry)
+            return entry
+        except Exception:
+            self._count('failures')
+            return None
+        finally:
+            with self.lock:
+                self.in_flight.pop(url, None)
+            self.slots.release()
+
+    def fetch(self, url):
+        """
+        Agenda o download da URL e retorna um Future com a entrada (ou None em falha).
+        URLs já no manifesto não são baixadas; a mesma URL em andamento é compartilhada.
+        Bloqueia se houver `max_pending` downloads na fila.
+        """
+        with self.lock:
+            future = self.in_flight.get(url)
+        if future is not None:
+            return future
+
+        entry = self.lookup(url)
+        if entry is not None:
+            self._count('hits')
+            future = Future()
+            future.set_result(entry)
+            return future
+
+        self.slots.acquire()
+        with self.lock:
+            future = self.in_flight.get(url)
+            if future is not None:
+                self.slots.release()
+                return future
+            future = self.pool.submit(self._fetch, url)
+            self.in_flight[url] = future
+        return future
+
+    def resolve(self, urls, timeout=None):
+        """Baixa (ou encontra no cache) as URLs e retorna {url: entrada} das obtidas."""
+        futures = {url: self.fetch(url) for url in dict.fromkeys(urls)}
+        deadline = time.time() + timeout if timeout is not None else None
+        result = {}
+        for url, future in futures.items():
+            remaining = None if deadline is None else max(0.0, deadline - time.time())
+            try:
+                entry = future.result(remaining)
+            except Exception:
+                entry = None
+            if entry is not None:
+                result[url] = entry
+        return result
+
+    def annotate(self, record, timeout=None):
+        """Acrescenta `imagens_hashes` ({url: sha256}) à questão. Retorna o número de imagens obtidas."""
+        urls = record_image_urls(record)
+        if not urls:
+            return 0
+        resolved = self.resolve(urls, timeout)
+        record['imagens_hashes'] = {url: entry['hash'] for url, entry in resolved.items()}
+        return len(resolved)
+
+    def close(self):
+        self.pool.shutdown(wait=True)
+        with self.lock:
+            self.conn.close()
+
+
+# ============================================================================
+# CLI
+# ============================================================================
+
+def fetch_file(inputs, output, root, workers, timeout):
+    cache = ImageCache(root, workers=workers, timeout=timeout)
+    started = time.perf_counter()
+    count = 0
+    try:
+        with open_text(output, 'wt') as out:
+            for record in iter_records(inputs):
+                cache.annotate(record)
+                out.write(dumps_record(record) + "\n")
+                count += 1
+    finally:
+        cache.close()
+    return count, time.perf_counter() - started, cache.stats
+
+
+def serve_synthetic_images(n_images, delay=0.01):
+    """Servidor HTTP local com `n_images` imagens sintéticas (para testes e benchmark)."""
+    payloads = {f"/img/{i}.png": os.urandom(2048 + (i % 7) * 512) for i in range(n_images)}
+    requests_seen = []
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            requests_seen.append(self.path)
+            body = payloads.get(self.path)
+            if body is None:
+                self.send_response(404)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            time.sleep(delay)
+            self.send_response(200)
+            self.send_header('Content-Type', 'image/png')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="ImageStandIn", daemon=True).start()
+    return server, requests_seen
+
+
+def run_benchmark(n_images, n_refs, workers, root):
+    """Compara download ingênuo (um GET por referência) com o cache, contra o servidor local."""
+    server, requests_seen = serve_synthetic_images(n_images)
+    base = f"http://127.0.0.1:{server.server_port}"
+    rng = random.Random(42)
+    # Poucas imagens muito repetidas (logos, símbolos) + cauda longa
+    refs = [f"{base}/img/{int(rng.paretovariate(1.2)) % n_images}.png" for _ in range(n_refs)]
+
+    started = time.perf_counter()
+    with requests.Session() as session:
+        for url in refs:
+            session.get(url, timeout=DEFAULT_TIMEOUT).content
+    naive = time.perf_counter() - started
+    naive_requests = len(requests_seen)
+
+    requests_seen.clear()
+    cache = ImageCache(root, workers=workers)
+    started = time.perf_counter()
+    for start in range(0, len(refs), 5):
+        cache.resolve(refs[start:start + 5])
+    cold = time.perf_counter() - started
+    cold_requests = len(requests_seen)
+
+    requests_seen.clear()
+    started = time.perf_counter()
+    cache.resolve(refs)
+    warm = time.perf_counter() - started
+    cache.close()
+    server.shutdown()
+
+    print(f"Referências: {n_refs} | URLs únicas: {len(set(refs))} | workers: {workers}")
+    print(f"GET por referência:   {naive:6.2f}s  ({naive_requests} requisições)")
+    print(f"Cache (frio):         {cold:6.2f}s  ({cold_requests} requisições)")
+    print(f"Cache (manifesto):    {warm:6.2f}s  ({len(requests_seen)} requisições)")
+    print(f"Stats: {cache.stats}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cache local de imagens das questões (endereçado por conteúdo)")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p_fetch = sub.add_parser('fetch', help="Baixa as imagens de arquivos JSON/JSONL e anota imagens_hashes")
+    p_fetch.add_argument('inputs', nargs='+')
+    p_fetch.add_argument('-o', '--output', required=True)
+    p_fetch.add_argument('--dir', default='imagens')
+    p_fetch.add_argument('--workers', type=int, default=DEFAULT_WORKERS)
+    p_fetch.add_argument('--timeout', type=float, default=DEFAULT_TIMEOUT)
+
+    p_bench = sub.add_parser('bench', help="Benchmark contra um servidor HTTP local")
+    p_bench.add_argument('--images', type=int, default=200)
+    p_bench.add_argument('--refs', type=int, default=1000)
+    p_bench.add_argument('--workers', type=int, default=DEFAULT_WORKERS)
+    p_bench.add_argument('--dir', default='imagens_bench')
+
+    args = parser.parse_args()
+    if args.command == 'fetch':
+        count, elapsed, stats = fetch_file(args.inputs, args.output, args.dir, args.workers, args.timeout)
+        print(f"🖼️  {count} questões em {elapsed:.1f}s → {args.output} | {stats}")
+    else:
+        run_benchmark(args.images, args.refs, args.workers, args.dir)
+
+
+if __name__ == "__main__":
+    main()
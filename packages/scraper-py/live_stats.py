@@ -0,0 +1,187 @@
+"""
+Contadores por conta sem lock compartilhado + thread relatora com taxas por janela.
+
+Cada conta escreve apenas no seu `WorkerCounters`, sem lock compartilhado nem
+buscas em dicionário global por evento. Duas threads escrevem no mesmo objeto (a
+da conta conta as puladas, o estágio deliver do pipeline as novas e o webhook),
+então cada objeto tem o próprio lock, quase sempre sem disputa. Uma única thread `StatsReporter` lê todos os contadores em
+intervalo fixo e calcula, por conta e no total, taxas EWMA de 1/5/15 minutos
+(como o load average), além dos totais acumulados.
+"""
+import math
+import threading
+import time
+
+WINDOWS = (('1m', 60), ('5m', 300), ('15m', 900))
+
+COUNTER_FIELDS = ('new', 'skipped', 'webhook_success', 'webhook_failed')
+
+
+class WorkerCounters:
+    """Contadores de uma conta (thread da conta + estágio deliver; lock por conta)."""
+
+    __slots__ = ('name',) + COUNTER_FIELDS + ('last_update', 'lock')
+
+    def __init__(self, name):
+        self.name = name
+        self.lock = threading.Lock()
+        self.new = 0
+        self.skipped = 0
+        self.webhook_success = 0
+        self.webhook_failed = 0
+        self.last_update = time.time()
+
+    def add(self, new=0, skipped=0, webhook_success=0, webhook_failed=0):
+        with self.lock:
+            self.new += new
+            self.skipped += skipped
+            self.webhook_success += webhook_success
+            self.webhook_failed += webhook_failed
+            self.last_update = time.time()
+
+    def set_values(self, values):
+        """Substitui os contadores (contas em outro processo enviam os totais)."""
+        with self.lock:
+            for field in COUNTER_FIELDS:
+                if field in values:
+                    setattr(self, field, values[field])
+            self.last_update = time.time()
+
+    def values(self):
+        with self.lock:
+            return {field: getattr(self, field) for field in COUNTER_FIELDS}
+
+
+class RateTracker:
+    """Taxas EWMA (eventos/min) de um contador cumulativo, atualizadas a cada tick."""
+
+    def __init__(self):
+        self.last_value = None
+        self.last_time = None
+        self.rates = {name: None for name, _ in WINDOWS}
+
+    def update(self, value, now):
+        if self.last_value is None:
+            self.last_value, self.last_time = value, now
+            return
+        dt = now - self.last_time
+        if dt <= 0:
+            return
+        instant = (value - self.last_value) / dt * 60
+        for name, window in WINDOWS:
+            previous = self.rates[name]
+            if previous is None:
+                self.rates[name] = instant
+            else:
+                alpha = 1 - math.exp(-dt / window)
+                self.rates[name] = previous + alpha * (instant - previous)
+        self.last_value, self.last_time = value, now
+
+    def snapshot(self):
+        return {name: round(rate, 2) if rate is not None else 0.0 for name, rate in self.rates.items()}
+
+
+class StatsReporter:
+    """Agrega os contadores de todas as contas em intervalo fixo (thread única)."""
+
+    def __init__(self, interval=5, print_interval=60, printer=None):
+        self.interval = interval
+        self.print_interval = print_interval
+        self.printer = printer
+        self.registry_lock = threading.Lock()
+        self.workers = {}
+        self.rates = {}
+        self.total_rates = {'new': RateTracker(), 'processed': RateTracker()}
+        self.start_time = None
+        self.last_print = None
+        self.latest = None
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.listeners = []
+
+    def register(self, name):
+        """Registra (ou retorna) os contadores de uma conta. Chamado uma vez por thread."""
+        with self.registry_lock:
+            if name not in self.workers:
+                self.workers[name] = WorkerCounters(name)
+                self.rates[name] = {'new': RateTracker(), 'processed': RateTracker()}
+            return self.workers[name]
+
+    def add_listener(self, func):
+        """Chamado com cada snapshot agregado (ex.: dashboard)."""
+        self.listeners.append(func)
+
+    def start(self):
+        self.start_time = time.time()
+        self.last_print = self.start_time
+        self.thread = threading.Thread(target=self._run, name="StatsReporter", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join(timeout=self.interval + 1)
+        return self.tick()
+
+    def _run(self):
+        while not self.stop_event.wait(self.interval):
+            try:
+                self.tick()
+                now = time.time()
+                if self.printer and self.print_interval and now - self.last_print >= self.print_interval:
+                    self.last_print = now
+                    self.printer(self.latest)
+            except Exception as e:
+                print(f"⚠️  StatsReporter: erro ao agregar: {e}")
+
+    def tick(self):
+        """Lê todos os contadores, atualiza as taxas e retorna o snapshot agregado."""
+        now = time.time()
+        with self.registry_lock:
+            workers = list(self.workers.values())
+
+        accounts = {}
+        totals = {field: 0 for field in COUNTER_FIELDS}
+        for counters in workers:
+            values = counters.values()
+            for field in COUNTER_FIELDS:
+                totals[field] += values[field]
+            rates = self.rates[counters.name]
+            rates['new'].update(values['new'], now)
+            rates['processed'].update(values['new'] + values['skipped'], now)
+            values.update({
+                'last_update': counters.last_update,
+                'idle_s': now - counters.last_update,
+                'rate_new': rates['new'].snapshot(),
+                'rate_processed': rates['processed'].snapshot(),
+            })
+            accounts[counters.name] = values
+
+        self.total_rates['new'].update(totals['new'], now)
+        self.total_rates['processed'].update(totals['new'] + totals['skipped'], now)
+
+        snapshot = {
+            'time': now,
+            'elapsed_s': now - self.start_time if self.start_time else 0.0,
+            'totals': totals,
+            'rate_new': self.total_rates['new'].snapshot(),
+            'rate_processed': self.total_rates['processed'].snapshot(),
+            'accounts': accounts,
+        }
+        self.latest = snapshot
+        for listener in self.listeners:
+            try:
+                listener(snapshot)
+            except Exception as e:
+                print(f"⚠️  StatsReporter: erro no listener: {e}")
+        return snapshot
+
+    def totals(self):
+        """Totais atuais (leitura direta dos contadores, sem esperar o próximo tick)."""
+        with self.registry_lock:
+            workers = list(self.workers.values())
+        totals = {field: 0 for field in COUNTER_FIELDS}
+        for counters in workers:
+            for field in COUNTER_FIELDS:
+                totals[field] += getattr(counters, field)
+        return totals
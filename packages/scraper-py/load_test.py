@@ -0,0 +1,402 @@
+"""
+Teste de carga dos estágios depois da extração, com questões sintéticas ou de arquivo.
+
+Empurra questões pelos estágios escolhidos a uma taxa alvo crescente e mede,
+por degrau, até onde o pipeline acompanha:
+
+    dedup    descarta IDs já vistos (conjunto local ou o daemon de --dedup)
+    enrich   campos derivados (enrichment.enrich_batch)
+    hash     hashes de conteúdo (content_hashes.annotate_record)
+    codec    compressão com dicionário (record_codec; treina um se --zdict não tiver)
+    outbox   lote pendente no checkpoint SQLite (add_pending + flush + clear)
+    webhook  POST no webhook (--url; sem URL, um receptor local)
+    jsonl    grava em um JSONL temporário
+
+O gerador é de laço aberto: os lotes são agendados em t0 + n*lote/taxa e a
+latência é medida a partir do horário agendado, então um estágio lento aparece
+na latência (não esconde a fila, como num laço fechado). A fila entre gerador e
+trabalhadores é limitada (--max-backlog); quando enche, o atraso do gerador
+também é reportado.
+
+Por degrau: taxa alvo x obtida, latência p50/p99/máx, tempo médio por estágio,
+fila máxima, RSS máximo e descartes do dedup. O ponto de saturação é o primeiro
+degrau em que a taxa obtida fica abaixo de 95% da alvo ou o p99 passa de
+--max-p99 ms; a rampa para ali (a menos que --keep-going).
+
+Uso:
+    python load_test.py --rates 200,500,1000,2000 --stages dedup,enrich,hash,outbox,webhook
+    python load_test.py corpus.jsonl.gz --rates 1000,3000 --stages enrich,hash,codec --concurrency 4
+    python load_test.py --stages dedup,webhook --url https://exemplo/webhook --dedup unix:/tmp/dedup.sock
+    python load_test.py --rates 500 --step-seconds 60 --report carga.json
+"""
+import argparse
+import json
+import os
+import queue
+import shutil
+import tempfile
+import threading
+import time
+
+from memory_tracker import current_rss_bytes
+from records_io import iter_records
+
+STAGE_NAMES = ('dedup', 'enrich', 'hash', 'codec', 'outbox', 'webhook', 'jsonl')
+DEFAULT_STAGES = 'dedup,enrich,hash,outbox,webhook'
+
+
+# ============================================================================
+# ESTÁGIOS
+# ============================================================================
+
+def build_stages(names, args, workdir, pool):
+    """[(nome, função(lote, local) -> lote)] na ordem pedida; `local` é o estado por trabalhador."""
+    stages = []
+    closers = []
+    for name in names:
+        if name == 'dedup':
+            stages.append((name, _dedup_stage(args.dedup)))
+        elif name == 'enrich':
+            from enrichment import enrich_batch
+            stages.append((name, lambda batch, local: enrich_batch(batch)))
+        elif name == 'hash':
+            from content_hashes import annotate_record
+            stages.append((name, lambda batch, local: [annotate_record(r) for r in batch]))
+        elif name == 'codec':
+            codec = _load_or_train_codec(args, workdir, pool)
+
+            def encode(batch, local, codec=codec):
+                local['codec_bytes'] = local.get('codec_bytes', 0) + sum(len(codec.encode(r)) for r in batch)
+                return batch
+            stages.append((name, encode))
+        elif name == 'outbox':
+            from checkpoint import AccountCheckpoint, CheckpointStore
+            store = CheckpointStore(os.path.join(workdir, 'checkpoint.db'))
+            closers.append(store.close)
+
+            def outbox(batch, local, store=store):
+                if 'checkpoint' not in local:
+                    local['checkpoint'] = AccountCheckpoint(store, threading.current_thread().name)
+                checkpoint = local['checkpoint']
+                for record in batch:
+                    checkpoint.add_pending(record)
+                    checkpoint.add_seen_id(record['id'])
+                checkpoint.flush()
+                checkpoint.clear_pending()
+                checkpoint.flush()
+                return batch
+            stages.append((name, outbox))
+        elif name == 'webhook':
+            from backfill import WebhookSink
+            url = args.url
+            if not url:
+                from ndjson_upload import serve_receiver
+                server, _ = serve_receiver()
+                closers.append(server.shutdown)
+                url = f"http://127.0.0.1:{server.server_address[1]}/"
+            sink = WebhookSink(url, stream=args.stream, gzip=args.gzip, label='LoadTest')
+            stages.append((name, _sink_stage(sink)))
+        elif name == 'jsonl':
+            from backfill import JsonlSink
+            sink = JsonlSink(os.path.join(workdir, 'saida.jsonl'))
+            closers.append(sink.close)
+            stages.append((name, _sink_stage(sink)))
+        else:
+            raise ValueError(f"estágio desconhecido: {name} (opções: {', '.join(STAGE_NAMES)})")
+    return stages, closers
+
+
+def _dedup_stage(address):
+    if address:
+        from dedup_service import DedupClient
+
+        def dedup(batch, local):
+            if 'client' not in local:
+                local['client'] = DedupClient(address, client_id=f"loadtest-{os.getpid()}-{threading.get_ident()}")
+            unique = list({r['id']: r for r in batch}.values())
+            claimed = local['client'].claim([r['id'] for r in unique])
+            kept = [r for r, ok in zip(unique, claimed) if ok]
+            if kept:
+                local['client'].add([r['id'] for r in kept])
+            local['dropped'] = local.get('dropped', 0) + len(batch) - len(kept)
+            return kept
+        return dedup
+
+    seen = set()
+    lock = threading.Lock()
+
+    def dedup(batch, local):
+        kept = []
+        with lock:
+            for record in batch:
+                if record['id'] not in seen:
+                    seen.add(record['id'])
+                    kept.append(record)
+        local['dropped'] = local.get('dropped', 0) + len(batch) - len(kept)
+        return kept
+    return dedup
+
+
+def _sink_stage(sink):
+    def deliver(batch, local):
+        if batch:
+            local['batch_number'] = local.get('batch_number', 0) + 1
+            sink.send(batch, local['batch_number'])
+        return batch
+    return deliver
+
+
+def _load_or_train_codec(args, workdir, pool):
+    from record_codec import DictionaryStore, RecordCodec, load_codec, train_dictionary
+    codec = load_codec(args.zdict) if args.zdict else None
+    if codec is None:
+        store = DictionaryStore(args.zdict or os.path.join(workdir, 'zdict'))
+        data, samples = train_dictionary(pool[:2000])
+        store.save(data, samples)
+        codec = RecordCodec(store)
+        print(f"📚 Dicionário treinado com {samples} questões ({len(data)} bytes)")
+    return codec
+
+
+# ============================================================================
+# GERADOR E MEDIÇÃO
+# ============================================================================
+
+def load_pool(inputs, size, seed, dup_rate, near_dup_rate):
+    """Questões carregadas antes da rampa, para que gerar/ler não concorra com os estágios medidos."""
+    if inputs:
+        source = iter_records(inputs)
+    else:
+        from synthetic_corpus import CorpusGenerator
+        source = CorpusGenerator(seed=seed, dup_rate=dup_rate, near_dup_rate=near_dup_rate).iterate(size)
+    return [record for _, record in zip(range(size), source)]
+
+
+def cycle_pool(pool):
+    """Percorre o pool em ciclo; a cada volta os IDs mudam (as duplicatas dentro do pool continuam duplicatas)."""
+    cycle = 0
+    while pool:
+        for record in pool:
+            question_id = str(record.get('id'))
+            if cycle:
+                question_id = f"{question_id}-{cycle}"
+            yield dict(record, id=question_id)
+        cycle += 1
+
+
+def _percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+class StepStats:
+    """Medições de um degrau (compartilhadas pelos trabalhadores)."""
+
+    def __init__(self, rate):
+        self.rate = rate
+        self.lock = threading.Lock()
+        self.latencies = []
+        self.completed = 0
+        self.errors = 0
+        self.stage_time = {}
+        self.stage_batches = {}
+        self.max_backlog = 0
+        self.generator_lag = 0.0
+        self.rss_peak = 0
+        self.scheduled = 0
+
+    def record(self, scheduled, count, timings, failed):
+        finished = time.monotonic()
+        with self.lock:
+            self.latencies.append(finished - scheduled)
+            self.completed += count
+            self.errors += failed
+            for name, elapsed in timings:
+                self.stage_time[name] = self.stage_time.get(name, 0.0) + elapsed
+                self.stage_batches[name] = self.stage_batches.get(name, 0) + 1
+
+
+def _worker(work, stages, stats_ref, locals_out):
+    local = {}
+    locals_out.append(local)
+    while True:
+        item = work.get()
+        if item is None:
+            return
+        scheduled, batch = item
+        count = len(batch)
+        timings = []
+        failed = 0
+        try:
+            for name, func in stages:
+                started = time.perf_counter()
+                batch = func(batch, local)
+                timings.append((name, time.perf_counter() - started))
+        except Exception as e:
+            failed = 1
+            local.setdefault('errors', []).append(str(e))
+        stats_ref[0].record(scheduled, count, timings, failed)
+
+
+def run_step(rate, records, work, stats_ref, args):
+    """Agenda lotes a `rate` questões/s por `step_seconds` e espera a fila esvaziar."""
+    stats = StepStats(rate)
+    stats_ref[0] = stats
+    interval = args.batch_size / rate
+    started = time.monotonic()
+    deadline = started + args.step_seconds
+    next_at = started
+    sampler_stop = threading.Event()
+
+    def sample():
+        while not sampler_stop.wait(0.25):
+            stats.max_backlog = max(stats.max_backlog, work.qsize())
+            stats.rss_peak = max(stats.rss_peak, current_rss_bytes() or 0)
+    sampler = threading.Thread(target=sample, name="LoadTestSampler", daemon=True)
+    sampler.start()
+
+    stats.rss_peak = current_rss_bytes() or 0
+    while next_at + interval <= deadline:
+        delay = next_at - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        batch = [record for _, record in zip(range(args.batch_size), records)]
+        work.put((next_at, batch))
+        stats.scheduled += 1
+        # Fila cheia ou gerador lento: o lote saiu depois do horário agendado
+        stats.generator_lag = max(stats.generator_lag, time.monotonic() - next_at)
+        next_at += interval
+
+    # Tempo efetivo do degrau: até o último lote concluir (a fila acumulada conta contra a taxa)
+    while len(stats.latencies) < stats.scheduled:
+        time.sleep(0.01)
+    elapsed = time.monotonic() - started
+    sampler_stop.set()
+    sampler.join()
+    return _summarize(stats, elapsed, args)
+
+
+def _summarize(stats, elapsed, args):
+    latencies = stats.latencies
+    achieved = stats.completed / elapsed if elapsed else 0.0
+    return {
+        'target_rate': stats.rate,
+        'achieved_rate': round(achieved, 1),
+        'completed': stats.completed,
+        'batches': len(latencies),
+        'errors': stats.errors,
+        'p50_ms': round(_percentile(latencies, 0.50) * 1000, 1),
+        'p99_ms': round(_percentile(latencies, 0.99) * 1000, 1),
+        'max_ms': round(max(latencies, default=0.0) * 1000, 1),
+        'stage_ms': {name: round(total / stats.stage_batches[name] * 1000, 2)
+                     for name, total in stats.stage_time.items()},
+        'max_backlog': stats.max_backlog,
+        'generator_lag_ms': round(stats.generator_lag * 1000, 1),
+        'rss_peak_mb': round(stats.rss_peak / 1048576, 1),
+        'saturated': achieved < 0.95 * stats.rate or _percentile(latencies, 0.99) * 1000 > args.max_p99,
+    }
+
+
+def print_step(result):
+    flag = "⚠️  saturado" if result['saturated'] else "✅"
+    stages = ' '.join(f"{name}={ms}" for name, ms in result['stage_ms'].items())
+    print(f"{result['target_rate']:>8,.0f} q/s → {result['achieved_rate']:>9,.1f} q/s | "
+          f"p50 {result['p50_ms']:>7} ms p99 {result['p99_ms']:>8} ms máx {result['max_ms']:>8} ms | "
+          f"fila {result['max_backlog']:>3} atraso {result['generator_lag_ms']:>7} ms | RSS {result['rss_peak_mb']:>7} MB | {flag}")
+    print(f"{'':14}ms/lote: {stages}" + (f" | erros {result['errors']}" if result['errors'] else '')
+          + (f" | descartes dedup {result['dedup_dropped']}" if result.get('dedup_dropped') else ''))
+
+
+def run_load_test(args):
+    names = [name.strip() for name in args.stages.split(',') if name.strip()]
+    workdir = tempfile.mkdtemp(prefix='load_test_')
+    pool = load_pool(args.inputs, args.pool, args.seed, args.dup_rate, args.near_dup_rate)
+    if not pool:
+        raise SystemExit("❌ Nenhuma questão na entrada")
+    stages, closers = build_stages(names, args, workdir, pool)
+    records = cycle_pool(pool)
+    work = queue.Queue(maxsize=args.max_backlog)
+    stats_ref = [StepStats(0)]
+    worker_locals = []
+    workers = [threading.Thread(target=_worker, args=(work, stages, stats_ref, worker_locals),
+                                name=f"LoadWorker-{i + 1}", daemon=True) for i in range(args.concurrency)]
+    for thread in workers:
+        thread.start()
+
+    print(f"🏋️ Estágios: {' → '.join(names)} | lotes de {args.batch_size} | {args.concurrency} trabalhadores | "
+          f"{args.step_seconds}s por degrau")
+    results = []
+    saturation = None
+    dropped_before = 0
+    try:
+        for rate in args.rates:
+            result = run_step(rate, records, work, stats_ref, args)
+            dropped = sum(local.get('dropped', 0) for local in worker_locals)
+            result['dedup_dropped'] = dropped - dropped_before
+            dropped_before = dropped
+            results.append(result)
+            print_step(result)
+            if result['saturated'] and saturation is None:
+                saturation = rate
+                if not args.keep_going:
+                    break
+    finally:
+        for _ in workers:
+            work.put(None)
+        for thread in workers:
+            thread.join(timeout=30)
+        for close in closers:
+            close()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    errors = [e for local in worker_locals for e in local.get('errors', [])]
+    sustained = [r['target_rate'] for r in results if not r['saturated']]
+    print()
+    if saturation is not None:
+        print(f"📉 Saturação em {saturation:,.0f} q/s; maior taxa sustentada: "
+              f"{max(sustained):,.0f} q/s" if sustained else f"📉 Saturação já no primeiro degrau ({saturation:,.0f} q/s)")
+    else:
+        print(f"📈 Sem saturação até {args.rates[-1]:,.0f} q/s")
+    if errors:
+        print(f"❌ {len(errors)} lote(s) com erro; primeiro: {errors[0]}")
+
+    report = {'stages': names, 'batch_size': args.batch_size, 'concurrency': args.concurrency,
+              'step_seconds': args.step_seconds, 'steps': results, 'saturation_rate': saturation,
+              'max_sustained_rate': max(sustained) if sustained else None}
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"📝 Relatório em {args.report}")
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga dos estágios depois da extração")
+    parser.add_argument('inputs', nargs='*', help="Arquivos de questões (padrão: corpus sintético gerado na hora)")
+    parser.add_argument('--stages', default=DEFAULT_STAGES, help=f"Em ordem, separados por vírgula ({', '.join(STAGE_NAMES)})")
+    parser.add_argument('--rates', default='200,500,1000,2000,5000', help="Taxas alvo (questões/s) de cada degrau")
+    parser.add_argument('--step-seconds', type=float, default=20)
+    parser.add_argument('--batch-size', type=int, default=50)
+    parser.add_argument('--concurrency', type=int, default=4, help="Trabalhadores (threads)")
+    parser.add_argument('--max-backlog', type=int, default=200, help="Lotes na fila antes de frear o gerador")
+    parser.add_argument('--max-p99', type=float, default=5000, help="p99 (ms) acima do qual o degrau satura")
+    parser.add_argument('--keep-going', action='store_true', help="Não para a rampa na saturação")
+    parser.add_argument('--url', help="Webhook real do estágio webhook (padrão: receptor local)")
+    parser.add_argument('--stream', action='store_true', help="Webhook em NDJSON (streaming)")
+    parser.add_argument('--no-gzip', dest='gzip', action='store_false', help="NDJSON sem gzip")
+    parser.add_argument('--dedup', help="Endereço do daemon de dedup (padrão: conjunto local)")
+    parser.add_argument('--zdict', help="Diretório de dicionários do estágio codec")
+    parser.add_argument('--pool', type=int, default=10000, help="Questões carregadas em memória (reusadas em ciclo)")
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--dup-rate', type=float, default=0.2, help="Duplicatas no corpus sintético")
+    parser.add_argument('--near-dup-rate', type=float, default=0.02, help="Quase duplicatas no corpus sintético")
+    parser.add_argument('--report', help="Grava o relatório em JSON")
+    args = parser.parse_args()
+    args.rates = [float(rate) for rate in args.rates.split(',') if rate.strip()]
+    run_load_test(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,330 @@
+"""
+Análise pós-execução dos logs `scraper_<conta>_<timestamp>.log` gerados por `setup_logging`.
+
+Cada arquivo de log é uma execução (run) de uma conta. Os arquivos são lidos
+linha a linha em processos paralelos; cada processo devolve só um resumo
+compacto da execução (contagens por minuto, histograma de tempos de extração,
+rajadas de falha do webhook e pausas), e os resultados são gravados assim que
+cada arquivo termina.
+
+Saídas em <out_dir>/:
+- runs.csv              -> uma linha por execução (totais, taxas, percentis)
+- timeline.csv          -> por execução e minuto: novas, puladas, erros, webhook ok/falha
+- account_timeline.csv  -> o mesmo, somado por conta e minuto
+- extraction_times.csv  -> histograma de tempos de extração por execução
+- webhook_bursts.csv    -> sequências de falhas de webhook sem sucesso intermediário
+- pauses.csv            -> pausas (motivo, início, duração)
+- summary.json          -> resumo por execução e por conta (com --json)
+
+Uso:
+    python log_analyzer.py 'scraper_*.log' -o analise/
+    python log_analyzer.py logs/ -o analise/ --workers 8 --json
+"""
+import argparse
+import csv
+import glob
+import json
+import os
+import re
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from records_io import open_text
+
+LINE_RE = re.compile(
+    r'^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}) - Scraper_(.+?) - (DEBUG|INFO|WARNING|ERROR|CRITICAL) - (.*)$'
+)
+FILENAME_RE = re.compile(r'^scraper_(.+)_(\d{8}_\d{6})\.log(?:\.gz)?$')
+
+NEW_RE = re.compile(r'✓ Questão \d+ extraída em ([\d.]+)s - ID: (\S+)')
+SKIP_RE = re.compile(r'Questão (\S+) JÁ EXISTE.*\(([\d.]+)s\)')
+WEBHOOK_OK_RE = re.compile(r'✓ Webhook enviado!')
+WEBHOOK_FAIL_RE = re.compile(r'Webhook status \d+|Erro ao enviar webhook')
+PAUSE_START_RE = re.compile(r'⏸️ PAUSADO: (.*)')
+PAUSE_END_RE = re.compile(r'(?:retomada pelo usuário após|Pausa encerrada por comando .*\() *([\d.]+)s')
+
+# Histograma de tempos de extração: faixas de 0.5s até 120s (+ transbordo)
+HIST_STEP = 0.5
+HIST_MAX = 120.0
+
+TIMELINE_FIELDS = ['new', 'skipped', 'errors', 'webhook_ok', 'webhook_failed']
+
+
+def expand_log_paths(patterns):
+    """Expande padrões glob e diretórios em uma lista ordenada de arquivos de log."""
+    paths = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            paths.extend(sorted(glob.glob(os.path.join(pattern, 'scraper_*.log*'))))
+        else:
+            paths.extend(sorted(glob.glob(pattern)) or [pattern])
+    return paths
+
+
+def histogram_bucket(seconds):
+    return min(int(seconds / HIST_STEP), int(HIST_MAX / HIST_STEP))
+
+
+def histogram_percentile(histogram, fraction):
+    """Percentil aproximado (limite superior da faixa) a partir do histograma."""
+    total = sum(histogram.values())
+    if not total:
+        return None
+    target = fraction * total
+    seen = 0
+    for bucket in sorted(histogram):
+        seen += histogram[bucket]
+        if seen >= target:
+            return round((bucket + 1) * HIST_STEP, 1)
+    return None
+
+
+def analyze_log(path):
+    """Lê um arquivo de log em streaming e retorna o resumo da execução."""
+    name = os.path.basename(path)
+    match = FILENAME_RE.match(name)
+    account = match.group(1) if match else None
+    run = name[:-3] if name.endswith('.gz') else name
+
+    timeline = defaultdict(Counter)
+    histogram = Counter()
+    extraction_sum = 0.0
+    totals = Counter()
+    bursts = []
+    current_burst = None
+    pauses = []
+    pause_start = None
+    pause_reason = None
+    first_ts = last_ts = None
+
+    with open_text(path) as f:
+        for line in f:
+            parsed = LINE_RE.match(line.rstrip('\n'))
+            if not parsed:
+                continue  # continuação de traceback
+            ts_text, logger_account, level, message = parsed.groups()
+            if account is None:
+                account = logger_account
+            ts = datetime.strptime(ts_text, '%Y-%m-%d %H:%M:%S')
+            if first_ts is None:
+                first_ts = ts
+            last_ts = ts
+            minute = ts_text[:16]
+
+            if level in ('ERROR', 'CRITICAL'):
+                timeline[minute]['errors'] += 1
+                totals['errors'] += 1
+
+            found = NEW_RE.search(message)
+            if found:
+                seconds = float(found.group(1))
+                timeline[minute]['new'] += 1
+                totals['new'] += 1
+                histogram[histogram_bucket(seconds)] += 1
+                extraction_sum += seconds
+                continue
+
+            if SKIP_RE.search(message):
+                timeline[minute]['skipped'] += 1
+                totals['skipped'] += 1
+                continue
+
+            if WEBHOOK_OK_RE.search(message):
+                timeline[minute]['webhook_ok'] += 1
+                totals['webhook_ok'] += 1
+                if current_burst:
+                    bursts.append(current_burst)
+                    current_burst = None
+                continue
+
+            if WEBHOOK_FAIL_RE.search(message):
+                timeline[minute]['webhook_failed'] += 1
+                totals['webhook_failed'] += 1
+                if current_burst is None:
+                    current_burst = {'start': ts_text, 'end': ts_text, 'failures': 0}
+                current_burst['end'] = ts_text
+                current_burst['failures'] += 1
+                continue
+
+            found = PAUSE_START_RE.search(message)
+            if found:
+                pause_start, pause_reason = ts, found.group(1)
+                continue
+
+            found = PAUSE_END_RE.search(message)
+            if found:
+                duration = float(found.group(1))
+                start = pause_start or ts
+                pauses.append({
+                    'start': start.strftime('%Y-%m-%d %H:%M:%S'),
+                    'duration_s': duration,
+                    'reason': pause_reason or '',
+                })
+                pause_start = pause_reason = None
+
+    if current_burst:
+        bursts.append(current_burst)
+    if pause_start is not None:
+        # Pausa sem retomada: execução terminou pausada
+        pauses.append({
+            'start': pause_start.strftime('%Y-%m-%d %H:%M:%S'),
+            'duration_s': (last_ts - pause_start).total_seconds(),
+            'reason': (pause_reason or '') + ' (sem retomada)',
+        })
+
+    duration_min = (last_ts - first_ts).total_seconds() / 60 if first_ts else 0.0
+    return {
+        'run': run,
+        'path': path,
+        'account': account or '?',
+        'start': first_ts.strftime('%Y-%m-%d %H:%M:%S') if first_ts else None,
+        'end': last_ts.strftime('%Y-%m-%d %H:%M:%S') if last_ts else None,
+        'duration_min': round(duration_min, 2),
+        'totals': {field: totals[field] for field in TIMELINE_FIELDS},
+        'new_per_min': round(totals['new'] / duration_min, 2) if duration_min else None,
+        'extraction_mean_s': round(extraction_sum / totals['new'], 2) if totals['new'] else None,
+        'extraction_p50_s': histogram_percentile(histogram, 0.50),
+        'extraction_p90_s': histogram_percentile(histogram, 0.90),
+        'extraction_p99_s': histogram_percentile(histogram, 0.99),
+        'paused_s': round(sum(p['duration_s'] for p in pauses), 1),
+        'webhook_bursts': bursts,
+        'pauses': pauses,
+        'histogram': dict(histogram),
+        'timeline': {minute: dict(counts) for minute, counts in sorted(timeline.items())},
+    }
+
+
+RUN_COLUMNS = ['run', 'account', 'start', 'end', 'duration_min'] + TIMELINE_FIELDS + [
+    'new_per_min', 'extraction_mean_s', 'extraction_p50_s', 'extraction_p90_s', 'extraction_p99_s',
+    'paused_s', 'n_pauses', 'n_webhook_bursts', 'max_webhook_burst',
+]
+
+
+class ReportWriter:
+    """Grava os resultados de cada execução à medida que chegam."""
+
+    def __init__(self, out_dir, write_json=False):
+        os.makedirs(out_dir, exist_ok=True)
+        self.out_dir = out_dir
+        self.write_json = write_json
+        self.files = {}
+        self.writers = {}
+        self.accounts = {}
+        self.account_timeline = defaultdict(Counter)
+        self.runs = []
+
+        self._open('runs', RUN_COLUMNS)
+        self._open('timeline', ['run', 'account', 'minute'] + TIMELINE_FIELDS)
+        self._open('extraction_times', ['run', 'account', 'from_s', 'to_s', 'count'])
+        self._open('webhook_bursts', ['run', 'account', 'start', 'end', 'failures'])
+        self._open('pauses', ['run', 'account', 'start', 'duration_s', 'reason'])
+
+    def _open(self, name, columns):
+        f = open(os.path.join(self.out_dir, f"{name}.csv"), 'w', encoding='utf-8', newline='')
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        self.files[name] = f
+        self.writers[name] = writer
+
+    def add(self, result):
+        run, account = result['run'], result['account']
+        totals = result['totals']
+        bursts = result['webhook_bursts']
+        self.writers['runs'].writerow(
+            [run, account, result['start'], result['end'], result['duration_min']]
+            + [totals[f] for f in TIMELINE_FIELDS]
+            + [result['new_per_min'], result['extraction_mean_s'], result['extraction_p50_s'],
+               result['extraction_p90_s'], result['extraction_p99_s'], result['paused_s'],
+               len(result['pauses']), len(bursts), max((b['failures'] for b in bursts), default=0)]
+        )
+        for minute, counts in result['timeline'].items():
+            self.writers['timeline'].writerow([run, account, minute] + [counts.get(f, 0) for f in TIMELINE_FIELDS])
+            self.account_timeline[(account, minute)].update(counts)
+        for bucket, count in sorted(result['histogram'].items()):
+            upper = (bucket + 1) * HIST_STEP if bucket * HIST_STEP < HIST_MAX else ''
+            self.writers['extraction_times'].writerow([run, account, bucket * HIST_STEP, upper, count])
+        for burst in bursts:
+            self.writers['webhook_bursts'].writerow([run, account, burst['start'], burst['end'], burst['failures']])
+        for pause in result['pauses']:
+            self.writers['pauses'].writerow([run, account, pause['start'], pause['duration_s'], pause['reason']])
+
+        acc = self.accounts.setdefault(account, {
+            'runs': 0, 'duration_min': 0.0, 'paused_s': 0.0, 'webhook_bursts': 0,
+            'totals': Counter(), 'histogram': Counter(),
+        })
+        acc['runs'] += 1
+        acc['duration_min'] += result['duration_min']
+        acc['paused_s'] += result['paused_s']
+        acc['webhook_bursts'] += len(bursts)
+        acc['totals'].update(totals)
+        acc['histogram'].update({int(k): v for k, v in result['histogram'].items()})
+
+        if self.write_json:
+            self.runs.append({k: v for k, v in result.items() if k not in ('timeline', 'histogram')})
+
+    def close(self):
+        with open(os.path.join(self.out_dir, 'account_timeline.csv'), 'w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['account', 'minute'] + TIMELINE_FIELDS)
+            for (account, minute), counts in sorted(self.account_timeline.items()):
+                writer.writerow([account, minute] + [counts.get(field, 0) for field in TIMELINE_FIELDS])
+        for f in self.files.values():
+            f.close()
+
+        accounts = {}
+        for account, acc in sorted(self.accounts.items()):
+            accounts[account] = {
+                'runs': acc['runs'],
+                'duration_min': round(acc['duration_min'], 2),
+                'paused_s': round(acc['paused_s'], 1),
+                'webhook_bursts': acc['webhook_bursts'],
+                'totals': {field: acc['totals'][field] for field in TIMELINE_FIELDS},
+                'new_per_min': round(acc['totals']['new'] / acc['duration_min'], 2) if acc['duration_min'] else None,
+                'extraction_p50_s': histogram_percentile(acc['histogram'], 0.50),
+                'extraction_p90_s': histogram_percentile(acc['histogram'], 0.90),
+            }
+
+        if self.write_json:
+            with open(os.path.join(self.out_dir, 'summary.json'), 'w', encoding='utf-8') as f:
+                json.dump({'accounts': accounts, 'runs': self.runs}, f, ensure_ascii=False, indent=2)
+        return accounts
+
+
+def analyze(paths, out_dir, workers=None, write_json=False):
+    """Analisa os logs em paralelo e grava os relatórios. Retorna o resumo por conta."""
+    report = ReportWriter(out_dir, write_json)
+    if workers == 1 or len(paths) <= 1:
+        for path in paths:
+            report.add(analyze_log(path))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for result in pool.map(analyze_log, paths, chunksize=4):
+                report.add(result)
+    return report.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Analisa logs scraper_*.log de execuções anteriores")
+    parser.add_argument('inputs', nargs='+', help="Arquivos de log, padrões glob ou diretórios")
+    parser.add_argument('-o', '--out-dir', default='analise_logs')
+    parser.add_argument('--workers', type=int, default=None, help="Processos paralelos (padrão: nº de CPUs)")
+    parser.add_argument('--json', action='store_true', help="Grava também summary.json")
+    args = parser.parse_args()
+
+    paths = expand_log_paths(args.inputs)
+    started = time.perf_counter()
+    accounts = analyze(paths, args.out_dir, args.workers, args.json)
+    elapsed = time.perf_counter() - started
+
+    print(f"📋 {len(paths)} logs analisados em {elapsed:.1f}s → {args.out_dir}/")
+    for account, acc in accounts.items():
+        totals = acc['totals']
+        print(f"  [{account}] {acc['runs']} execuções | novas: {totals['new']} | puladas: {totals['skipped']} "
+              f"| erros: {totals['errors']} | webhook falhas: {totals['webhook_failed']} "
+              f"| {acc['new_per_min'] or 0:.1f}/min | p50 {acc['extraction_p50_s']}s")
+
+
+if __name__ == "__main__":
+    main()
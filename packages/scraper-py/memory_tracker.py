@@ -0,0 +1,142 @@
+"""
+Instrumentação de memória para execuções longas (opcional).
+
+A cada intervalo:
+- tira um snapshot do tracemalloc e compara com o anterior, gravando os locais
+  de alocação que mais cresceram em <out_dir>/memory_<timestamp>.txt
+- grava uma linha de medidores em <out_dir>/gauges_<timestamp>.jsonl: RSS do
+  processo, memória rastreada pelo tracemalloc e medidores registrados
+  (tamanho de shared_ids, lotes pendentes, loggers, threads...)
+
+Ao parar, grava também o crescimento acumulado desde o primeiro snapshot.
+"""
+import json
+import linecache
+import os
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+
+# Alocações do próprio rastreamento não interessam
+IGNORED_FILES = ('<frozen importlib._bootstrap>', '<frozen importlib._bootstrap_external>', '<unknown>')
+
+
+def current_rss_bytes():
+    """RSS atual do processo em bytes (None se indisponível)."""
+    try:
+        with open('/proc/self/statm') as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        return None
+
+
+class MemoryTracker:
+    """Snapshots periódicos do tracemalloc + medidores de tamanho."""
+
+    def __init__(self, interval=300, out_dir='memory', top=25, frames=10):
+        self.interval = interval
+        self.out_dir = out_dir
+        self.top = top
+        self.frames = frames
+        self.gauges = {}
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.first_snapshot = None
+        self.previous_snapshot = None
+        self.started_at = None
+
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        self.report_path = os.path.join(out_dir, f"memory_{timestamp}.txt")
+        self.gauges_path = os.path.join(out_dir, f"gauges_{timestamp}.jsonl")
+
+    def register_gauge(self, name, func):
+        """Registra um medidor: `func()` retorna um número (ex.: len(shared_ids))."""
+        self.gauges[name] = func
+
+    def start(self):
+        os.makedirs(self.out_dir, exist_ok=True)
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+        self.started_at = time.time()
+        self.first_snapshot = self._snapshot()
+        self.previous_snapshot = self.first_snapshot
+        self._write_gauges()
+
+        self.thread = threading.Thread(target=self._run, name="MemoryTracker", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join(timeout=5)
+        self.sample()
+        if self.first_snapshot is not None:
+            final = self._snapshot()
+            self._write_diff(final, self.first_snapshot, "CRESCIMENTO ACUMULADO DESDE O INÍCIO")
+        tracemalloc.stop()
+
+    def _run(self):
+        while not self.stop_event.wait(self.interval):
+            try:
+                self.sample()
+            except Exception as e:
+                print(f"⚠️  MemoryTracker: erro ao amostrar: {e}")
+
+    def _snapshot(self):
+        snapshot = tracemalloc.take_snapshot()
+        return snapshot.filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, linecache.__file__),
+            *(tracemalloc.Filter(False, name) for name in IGNORED_FILES),
+        ])
+
+    def sample(self):
+        """Um ciclo: diff contra o snapshot anterior + linha de medidores."""
+        snapshot = self._snapshot()
+        self._write_diff(snapshot, self.previous_snapshot, "MAIOR CRESCIMENTO NO INTERVALO")
+        self.previous_snapshot = snapshot
+        return self._write_gauges()
+
+    def _write_diff(self, snapshot, baseline, title):
+        stats = snapshot.compare_to(baseline, 'traceback')
+        growing = [s for s in stats if s.size_diff > 0][:self.top]
+        elapsed = time.time() - self.started_at
+
+        with open(self.report_path, 'a', encoding='utf-8') as f:
+            f.write("="*70 + "\n")
+            f.write(f"{title} - {datetime.now().isoformat(timespec='seconds')} (+{elapsed / 60:.1f}min)\n")
+            f.write("="*70 + "\n")
+            for stat in growing:
+                frame = stat.traceback[-1] if stat.traceback else None
+                where = f"{frame.filename}:{frame.lineno}" if frame else '?'
+                f.write(f"+{stat.size_diff / 1024:9.1f} KiB  ({stat.count_diff:+d} blocos, "
+                        f"total {stat.size / 1024:.1f} KiB)  {where}\n")
+                for line in stat.traceback.format(limit=self.frames)[:-2]:
+                    f.write(f"        {line}\n")
+            f.write("\n")
+
+    def _write_gauges(self):
+        current, peak = tracemalloc.get_traced_memory()
+        rss = current_rss_bytes()
+        row = {
+            'ts': datetime.now().isoformat(timespec='seconds'),
+            'rss_mb': round(rss / 1048576, 1) if rss is not None else None,
+            'traced_mb': round(current / 1048576, 1),
+            'traced_peak_mb': round(peak / 1048576, 1),
+        }
+        for name, func in self.gauges.items():
+            try:
+                row[name] = func()
+            except Exception:
+                row[name] = None
+
+        with open(self.gauges_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(row, ensure_ascii=False) + "\n")
+        return row
@@ -0,0 +1,218 @@
+"""
+Envio de lotes grandes ao webhook como NDJSON em streaming.
+
+Em vez de montar `{"data": [...]}` e serializar o documento inteiro, o corpo é
+gerado sob demanda e enviado com Transfer-Encoding: chunked:
+
+    {"type":"header","timestamp":...,"total_questions":N,"account":...}   <- envelope
+    {<questão 1>}
+    {<questão 2>}
+    ...
+
+Cada questão é serializada e (opcionalmente) comprimida com gzip na hora, em
+blocos de `chunk_size` bytes: a memória extra por lote fica constante, não
+proporcional ao tamanho do JSON.
+
+Uso:
+    python ndjson_upload.py bench --records 5000     # memória de pico: json= vs streaming
+"""
+import argparse
+import gzip
+import io
+import json
+import threading
+import time
+import tracemalloc
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from records_io import dumps_record, iter_records
+
+CONTENT_TYPE = 'application/x-ndjson'
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+
+def iter_ndjson_body(header, records, compress=False, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Gera o corpo NDJSON (linha de envelope + uma questão por linha) em blocos de bytes."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+    buffer = []
+    size = 0
+
+    def lines():
+        yield json.dumps(dict(header, type='header'), ensure_ascii=False, separators=(',', ':'))
+        for record in records:
+            yield dumps_record(record)
+
+    for line in lines():
+        data = line.encode('utf-8') + b'\n'
+        buffer.append(data)
+        size += len(data)
+        if size >= chunk_size:
+            block = b''.join(buffer)
+            buffer, size = [], 0
+            if compressor:
+                block = compressor.compress(block)
+            if block:
+                yield block
+
+    block = b''.join(buffer)
+    if compressor:
+        block = compressor.compress(block) + compressor.flush()
+    if block:
+        yield block
+
+
+def post_ndjson(url, header, records, headers=None, compress=False, timeout=60,
+                chunk_size=DEFAULT_CHUNK_SIZE, session=None):
+    """POST com corpo NDJSON em streaming (chunked). Retorna a resposta do requests."""
+    request_headers = dict(headers or {})
+    request_headers['Content-Type'] = CONTENT_TYPE
+    if compress:
+        request_headers['Content-Encoding'] = 'gzip'
+    body = iter_ndjson_body(header, records, compress, chunk_size)
+    return (session or requests).post(url, data=body, headers=request_headers, timeout=timeout)
+
+
+def read_ndjson_body(stream, compressed=False):
+    """Lado receptor: retorna (envelope, iterador de questões) a partir de um arquivo/stream."""
+    if compressed:
+        stream = gzip.GzipFile(fileobj=stream)
+    text = io.TextIOWrapper(stream, encoding='utf-8')
+    header = json.loads(text.readline())
+
+    def records():
+        for line in text:
+            if line.strip():
+                yield json.loads(line)
+    return header, records()
+
+
+# ============================================================================
+# BENCHMARK
+# ============================================================================
+
+class _ChunkedReader(io.RawIOBase):
+    """Lê um corpo Transfer-Encoding: chunked como um stream contínuo."""
+
+    def __init__(self, rfile):
+        self.rfile = rfile
+        self.remaining = 0
+        self.done = False
+
+    def readable(self):
+        return True
+
+    def readinto(self, target):
+        if self.done:
+            return 0
+        if self.remaining == 0:
+            size = int(self.rfile.readline().split(b';')[0].strip(), 16)
+            if size == 0:
+                self.rfile.readline()
+                self.done = True
+                return 0
+            self.remaining = size
+        data = self.rfile.read(min(len(target), self.remaining))
+        target[:len(data)] = data
+        self.remaining -= len(data)
+        if self.remaining == 0:
+            self.rfile.readline()
+        return len(data)
+
+
+def serve_receiver():
+    """Webhook local que aceita JSON comum e NDJSON em streaming (para testes)."""
+    received = []
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, format, *args):
+            pass
+
+        def do_POST(self):
+            if self.headers.get('Transfer-Encoding', '').lower() == 'chunked':
+                stream = io.BufferedReader(_ChunkedReader(self.rfile))
+            else:
+                stream = io.BytesIO(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+
+            if self.headers.get('Content-Type', '').startswith(CONTENT_TYPE):
+                compressed = self.headers.get('Content-Encoding') == 'gzip'
+                header, records = read_ndjson_body(stream, compressed)
+                count = sum(1 for _ in records)
+            else:
+                payload = json.load(stream)
+                header, count = payload, len(payload.get('data', []))
+            received.append((header.get('total_questions'), count))
+
+            self.send_response(200)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="WebhookStandIn", daemon=True).start()
+    return server, received
+
+
+def _measure(func):
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    started = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def run_benchmark(records):
+    server, received = serve_receiver()
+    url = f"http://127.0.0.1:{server.server_port}/webhook"
+    header = {'timestamp': 'bench', 'total_questions': len(records), 'source': 'bench', 'account': 'bench'}
+    session = requests.Session()
+
+    def post_json():
+        session.post(url, json=dict(header, data=records), timeout=120)
+
+    results = [
+        ('json= (documento inteiro)', _measure(post_json)),
+        ('NDJSON streaming', _measure(lambda: post_ndjson(url, header, records, session=session))),
+        ('NDJSON streaming + gzip', _measure(lambda: post_ndjson(url, header, records, compress=True, session=session))),
+    ]
+    server.shutdown()
+
+    print(f"Lote de {len(records)} questões")
+    for label, (elapsed, peak) in results:
+        print(f"  {label:28} {elapsed:6.2f}s   pico de memória (cliente + receptor local): {peak / 1048576:7.1f} MiB")
+    print(f"  Recebidas pelo servidor local (declaradas, lidas): {received}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Envio NDJSON em streaming para o webhook")
+    sub = parser.add_subparsers(dest='command', required=True)
+    p_bench = sub.add_parser('bench', help="Compara memória de pico: json= vs NDJSON em streaming")
+    p_bench.add_argument('inputs', nargs='*', help="Arquivos JSON/JSONL (padrão: questões sintéticas)")
+    p_bench.add_argument('--records', type=int, default=5000)
+    args = parser.parse_args()
+
+    if args.inputs:
+        records = []
+        for record in iter_records(args.inputs):
+            records.append(record)
+            if len(records) >= args.records:
+                break
+    else:
+        records = [{
+            'id': str(i), 'materia': 'Direito Constitucional', 'assunto': 'Direitos Fundamentais',
+            'enunciado': 'Texto do enunciado da questão ' * 40,
+            'alternativas': [{'letter': letter, 'text': 'Alternativa ' * 15} for letter in 'ABCDE'],
+            'comentario': 'Comentário do professor ' * 60, 'detalhes': {'banca': 'CESPE', 'ano': '2024'},
+        } for i in range(args.records)]
+    run_benchmark(records)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,278 @@
+"""
+Pipeline em estágios para o processamento das questões depois da captura.
+
+A thread de cada conta só lê o DOM e entrega a captura crua ao pipeline; o
+trabalho de CPU (normalização, inferências, campos derivados, hashes, JSON) e
+a entrega rodam em threads próprias, enquanto o navegador já vai para a
+próxima questão.
+
+- cada estágio tem seu pool de threads e uma fila limitada na entrada: se o
+  pipeline não acompanha, `submit` bloqueia (contrapressão na conta, visível no
+  watchdog) em vez de acumular memória
+- tempo por estágio: itens, tempo ocupado (médio/máximo) e espera na fila
+- um estágio que levanta exceção descarta o item e chama `on_error`
+- `close` esvazia os estágios em ordem antes de encerrar as threads
+- `on_thread(thread, estágio, evento)` acompanha cada trabalhador ('start',
+  'busy' ao pegar um item, 'idle' ao terminá-lo, 'stop'), para ligar as
+  threads ao watchdog e ao profiler
+
+Com vários trabalhadores por estágio a ordem entre itens não é garantida;
+`OrderedDelivery` devolve a ordem de cada produtor (conta) na entrega.
+
+Uso:
+    python post_pipeline.py bench --records 2000 --navigation-ms 40
+    python post_pipeline.py bench --records 500 --navigation-ms 0 --workers 2
+"""
+import argparse
+import queue
+import threading
+import time
+
+DEFAULT_QUEUE_SIZE = 100
+
+_STOP = object()
+_SKIPPED = object()
+_MISSING = object()
+
+
+class Pipeline:
+    """Estágios encadeados por filas limitadas; `stages` = [(nome, função(item) -> item, trabalhadores)]."""
+
+    def __init__(self, stages, queue_size=DEFAULT_QUEUE_SIZE, on_error=None, name='Pipeline', on_thread=None):
+        self.stages = [(stage, func, max(1, workers)) for stage, func, workers in stages]
+        self.queues = [queue.Queue(maxsize=queue_size) for _ in self.stages]
+        self.on_error = on_error
+        self.on_thread = on_thread
+        self.name = name
+        self.lock = threading.Lock()
+        self.timings = {stage: {'items': 0, 'busy_s': 0.0, 'max_s': 0.0, 'wait_s': 0.0, 'errors': 0}
+                        for stage, _, _ in self.stages}
+        self.submitted = 0
+        self.finished = 0
+        self.threads = []
+
+    def start(self):
+        for index, (stage, _, workers) in enumerate(self.stages):
+            threads = [threading.Thread(target=self._worker, args=(index,), name=f"{self.name}-{stage}-{i + 1}",
+                                        daemon=True) for i in range(workers)]
+            for thread in threads:
+                thread.start()
+            self.threads.append(threads)
+        return self
+
+    def submit(self, item):
+        """Entrega um item ao primeiro estágio (bloqueia com a fila cheia)."""
+        with self.lock:
+            self.submitted += 1
+        self.queues[0].put((item, time.perf_counter()))
+
+    def in_flight(self):
+        return self.submitted - self.finished
+
+    def _worker(self, index):
+        stage, func, _ = self.stages[index]
+        inbox = self.queues[index]
+        outbox = self.queues[index + 1] if index + 1 < len(self.queues) else None
+        timing = self.timings[stage]
+        thread = threading.current_thread().name
+        self._notify(thread, stage, 'start')
+        while True:
+            entry = inbox.get()
+            if entry is _STOP:
+                self._notify(thread, stage, 'stop')
+                return
+            item, enqueued_at = entry
+            self._notify(thread, stage, 'busy')
+            started = time.perf_counter()
+            try:
+                result = func(item)
+                failed = None
+            except Exception as e:
+                result, failed = None, e
+            elapsed = time.perf_counter() - started
+            self._notify(thread, stage, 'idle')
+            with self.lock:
+                timing['items'] += 1
+                timing['busy_s'] += elapsed
+                timing['max_s'] = max(timing['max_s'], elapsed)
+                timing['wait_s'] += started - enqueued_at
+                if failed is not None:
+                    timing['errors'] += 1
+                if result is None or outbox is None:
+                    self.finished += 1
+            if failed is not None and self.on_error:
+                self.on_error(item, stage, failed)
+            if result is not None and outbox is not None:
+                outbox.put((result, time.perf_counter()))
+
+    def _notify(self, thread, stage, event):
+        if self.on_thread:
+            try:
+                self.on_thread(thread, stage, event)
+            except Exception:
+                pass
+
+    def stats(self):
+        """{estágio: itens, erros, ms médio/máximo ocupado, ms médio na fila, fila atual}."""
+        with self.lock:
+            snapshot = {stage: dict(timing) for stage, timing in self.timings.items()}
+        result = {}
+        for (stage, _, workers), inbox in zip(self.stages, self.queues):
+            timing = snapshot[stage]
+            items = timing['items'] or 1
+            result[stage] = {
+                'workers': workers,
+                'items': timing['items'],
+                'errors': timing['errors'],
+                'busy_ms': round(timing['busy_s'] / items * 1000, 2),
+                'max_ms': round(timing['max_s'] * 1000, 2),
+                'wait_ms': round(timing['wait_s'] / items * 1000, 2),
+                'queue': inbox.qsize(),
+            }
+        return result
+
+    def close(self):
+        """Processa o que já entrou e encerra as threads, estágio por estágio."""
+        for inbox, threads in zip(self.queues, self.threads):
+            for _ in threads:
+                inbox.put(_STOP)
+            for thread in threads:
+                thread.join()
+        self.threads = []
+
+
+class OrderedDelivery:
+    """
+    Entrega os itens de um produtor na ordem em que foram numerados (`ticket`),
+    mesmo que cheguem fora de ordem de vários trabalhadores. Um único trabalhador
+    entrega por vez; os outros deixam o item e voltam ao pool.
+    """
+
+    def __init__(self, deliver, on_error=None):
+        self.deliver = deliver
+        self.on_error = on_error
+        self.cond = threading.Condition()
+        self.issued = 0
+        self.next_seq = 0
+        self.ready = {}
+        self.busy = False
+
+    def ticket(self):
+        with self.cond:
+            seq = self.issued
+            self.issued += 1
+            return seq
+
+    def put(self, seq, item):
+        self._arrive(seq, item)
+
+    def skip(self, seq):
+        """O item `seq` não será entregue (falhou antes): libera os seguintes."""
+        self._arrive(seq, _SKIPPED)
+
+    def _arrive(self, seq, item):
+        with self.cond:
+            self.ready[seq] = item
+            if self.busy:
+                return
+            self.busy = True
+        while True:
+            with self.cond:
+                item = self.ready.pop(self.next_seq, _MISSING)
+                if item is _MISSING:
+                    self.busy = False
+                    self.cond.notify_all()
+                    return
+                self.next_seq += 1
+            if item is _SKIPPED:
+                continue
+            try:
+                self.deliver(item)
+            except Exception as e:
+                if self.on_error:
+                    self.on_error(item, e)
+
+    def pending(self):
+        with self.cond:
+            return self.issued - self.next_seq
+
+    def idle(self):
+        """True se tudo o que foi numerado já foi entregue (inclusive o item em entrega)."""
+        with self.cond:
+            return self.next_seq >= self.issued and not self.busy
+
+    def wait_idle(self, timeout=None):
+        """Espera tudo o que foi numerado ser entregue. Retorna False no timeout."""
+        with self.cond:
+            return self.cond.wait_for(lambda: self.next_seq >= self.issued and not self.busy, timeout)
+
+
+# ============================================================================
+# BENCHMARK
+# ============================================================================
+
+def run_benchmark(records, navigation_s, workers, queue_size):
+    """Laço de captura simulado: pós-processamento na thread x no pipeline, sobrepondo a navegação."""
+    import copy
+    from content_hashes import annotate_record
+    from enrichment import enrich_record
+    from records_io import dumps_record
+
+    delivered = []
+
+    def process_inline(record):
+        enrich_record(record)
+        annotate_record(record)
+        delivered.append(dumps_record(record))
+
+    def capture_loop(handle):
+        batch = copy.deepcopy(records)
+        started = time.perf_counter()
+        for record in batch:
+            if navigation_s:
+                time.sleep(navigation_s)
+            handle(record)
+        return time.perf_counter() - started
+
+    print(f"{len(records)} questões, navegação simulada de {navigation_s * 1000:.0f} ms")
+    elapsed = capture_loop(process_inline)
+    print(f"  {'na thread da conta':28} {elapsed:8.2f}s  ({len(records) / elapsed:8,.0f} q/s)")
+
+    delivered.clear()
+    ordered = OrderedDelivery(delivered.append)
+    pipeline = Pipeline([
+        ('enrich', lambda item: (item[0], enrich_record(item[1])), workers),
+        ('hash', lambda item: (item[0], annotate_record(item[1])), workers),
+        ('serialize', lambda item: (item[0], dumps_record(item[1])), workers),
+        ('deliver', lambda item: ordered.put(*item), workers),
+    ], queue_size=queue_size, name='Bench').start()
+    started = time.perf_counter()
+    capture_s = capture_loop(lambda record: pipeline.submit((ordered.ticket(), record)))
+    ordered.wait_idle()
+    total_s = time.perf_counter() - started
+    pipeline.close()
+    print(f"  {'pipeline (laço de captura)':28} {capture_s:8.2f}s  ({len(records) / capture_s:8,.0f} q/s)")
+    print(f"  {'pipeline (até a entrega)':28} {total_s:8.2f}s  ({len(delivered)} entregues em ordem)")
+    for stage, timing in pipeline.stats().items():
+        print(f"    {stage:10} {timing['items']:6} itens  ocupado {timing['busy_ms']:7.2f} ms "
+              f"(máx {timing['max_ms']:.1f})  fila {timing['wait_ms']:7.2f} ms")
+    return total_s
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pipeline de pós-processamento das questões")
+    sub = parser.add_subparsers(dest='command', required=True)
+    p_bench = sub.add_parser('bench', help="Captura simulada: inline x pipeline")
+    p_bench.add_argument('--records', type=int, default=2000)
+    p_bench.add_argument('--navigation-ms', type=float, default=40, help="Tempo do navegador por questão")
+    p_bench.add_argument('--workers', type=int, default=1, help="Trabalhadores por estágio")
+    p_bench.add_argument('--queue-size', type=int, default=DEFAULT_QUEUE_SIZE)
+    args = parser.parse_args()
+
+    from synthetic_corpus import CorpusGenerator
+    records = list(CorpusGenerator().iterate(args.records))
+    run_benchmark(records, args.navigation_ms / 1000, args.workers, args.queue_size)
+
+
+if __name__ == "__main__":
+    main()
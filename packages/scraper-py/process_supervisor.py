@@ -0,0 +1,375 @@
+"""
+Modo multiprocesso: um processo por conta, coordenado por um supervisor.
+
+Supervisor (processo principal):
+- inicia um processo por conta (contexto 'spawn': o filho não herda threads)
+- publica o snapshot mmap de IDs (id_snapshot.py) quando a lista termina de carregar
+- repassa aos demais processos, em lotes, os IDs novos que cada conta extrai
+- recebe o status/contadores de cada conta e os expõe no ControlPlane e no StatsReporter
+- reinicia uma conta que caiu (código de saída != 0) a partir do checkpoint
+
+Mensagens (tuplas em multiprocessing.Queue):
+- supervisor -> conta: ('snapshot', caminho), ('ids', [ids]), ('event', 'login'|'start'), ('cmd', comando)
+- conta -> supervisor: ('new_id', conta, id), ('status', conta, {...}), ('exit', conta, {...}),
+  ('activity', conta, texto), ('console', conta, (stdout|stderr, linha)) (com o painel de terminal)
+"""
+import multiprocessing
+import queue
+import sys
+import threading
+import time
+
+from control_plane import COMMANDS, STATE_STOPPED
+
+
+class SharedIdIndex:
+    """Índice de IDs dentro de um processo de conta: snapshot mmap + IDs novos recebidos."""
+
+    def __init__(self, snapshot=None, publish=None):
+        self.snapshot = snapshot
+        self.local = set()
+        self.publish = publish
+
+    def attach_snapshot(self, snapshot):
+        self.snapshot = snapshot
+
+    def __contains__(self, question_id):
+        question_id = str(question_id)
+        return question_id in self.local or (self.snapshot is not None and question_id in self.snapshot)
+
+    def add(self, question_id):
+        """ID extraído por esta conta: guarda e avisa o supervisor."""
+        question_id = str(question_id)
+        self.local.add(question_id)
+        if self.publish:
+            self.publish(question_id)
+
+    def merge(self, ids):
+        """IDs extraídos por outras contas (repassados pelo supervisor)."""
+        self.local.update(ids)
+
+    def __len__(self):
+        return len(self.local) + (len(self.snapshot) if self.snapshot is not None else 0)
+
+
+class _LinkWriter:
+    """stdout/stderr de um processo de conta repassado linha a linha ao supervisor."""
+
+    def __init__(self, link, stream_name):
+        self.link = link
+        self.stream_name = stream_name
+        self.buffer = ''
+
+    def write(self, text):
+        self.buffer += text
+        if '\n' in self.buffer:
+            *lines, self.buffer = self.buffer.split('\n')
+            for line in lines:
+                if line.strip():
+                    self.link.outbox.put(('console', self.link.name, (self.stream_name, line)))
+        return len(text)
+
+    def flush(self):
+        pass
+
+    def isatty(self):
+        return False
+
+
+class WorkerLink:
+    """Lado do processo de conta: recebe mensagens do supervisor e envia IDs novos e status."""
+
+    def __init__(self, name, inbox, outbox):
+        self.name = name
+        self.inbox = inbox
+        self.outbox = outbox
+        self.stop_event = threading.Event()
+        self.threads = []
+
+    def publish_id(self, question_id):
+        self.outbox.put(('new_id', self.name, question_id))
+
+    def send_status(self, status):
+        self.outbox.put(('status', self.name, status))
+
+    def send_activity(self, text):
+        self.outbox.put(('activity', self.name, text))
+
+    def redirect_console(self):
+        """Passa o console deste processo pelo supervisor (que o entrega ao painel)."""
+        sys.stdout = _LinkWriter(self, 'stdout')
+        sys.stderr = _LinkWriter(self, 'stderr')
+
+    def start(self, handlers):
+        """Atende as mensagens do supervisor em uma thread: handlers[tipo](conteúdo)."""
+        def reader():
+            while not self.stop_event.is_set():
+                try:
+                    message = self.inbox.get(timeout=0.5)
+                except queue.Empty:
+                    continue
+                if message is None:
+                    break
+                kind, payload = message
+                handler = handlers.get(kind)
+                if handler:
+                    try:
+                        handler(payload)
+                    except Exception as e:
+                        print(f"⚠️  [{self.name}] Erro ao tratar '{kind}' do supervisor: {e}")
+
+        self._spawn(reader, "SupervisorInbox")
+
+    def start_status_loop(self, interval, snapshot):
+        """Envia `snapshot()` ao supervisor a cada `interval` segundos."""
+        def sender():
+            while not self.stop_event.wait(interval):
+                self.send_status(snapshot())
+            self.send_status(snapshot())
+
+        self._spawn(sender, "SupervisorStatus")
+
+    def _spawn(self, target, name):
+        thread = threading.Thread(target=target, name=name, daemon=True)
+        thread.start()
+        self.threads.append(thread)
+
+    def close(self, info=None):
+        self.stop_event.set()
+        for thread in self.threads:
+            thread.join(timeout=2)
+        self.outbox.put(('exit', self.name, info or {}))
+
+
+class WorkerProxy:
+    """Representa no ControlPlane do supervisor uma conta que roda em outro processo."""
+
+    def __init__(self, name, supervisor):
+        self.name = name
+        self.supervisor = supervisor
+        self.last_status = {'name': name, 'state': 'starting'}
+        self.restarts = 0
+        self.pid = None
+        self.stop_requested = False
+
+    @property
+    def state(self):
+        return self.last_status.get('state')
+
+    def _send(self, command):
+        self.supervisor.send(self.name, ('cmd', command))
+
+    def pause(self):
+        self._send('pause')
+
+    def resume(self):
+        self._send('resume')
+
+    def drain(self):
+        self.stop_requested = True
+        self._send('drain')
+
+    def stop(self):
+        self.stop_requested = True
+        self._send('stop')
+
+    def status(self):
+        status = dict(self.last_status)
+        status.update({'name': self.name, 'pid': self.pid, 'restarts': self.restarts})
+        return status
+
+
+class ProcessSupervisor:
+    """Inicia, acompanha e reinicia os processos de conta."""
+
+    def __init__(self, target, accounts, control_plane, stats_reporter, resume=False,
+                 max_restarts=3, restart_backoff=15, broadcast_interval=0.5, on_new_ids=None, on_activity=None, options=None):
+        self.context = multiprocessing.get_context('spawn')
+        self.target = target
+        self.accounts = list(accounts)
+        self.control_plane = control_plane
+        self.stats_reporter = stats_reporter
+        self.resume = resume
+        self.max_restarts = max_restarts
+        self.restart_backoff = restart_backoff
+        self.broadcast_interval = broadcast_interval
+        self.on_new_ids = on_new_ids
+        self.on_activity = on_activity
+        self.options = options or {}
+
+        self.events = self.context.Queue()
+        self.lock = threading.Lock()
+        self.workers = {}
+        self.proxies = {}
+        self.pending_restarts = {}
+        self.released_events = []
+        self.snapshot_path = None
+        self.new_ids = set()
+        self.outgoing_ids = []
+        self.done = threading.Event()
+        self.thread = None
+
+    # --- processos ---------------------------------------------------------------
+
+    def start(self, stagger=0.0):
+        for index, account in enumerate(self.accounts):
+            proxy = WorkerProxy(account['name'], self)
+            self.proxies[account['name']] = proxy
+            self.control_plane.attach(account['name'], proxy)
+            self._launch(account, index, restarted=False)
+            time.sleep(stagger)
+        self.thread = threading.Thread(target=self._run, name="Supervisor", daemon=True)
+        self.thread.start()
+
+    def _launch(self, account, index, restarted):
+        inbox = self.context.Queue()
+        process = self.context.Process(
+            target=self.target,
+            args=(account, index, inbox, self.events, self.resume or restarted, restarted, self.options),
+            name=f"Worker-{account['name']}",
+        )
+        process.start()
+        with self.lock:
+            self.workers[account['name']] = {'process': process, 'inbox': inbox, 'account': account, 'index': index}
+            self.proxies[account['name']].pid = process.pid
+            if self.snapshot_path:
+                inbox.put(('snapshot', self.snapshot_path))
+            if self.new_ids:
+                inbox.put(('ids', list(self.new_ids)))
+            # Uma conta reiniciada abre um navegador novo: o login/início é liberado pelo operador
+            if not restarted:
+                for event in self.released_events:
+                    inbox.put(('event', event))
+
+    def send(self, name, message):
+        with self.lock:
+            worker = self.workers.get(name)
+        if worker and worker['process'].is_alive():
+            worker['inbox'].put(message)
+
+    def broadcast(self, message, exclude=None):
+        with self.lock:
+            workers = [(n, w) for n, w in self.workers.items() if n != exclude]
+        for _, worker in workers:
+            if worker['process'].is_alive():
+                worker['inbox'].put(message)
+
+    def broadcast_event(self, name):
+        """Libera uma etapa global (login/start) em todas as contas."""
+        with self.lock:
+            self.released_events.append(name)
+        self.broadcast(('event', name))
+
+    def publish_snapshot(self, path):
+        """Snapshot mmap pronto: cada conta passa a consultá-lo."""
+        with self.lock:
+            self.snapshot_path = path
+        self.broadcast(('snapshot', path))
+
+    # --- laço do supervisor --------------------------------------------------------
+
+    def _run(self):
+        last_broadcast = time.time()
+        while True:
+            try:
+                message = self.events.get(timeout=0.2)
+                self._handle(message)
+            except queue.Empty:
+                pass
+
+            now = time.time()
+            if self.outgoing_ids and now - last_broadcast >= self.broadcast_interval:
+                ids, self.outgoing_ids = self.outgoing_ids, []
+                self.broadcast(('ids', ids))
+                last_broadcast = now
+
+            if self._check_processes(now):
+                break
+
+        # Status finais enviados pelas contas antes de sair
+        while True:
+            try:
+                self._handle(self.events.get(timeout=0.5))
+            except queue.Empty:
+                break
+        self.done.set()
+
+    def _handle(self, message):
+        kind, name, payload = message
+        if kind == 'new_id':
+            with self.lock:
+                self.new_ids.add(payload)
+            self.outgoing_ids.append(payload)
+            if self.on_new_ids:
+                self.on_new_ids([payload])
+        elif kind == 'status':
+            proxy = self.proxies.get(name)
+            if proxy:
+                proxy.last_status = payload.get('control', proxy.last_status)
+            counters = payload.get('counters')
+            if counters:
+                self.stats_reporter.register(name).set_values(counters)
+        elif kind == 'activity':
+            if self.on_activity:
+                self.on_activity(name, payload)
+        elif kind == 'console':
+            stream_name, line = payload
+            print(line, file=sys.stderr if stream_name == 'stderr' else sys.stdout)
+
+    def _check_processes(self, now):
+        """Reinicia contas que caíram. Retorna True quando todas terminaram."""
+        alive = 0
+        with self.lock:
+            workers = list(self.workers.items())
+        for name, worker in workers:
+            process = worker['process']
+            proxy = self.proxies[name]
+            if process.is_alive():
+                alive += 1
+                continue
+            if name in self.pending_restarts:
+                if now >= self.pending_restarts[name]:
+                    del self.pending_restarts[name]
+                    proxy.restarts += 1
+                    print(f"\n🔁 [{name}] Reiniciando processo (tentativa {proxy.restarts}/{self.max_restarts}) "
+                          f"a partir do checkpoint")
+                    print(f"   Faça login na nova janela e digite 'resume {name}'; "
+                          f"depois aplique os filtros e 'resume {name}' de novo")
+                    self._launch(worker['account'], worker['index'], restarted=True)
+                    alive += 1
+                else:
+                    alive += 1
+                continue
+            if worker.get('exited'):
+                continue
+
+            worker['exited'] = True
+            code = process.exitcode
+            if code != 0 and not proxy.stop_requested and proxy.restarts < self.max_restarts:
+                print(f"\n💥 [{name}] Processo terminou com código {code} - reinício em {self.restart_backoff}s")
+                self.pending_restarts[name] = now + self.restart_backoff
+                worker['exited'] = False
+                alive += 1
+            else:
+                if code != 0:
+                    print(f"\n💥 [{name}] Processo terminou com código {code} - sem novo reinício")
+                proxy.last_status = dict(proxy.last_status, state=STATE_STOPPED, exitcode=code)
+        return alive == 0
+
+    def join(self, timeout=None):
+        return self.done.wait(timeout)
+
+    def shutdown(self, timeout=15):
+        """Pede stop a todas as contas e encerra à força as que não saírem a tempo."""
+        for proxy in self.proxies.values():
+            proxy.stop()
+        deadline = time.time() + timeout
+        with self.lock:
+            workers = list(self.workers.values())
+        for worker in workers:
+            worker['process'].join(max(0.0, deadline - time.time()))
+            if worker['process'].is_alive():
+                worker['process'].terminate()
+
+
+__all__ = ['COMMANDS', 'ProcessSupervisor', 'SharedIdIndex', 'WorkerLink', 'WorkerProxy']
@@ -0,0 +1,312 @@
+"""
+Compressão por questão com dicionário treinado no nosso próprio corpus.
+
+Cada questão tem poucos KB e, sozinha, comprime mal com gzip: o compressor
+começa cada registro sem contexto. Mas as questões repetem muito vocabulário
+(chaves do JSON e de `detalhes`, nomes de bancas e órgãos, prefixos de URL do
+CDN, expressões jurídicas). Um dicionário pré-carregado (zlib `zdict`, até
+32 KB) dá esse contexto a cada registro, mantendo o acesso aleatório: cada
+questão é comprimida e descomprimida sozinha.
+
+Os dicionários são versionados e ficam ao lado dos dados:
+
+    <dir>/zdict_v0001.bin    dicionário
+    <dir>/zdict_v0001.json   metadados (amostras, tamanho, sha256, data)
+
+Cada registro gravado leva a versão do dicionário usado, então registros
+antigos continuam legíveis depois de um novo treino.
+
+Formato de um registro:
+    b'D' + versão (u16, big-endian) + deflate bruto com o dicionário
+    b'J' + JSON em UTF-8 (sem dicionário disponível)
+
+Uso:
+    python record_codec.py train output/ -d zdict/ --sample 5000
+    python record_codec.py bench output/ -d zdict/      # razão e MB/s x gzip x JSONL
+    python record_codec.py bench                        # questões sintéticas
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import random
+import re
+import struct
+import time
+import zlib
+from collections import Counter
+from datetime import datetime
+
+from records_io import dumps_record, iter_records
+
+MAX_DICT_SIZE = 32 * 1024          # Janela do deflate: bytes além disso não são usados
+DEFAULT_SAMPLE = 5000
+DEFAULT_LEVEL = 6
+FRAME_DICT = b'D'
+FRAME_JSON = b'J'
+VERSION = struct.Struct('>H')
+
+# Chaves ("materia":), valores curtos e trechos de textos longos do JSON serializado
+KEY_RE = re.compile(r'"[^"\\]{1,60}":')
+STRING_RE = re.compile(r'"((?:[^"\\]|\\.)*)"')
+WORD_RE = re.compile(r'\S+')
+MAX_SEGMENT = 160
+NGRAM = 4
+
+
+def _segments(line):
+    """Trechos candidatos de uma questão serializada (cada um contado uma vez por questão)."""
+    found = set(KEY_RE.findall(line))
+    for value in STRING_RE.findall(line):
+        if len(value) <= MAX_SEGMENT:
+            found.add(f'"{value}"')
+            # Prefixos de URL (CDN, site) se repetem mesmo quando o arquivo muda
+            if value.startswith('http'):
+                found.add(value[:value.rfind('/') + 1])
+        else:
+            words = WORD_RE.findall(value)
+            for i in range(0, max(len(words) - NGRAM + 1, 0), 2):
+                found.add(' '.join(words[i:i + NGRAM]) + ' ')
+    return found
+
+
+def train_dictionary(records, size=MAX_DICT_SIZE, min_count=3):
+    """
+    Monta um dicionário com os trechos que mais economizam bytes no corpus:
+    pontuação = (ocorrências - 1) x tamanho. Os mais valiosos ficam no final,
+    onde a distância até o registro (e o custo de referenciá-los) é menor.
+    """
+    counts = Counter()
+    samples = 0
+    for record in records:
+        counts.update(_segments(dumps_record(record)))
+        samples += 1
+
+    scored = sorted(
+        ((count - 1) * len(segment.encode('utf-8')), segment)
+        for segment, count in counts.items() if count >= min_count
+    )
+    chosen = []
+    total = 0
+    for score, segment in reversed(scored):
+        data = segment.encode('utf-8')
+        if total + len(data) > size:
+            continue
+        chosen.append(data)
+        total += len(data)
+    return b''.join(reversed(chosen)), samples
+
+
+class DictionaryStore:
+    """Dicionários versionados em um diretório ao lado dos dados."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.cache = {}
+
+    def _path(self, version, ext):
+        return os.path.join(self.directory, f"zdict_v{version:04d}.{ext}")
+
+    def versions(self):
+        if not os.path.isdir(self.directory):
+            return []
+        found = []
+        for name in os.listdir(self.directory):
+            match = re.fullmatch(r'zdict_v(\d{4})\.bin', name)
+            if match:
+                found.append(int(match.group(1)))
+        return sorted(found)
+
+    def latest(self):
+        versions = self.versions()
+        return versions[-1] if versions else None
+
+    def save(self, data, samples):
+        """Grava um novo dicionário e retorna sua versão."""
+        os.makedirs(self.directory, exist_ok=True)
+        version = (self.latest() or 0) + 1
+        with open(self._path(version, 'bin'), 'wb') as f:
+            f.write(data)
+        with open(self._path(version, 'json'), 'w', encoding='utf-8') as f:
+            json.dump({
+                'version': version, 'size': len(data), 'samples': samples,
+                'sha256': hashlib.sha256(data).hexdigest(),
+                'created_at': datetime.now().isoformat(timespec='seconds'),
+            }, f, indent=2)
+        self.cache[version] = data
+        return version
+
+    def load(self, version):
+        if version not in self.cache:
+            with open(self._path(version, 'bin'), 'rb') as f:
+                self.cache[version] = f.read()
+        return self.cache[version]
+
+
+class RecordCodec:
+    """Codifica/decodifica uma questão por vez (acesso aleatório)."""
+
+    def __init__(self, store, version=None, level=DEFAULT_LEVEL):
+        self.store = store
+        self.version = version if version is not None else store.latest()
+        self.level = level
+        self.zdict = store.load(self.version) if self.version else None
+
+    def encode(self, record):
+        data = dumps_record(record).encode('utf-8')
+        if not self.zdict:
+            return FRAME_JSON + data
+        compressor = zlib.compressobj(self.level, zlib.DEFLATED, -15, 9, zlib.Z_DEFAULT_STRATEGY, self.zdict)
+        return FRAME_DICT + VERSION.pack(self.version) + compressor.compress(data) + compressor.flush()
+
+    def decode(self, blob):
+        blob = bytes(blob)
+        if blob[:1] == FRAME_JSON:
+            return json.loads(blob[1:].decode('utf-8'))
+        if blob[:1] != FRAME_DICT:
+            raise ValueError("Registro com formato desconhecido")
+        (version,) = VERSION.unpack_from(blob, 1)
+        decompressor = zlib.decompressobj(-15, zdict=self.store.load(version))
+        data = decompressor.decompress(blob[1 + VERSION.size:]) + decompressor.flush()
+        return json.loads(data.decode('utf-8'))
+
+
+def load_codec(directory, level=DEFAULT_LEVEL):
+    """RecordCodec com o dicionário mais recente de `directory`, ou None se não houver."""
+    store = DictionaryStore(directory)
+    if store.latest() is None:
+        return None
+    return RecordCodec(store, level=level)
+
+
+# ============================================================================
+# BENCHMARK
+# ============================================================================
+
+def synthetic_records(count, seed=7):
+    """Questões sintéticas com vocabulário parecido com o real (quando não há corpus)."""
+    rng = random.Random(seed)
+    words = ("administração pública princípio legalidade servidor efetivo cargo comissão ato administrativo "
+             "poder discricionário vinculado controle judicial constituição federal direito fundamental lei "
+             "complementar ordinária competência união estados municípios licitação contrato tributo imposto "
+             "prazo recurso processo civil penal crime pena sentença tribunal supremo julgamento").split()
+    bancas = ['CESPE/CEBRASPE', 'FCC', 'FGV', 'VUNESP', 'CESGRANRIO', 'IBFC', 'QUADRIX', 'AOCP']
+    orgaos = ['TRF 1ª Região', 'Polícia Federal', 'Receita Federal', 'TJ-SP', 'INSS', 'Banco do Brasil', 'PGE-RJ']
+    materias = ['Direito Constitucional', 'Direito Administrativo', 'Português', 'Direito Penal', 'Contabilidade']
+
+    def text(n):
+        return ' '.join(rng.choice(words) for _ in range(n)).capitalize() + '.'
+
+    records = []
+    for i in range(count):
+        banca, orgao = rng.choice(bancas), rng.choice(orgaos)
+        records.append({
+            'id': str(1000000 + i), 'materia': rng.choice(materias), 'assunto': f"{text(3)} - {text(2)}",
+            'concurso': f"{banca} - {orgao} - Analista - {rng.randint(2010, 2024)}",
+            'enunciado': text(rng.randint(40, 120)), 'imagens_enunciado': [],
+            'alternativas': [{'letter': letter, 'text': text(rng.randint(8, 25))} for letter in 'ABCDE'],
+            'gabarito': rng.choice('ABCDE'), 'comentario': text(rng.randint(60, 250)),
+            'imagens_comentario': [f"https://s3.amazonaws.com/tecconcursos/imagens/{rng.getrandbits(64):x}.png"]
+            if rng.random() < 0.2 else [],
+            'detalhes': {'ano': str(rng.randint(2010, 2024)), 'banca': banca, 'orgão': orgao,
+                         'cargo_área_especialidade_edição': f"Analista / {rng.choice(materias)}",
+                         'tipo': 'Múltipla Escolha', 'dificuldade': rng.choice(['Fácil', 'Média', 'Difícil'])},
+            'extracted_at': datetime(2024, 1, 1).isoformat(),
+        })
+    return records
+
+
+def _rate(nbytes, seconds):
+    return nbytes / 1048576 / max(seconds, 1e-9)
+
+
+def run_benchmark(records, train_records, store, level=DEFAULT_LEVEL):
+    # Todos os formatos medem questão -> bytes -> questão (serialização e parse incluídos)
+    raw = sum(len(dumps_record(r).encode('utf-8')) + 1 for r in records)
+    results = [('JSONL sem compressão', raw, None, None)]
+
+    # gzip do arquivo inteiro: melhor razão, mas sem acesso aleatório
+    started = time.perf_counter()
+    whole = gzip.compress(''.join(dumps_record(r) + '\n' for r in records).encode('utf-8'), level)
+    t_comp = time.perf_counter() - started
+    started = time.perf_counter()
+    [json.loads(line) for line in gzip.decompress(whole).splitlines()]
+    t_dec = time.perf_counter() - started
+    results.append(('gzip do arquivo inteiro*', len(whole), _rate(raw, t_comp), _rate(raw, t_dec)))
+
+    started = time.perf_counter()
+    blobs = [zlib.compress(dumps_record(r).encode('utf-8'), level) for r in records]
+    t_comp = time.perf_counter() - started
+    started = time.perf_counter()
+    for blob in blobs:
+        json.loads(zlib.decompress(blob))
+    t_dec = time.perf_counter() - started
+    results.append(('zlib por questão', sum(map(len, blobs)), _rate(raw, t_comp), _rate(raw, t_dec)))
+
+    started = time.perf_counter()
+    data, samples = train_dictionary(train_records)
+    version = store.save(data, samples)
+    t_train = time.perf_counter() - started
+    codec = RecordCodec(store, version, level)
+    started = time.perf_counter()
+    blobs = [codec.encode(r) for r in records]
+    t_comp = time.perf_counter() - started
+    started = time.perf_counter()
+    for blob in blobs:
+        codec.decode(blob)
+    t_dec = time.perf_counter() - started
+    results.append((f'dicionário v{version} por questão', sum(map(len, blobs)), _rate(raw, t_comp), _rate(raw, t_dec)))
+
+    print(f"{len(records)} questões, {raw / 1048576:.1f} MiB em JSONL "
+          f"(dicionário de {len(data)} bytes treinado em {samples} questões em {t_train:.1f}s)")
+    print(f"  {'formato':32} {'tamanho':>10} {'razão':>7} {'comprime':>11} {'descomprime':>12}")
+    for label, size, comp, dec in results:
+        speed = f"{comp:8.1f} MB/s {dec:8.1f} MB/s" if comp else ''
+        print(f"  {label:32} {size / 1048576:8.2f} MiB {raw / size:6.2f}x {speed}")
+    print("  * sem acesso aleatório (é preciso descomprimir o arquivo até a questão)")
+    print("  MB/s sobre o tamanho do JSON, incluindo serialização e parse")
+
+
+def _sample(paths, count):
+    records = []
+    for record in iter_records(paths):
+        records.append(record)
+        if len(records) >= count:
+            break
+    return records
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compressão por questão com dicionário treinado")
+    sub = parser.add_subparsers(dest='command', required=True)
+    p_train = sub.add_parser('train', help="Treina e grava uma nova versão do dicionário")
+    p_train.add_argument('inputs', nargs='+', help="Arquivos JSON/JSONL de questões")
+    p_train.add_argument('-d', '--dict-dir', default='zdict')
+    p_train.add_argument('--sample', type=int, default=DEFAULT_SAMPLE, help="Questões usadas no treino")
+    p_train.add_argument('--size', type=int, default=MAX_DICT_SIZE)
+    p_bench = sub.add_parser('bench', help="Razão e MB/s: dicionário x zlib por questão x gzip x JSONL")
+    p_bench.add_argument('inputs', nargs='*', help="Arquivos de questões (padrão: sintéticas)")
+    p_bench.add_argument('-d', '--dict-dir', default='zdict_bench')
+    p_bench.add_argument('--records', type=int, default=5000)
+    p_bench.add_argument('--sample', type=int, default=2000, help="Questões usadas no treino")
+    p_bench.add_argument('--level', type=int, default=DEFAULT_LEVEL)
+    args = parser.parse_args()
+
+    if args.command == 'train':
+        data, samples = train_dictionary(_sample(args.inputs, args.sample), args.size)
+        version = DictionaryStore(args.dict_dir).save(data, samples)
+        print(f"📖 Dicionário v{version}: {len(data)} bytes de {samples} questões → {args.dict_dir}/")
+        return
+
+    if args.inputs:
+        records = _sample(args.inputs, args.records + args.sample)
+        train, records = records[:args.sample], records[args.sample:] or records
+    else:
+        # Treino e teste com questões diferentes (sementes diferentes)
+        train, records = synthetic_records(args.sample, seed=1), synthetic_records(args.records, seed=2)
+    run_benchmark(records, train, DictionaryStore(args.dict_dir), args.level)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Leitura e escrita de arquivos de questões extraídas.
+
+Formatos aceitos na leitura:
+- JSONL (uma questão por linha), opcionalmente comprimido (.gz)
+- JSON com lista de questões
+- JSON no formato do payload do webhook ({"data": [...]})
+"""
+import glob
+import gzip
+import json
+import os
+
+
+def expand_paths(patterns):
+    """Expande padrões glob e diretórios em uma lista ordenada de arquivos."""
+    paths = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            for name in sorted(os.listdir(pattern)):
+                if name.endswith(('.jsonl', '.jsonl.gz', '.json', '.json.gz')):
+                    paths.append(os.path.join(pattern, name))
+            continue
+
+        matches = sorted(glob.glob(pattern))
+        paths.extend(matches if matches else [pattern])
+    return paths
+
+
+def open_text(path, mode='rt'):
+    """Abre um arquivo texto em UTF-8, descomprimindo se terminar em .gz."""
+    if path.endswith('.gz'):
+        return gzip.open(path, mode, encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+def iter_file_records(path):
+    """Itera as questões de um único arquivo, sem carregá-lo inteiro quando for JSONL."""
+    base = path[:-3] if path.endswith('.gz') else path
+
+    with open_text(path) as f:
+        if base.endswith('.jsonl'):
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+            return
+
+        content = json.load(f)
+
+    if isinstance(content, dict):
+        content = content.get('data', [content])
+    for record in content:
+        yield record
+
+
+def iter_records(paths):
+    """Itera as questões de vários arquivos em sequência."""
+    for path in expand_paths(paths):
+        yield from iter_file_records(path)
+
+
+def dumps_record(record):
+    """Serializa uma questão em uma linha JSONL (sem escapar acentos)."""
+    return json.dumps(record, ensure_ascii=False, separators=(',', ':'))
+
+
+def write_jsonl(path, records):
+    """Escreve questões em JSONL e retorna quantas foram gravadas."""
+    count = 0
+    with open_text(path, 'wt') as f:
+        for record in records:
+            f.write(dumps_record(record))
+            f.write('\n')
+            count += 1
+    return count
@@ -0,0 +1,201 @@
+"""
+Lista de reparos para questões incompletas.
+
+Questões gravadas com `comentario = None`, `detalhes = {}` ou `gabarito = None`
+(painel que não abriu a tempo, ex.: "Timeout ao aguardar detalhes da questão")
+não precisam de uma nova extração completa: basta reabrir a questão e os
+painéis que faltaram.
+
+`build` lê arquivos de questões (JSONL/JSON, .gz, payloads do webhook e as
+entradas anexadas pelo scraper durante a extração, ver append_entry), fica só
+com a versão mais recente de cada ID e grava uma lista priorizada:
+
+    {"id": "123", "missing": ["gabarito", "detalhes"], "priority": 5,
+     "extracted_at": "...", "record": {<questão como está>}}
+
+Prioridade: gabarito (3) > detalhes (2) > comentário (1), somados; empates
+vão primeiro para as extrações mais antigas. O scraper consome a lista com
+`--repair` (RepairWorklist), abrindo só os painéis necessários e mesclando o
+resultado na questão existente (merge_repair).
+
+Uso:
+    python repair_worklist.py build output/ -o reparos.jsonl
+    python repair_worklist.py build 'questoes_*.jsonl.gz' -o reparos.jsonl --only detalhes
+    python repair_worklist.py stats reparos.jsonl
+"""
+import argparse
+import json
+import os
+import threading
+from collections import Counter
+from datetime import datetime
+
+from records_io import dumps_record, iter_records, open_text, write_jsonl
+
+PART_PRIORITY = {'gabarito': 3, 'detalhes': 2, 'comentario': 1}
+
+# Parte -> função que diz se ela está faltando na questão
+PART_CHECKS = {
+    'gabarito': lambda r: not r.get('gabarito'),
+    'detalhes': lambda r: not r.get('detalhes'),
+    'comentario': lambda r: not r.get('comentario'),
+}
+
+# Campos gravados por cada parte (mesclados na questão existente)
+PART_FIELDS = {
+    'gabarito': ('gabarito',),
+    'detalhes': ('detalhes',),
+    'comentario': ('comentario', 'imagens_comentario'),
+}
+
+
+def missing_parts(record, only=None):
+    """Partes que faltam na questão, da mais para a menos prioritária."""
+    parts = [part for part, check in PART_CHECKS.items() if (not only or part in only) and check(record)]
+    return sorted(parts, key=lambda part: -PART_PRIORITY[part])
+
+
+def build_worklist(paths, only=None):
+    """Lista de reparos (ordenada por prioridade) a partir de arquivos de questões."""
+    latest = {}
+    for record in iter_records(paths):
+        if 'missing' in record and isinstance(record.get('record'), dict):
+            record = record['record']
+        question_id = str(record.get('id') or '')
+        if not question_id:
+            continue
+        current = latest.get(question_id)
+        if current is None or (record.get('extracted_at') or '') >= (current.get('extracted_at') or ''):
+            latest[question_id] = record
+
+    entries = []
+    for question_id, record in latest.items():
+        parts = missing_parts(record, only)
+        if parts:
+            entries.append({
+                'id': question_id,
+                'missing': parts,
+                'priority': sum(PART_PRIORITY[part] for part in parts),
+                'extracted_at': record.get('extracted_at'),
+                'record': record,
+            })
+    entries.sort(key=lambda e: (-e['priority'], e['extracted_at'] or ''))
+    return entries, len(latest)
+
+
+def append_entry(path, record, parts):
+    """Anexa uma questão incompleta recém-extraída (lista em streaming, entra no próximo build)."""
+    entry = {
+        'id': str(record.get('id')),
+        'missing': parts,
+        'priority': sum(PART_PRIORITY[part] for part in parts),
+        'extracted_at': record.get('extracted_at'),
+        'record': record,
+    }
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(dumps_record(entry) + '\n')
+
+
+def merge_repair(record, repaired, parts):
+    """
+    Mescla na questão original as partes reparadas que vieram preenchidas.
+    Retorna (questão mesclada, partes corrigidas).
+    """
+    merged = dict(record)
+    fixed = []
+    for part in parts:
+        if PART_CHECKS[part](repaired):
+            continue
+        for field in PART_FIELDS[part]:
+            if field in repaired:
+                merged[field] = repaired[field]
+        fixed.append(part)
+    if fixed:
+        merged['reparado_em'] = datetime.now().isoformat()
+        merged['partes_reparadas'] = sorted(set(merged.get('partes_reparadas', [])) | set(fixed))
+    return merged, fixed
+
+
+class RepairWorklist:
+    """
+    Consumo da lista de reparos pelo scraper. Cada conta fica com uma fatia
+    (entradas i, i+n, ... na ordem de prioridade); IDs concluídos vão para
+    `<lista>.done` e são pulados ao reabrir a lista.
+    """
+
+    def __init__(self, path, shard=0, shards=1):
+        self.path = path
+        self.done_path = f"{path}.done"
+        self.lock = threading.Lock()
+        done = set()
+        if os.path.exists(self.done_path):
+            with open_text(self.done_path) as f:
+                done = {line.split('\t', 1)[0] for line in f if line.strip()}
+        self.entries = []
+        with open_text(path) as f:
+            for index, line in enumerate(f):
+                if index % shards != shard or not line.strip():
+                    continue
+                entry = json.loads(line)
+                if entry['id'] not in done:
+                    self.entries.append(entry)
+        self.entries.reverse()
+        self.total = len(self.entries)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def next(self):
+        """Próxima entrada (maior prioridade) ou None quando a fatia termina."""
+        with self.lock:
+            return self.entries.pop() if self.entries else None
+
+    def done(self, question_id, fixed):
+        """Registra o reparo (mesmo parcial) para não repetir a questão."""
+        with self.lock:
+            with open(self.done_path, 'a', encoding='utf-8') as f:
+                f.write(f"{question_id}\t{','.join(fixed)}\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lista de reparos de questões incompletas")
+    sub = parser.add_subparsers(dest='command', required=True)
+    p_build = sub.add_parser('build', help="Monta a lista a partir de arquivos de questões")
+    p_build.add_argument('inputs', nargs='+', help="Arquivos/diretórios/padrões de questões")
+    p_build.add_argument('-o', '--output', default='reparos.jsonl')
+    p_build.add_argument('--only', nargs='+', choices=sorted(PART_CHECKS), help="Só estas partes")
+    p_stats = sub.add_parser('stats', help="Resumo de uma lista (e do progresso em .done)")
+    p_stats.add_argument('worklist')
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        entries, unique = build_worklist(args.inputs, args.only)
+        write_jsonl(args.output, entries)
+        parts = Counter(part for entry in entries for part in entry['missing'])
+        print(f"🔧 {len(entries)} de {unique} questões precisam de reparo → {args.output}")
+        for part, count in parts.most_common():
+            print(f"   {part}: {count}")
+        return
+
+    parts = Counter()
+    total = 0
+    with open_text(args.worklist) as f:
+        for line in f:
+            if line.strip():
+                total += 1
+                parts.update(json.loads(line)['missing'])
+    done = Counter()
+    repaired = 0
+    if os.path.exists(f"{args.worklist}.done"):
+        with open(f"{args.worklist}.done", encoding='utf-8') as f:
+            for line in f:
+                question_id, _, fixed = line.rstrip('\n').partition('\t')
+                repaired += 1
+                done.update(p for p in fixed.split(',') if p)
+    print(f"🔧 {args.worklist}: {total} questões, {repaired} processadas")
+    for part, count in parts.most_common():
+        print(f"   {part}: {count} faltando, {done[part]} reparadas")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,400 @@
+"""
+Histórico de execuções em SQLite, para comparar desempenho entre runs.
+
+Cada execução grava em `run_history.sqlite3`:
+- runs          -> uma linha por execução (início/fim, rótulo, configuração, status)
+- run_accounts  -> resumo por conta e total ('*'): novas, puladas, webhook ok/falha,
+                   tempo total, taxas, latências (p50/p95), tempo pausado e parado por causa
+- samples       -> série temporal (a cada `sample_interval` s): taxas, latências,
+                   contas pausadas, RSS...
+
+`compare` mostra a variação de vazão e latência entre duas execuções e marca
+como regressão o que piorou além do limite (%).
+
+Uso:
+    python run_history.py list
+    python run_history.py show 12
+    python run_history.py compare            # penúltima x última
+    python run_history.py compare 10 12 --threshold 15
+    python run_history.py series 12 rate_new_1m --account conta1
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime
+
+DEFAULT_PATH = 'run_history.sqlite3'
+TOTAL = '*'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    started_at TEXT NOT NULL,
+    finished_at TEXT,
+    label TEXT,
+    status TEXT NOT NULL,
+    config TEXT
+);
+CREATE TABLE IF NOT EXISTS run_accounts (
+    run_id INTEGER NOT NULL,
+    account TEXT NOT NULL,
+    question_count INTEGER,
+    skipped_count INTEGER,
+    webhook_success INTEGER,
+    webhook_failed INTEGER,
+    total_time REAL,
+    metrics TEXT,
+    PRIMARY KEY (run_id, account)
+);
+CREATE TABLE IF NOT EXISTS samples (
+    run_id INTEGER NOT NULL,
+    ts REAL NOT NULL,
+    account TEXT NOT NULL,
+    metric TEXT NOT NULL,
+    value REAL
+);
+CREATE INDEX IF NOT EXISTS samples_run_metric ON samples (run_id, metric, account, ts);
+"""
+
+# Métrica -> (rótulo, maior é melhor?)
+COMPARED_METRICS = {
+    'new_per_min': ('Novas/min', True),
+    'processed_per_min': ('Processadas/min', True),
+    'extract_p50_s': ('Extração p50 (s)', False),
+    'extract_p95_s': ('Extração p95 (s)', False),
+    'webhook_p50_s': ('Webhook p50 (s)', False),
+    'webhook_p95_s': ('Webhook p95 (s)', False),
+    'webhook_failed_pct': ('Falhas webhook (%)', False),
+    'paused_pct': ('Tempo pausado (%)', False),
+}
+
+
+def percentile(values, fraction):
+    """Percentil por vizinho mais próximo (valores já ordenados)."""
+    if not values:
+        return None
+    index = min(len(values) - 1, max(0, int(round(fraction * (len(values) - 1)))))
+    return values[index]
+
+
+class RunHistory:
+    """Armazenamento das execuções (um SQLite em WAL)."""
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+        self.conn.commit()
+
+    def start_run(self, label=None, config=None):
+        with self.lock:
+            cursor = self.conn.execute(
+                "INSERT INTO runs (started_at, label, status, config) VALUES (?, ?, 'running', ?)",
+                (datetime.now().isoformat(timespec='seconds'), label,
+                 json.dumps(config or {}, ensure_ascii=False, default=str)),
+            )
+            self.conn.commit()
+            return cursor.lastrowid
+
+    def add_samples(self, run_id, rows):
+        """rows: (ts, conta, métrica, valor)."""
+        with self.lock:
+            self.conn.executemany(
+                "INSERT INTO samples (run_id, ts, account, metric, value) VALUES (?, ?, ?, ?, ?)",
+                [(run_id,) + tuple(row) for row in rows],
+            )
+            self.conn.commit()
+
+    def finish_run(self, run_id, accounts, status='finished'):
+        """accounts: conta (ou '*') -> métricas de resumo."""
+        with self.lock:
+            for account, metrics in accounts.items():
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO run_accounts VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (run_id, account, metrics.get('question_count'), metrics.get('skipped_count'),
+                     metrics.get('webhook_success'), metrics.get('webhook_failed'),
+                     metrics.get('total_time'), json.dumps(metrics, ensure_ascii=False)),
+                )
+            self.conn.execute(
+                "UPDATE runs SET finished_at = ?, status = ? WHERE id = ?",
+                (datetime.now().isoformat(timespec='seconds'), status, run_id),
+            )
+            self.conn.commit()
+
+    def runs(self, limit=20):
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT r.id, r.started_at, r.finished_at, r.label, r.status, a.metrics "
+                "FROM runs r LEFT JOIN run_accounts a ON a.run_id = r.id AND a.account = ? "
+                "ORDER BY r.id DESC LIMIT ?", (TOTAL, limit),
+            ).fetchall()
+        return [{
+            'id': row[0], 'started_at': row[1], 'finished_at': row[2], 'label': row[3],
+            'status': row[4], 'metrics': json.loads(row[5]) if row[5] else {},
+        } for row in rows]
+
+    def run(self, run_id):
+        """Execução com a configuração e as métricas de cada conta (None se não existir)."""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT id, started_at, finished_at, label, status, config FROM runs WHERE id = ?", (run_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            accounts = {
+                account: json.loads(metrics) for account, metrics in self.conn.execute(
+                    "SELECT account, metrics FROM run_accounts WHERE run_id = ?", (run_id,)
+                )
+            }
+        return {
+            'id': row[0], 'started_at': row[1], 'finished_at': row[2], 'label': row[3],
+            'status': row[4], 'config': json.loads(row[5]) if row[5] else {}, 'accounts': accounts,
+        }
+
+    def latest_ids(self, count=2):
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT id FROM runs WHERE status != 'running' ORDER BY id DESC LIMIT ?", (count,)
+            ).fetchall()
+        return [row[0] for row in reversed(rows)]
+
+    def series(self, run_id, metric, account=TOTAL):
+        with self.lock:
+            return self.conn.execute(
+                "SELECT ts, value FROM samples WHERE run_id = ? AND metric = ? AND account = ? ORDER BY ts",
+                (run_id, metric, account),
+            ).fetchall()
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+class RunRecorder:
+    """
+    Registra a execução atual: latências observadas pelas contas, amostras
+    periódicas (listener do StatsReporter) e o resumo final.
+    """
+
+    def __init__(self, history, label=None, config=None, sample_interval=60):
+        self.history = history
+        self.sample_interval = sample_interval
+        self.run_id = history.start_run(label, config)
+        self.started = time.time()
+        self.last_sample = 0.0
+        self.gauges = {}
+        # (conta, métrica) -> lista de durações; cada conta só anexa às suas listas
+        self.latencies = {}
+        self.sampled_upto = {}
+
+    def observe(self, account, metric, seconds):
+        """Registra uma duração (ex.: 'extract_s', 'webhook_s') de uma conta."""
+        key = (account, metric)
+        values = self.latencies.get(key)
+        if values is None:
+            values = self.latencies.setdefault(key, [])
+        values.append(seconds)
+
+    def add_gauge(self, name, func):
+        """Medidor amostrado junto com as taxas: `func()` retorna um número."""
+        self.gauges[name] = func
+
+    def on_tick(self, snapshot):
+        """Listener do StatsReporter: grava uma amostra a cada `sample_interval` segundos."""
+        if snapshot['time'] - self.last_sample >= self.sample_interval:
+            self.sample(snapshot)
+
+    def sample(self, snapshot):
+        """Grava uma amostra das taxas, latências do intervalo e medidores."""
+        now = self.last_sample = snapshot['time']
+        rows = [
+            (now, TOTAL, 'rate_new_1m', snapshot['rate_new']['1m']),
+            (now, TOTAL, 'rate_processed_1m', snapshot['rate_processed']['1m']),
+            (now, TOTAL, 'new', snapshot['totals']['new']),
+        ]
+        for account, values in snapshot['accounts'].items():
+            rows.append((now, account, 'rate_new_1m', values['rate_new']['1m']))
+            rows.append((now, account, 'rate_processed_1m', values['rate_processed']['1m']))
+            rows.append((now, account, 'idle_s', round(values['idle_s'], 1)))
+
+        # Latências do intervalo (só as observações novas desde a última amostra)
+        for (account, metric), values in list(self.latencies.items()):
+            start = self.sampled_upto.get((account, metric), 0)
+            window = sorted(values[start:len(values)])
+            self.sampled_upto[(account, metric)] = start + len(window)
+            if window:
+                base = metric[:-2] if metric.endswith('_s') else metric
+                rows.append((now, account, f"{base}_p50_s", round(percentile(window, 0.5), 3)))
+                rows.append((now, account, f"{base}_p95_s", round(percentile(window, 0.95), 3)))
+
+        for name, func in self.gauges.items():
+            try:
+                value = func()
+            except Exception:
+                continue
+            if value is not None:
+                rows.append((now, TOTAL, name, value))
+        self.history.add_samples(self.run_id, rows)
+
+    def _latency_metrics(self, account=None):
+        metrics = {}
+        names = {metric for _, metric in self.latencies}
+        for metric in sorted(names):
+            values = sorted(
+                v for (acc, m), vals in self.latencies.items()
+                if m == metric and (account is None or acc == account) for v in vals
+            )
+            if values:
+                base = metric[:-2] if metric.endswith('_s') else metric
+                metrics[f"{base}_p50_s"] = round(percentile(values, 0.5), 3)
+                metrics[f"{base}_p95_s"] = round(percentile(values, 0.95), 3)
+                metrics[f"{base}_count"] = len(values)
+        return metrics
+
+    def finish(self, final_snapshot, account_info=None, status='finished'):
+        """
+        Grava o resumo por conta e total. `account_info`: conta -> extras
+        (total_time, paused_s, stall_seconds por causa...).
+        """
+        account_info = account_info or {}
+        elapsed = max(final_snapshot['elapsed_s'], 1e-9)
+        summary = {}
+        for account, values in final_snapshot['accounts'].items():
+            info = dict(account_info.get(account, {}))
+            total_time = info.get('total_time') or elapsed
+            metrics = _rates(values, total_time, info.get('paused_s', 0.0))
+            metrics.update(info)
+            metrics['total_time'] = round(total_time, 1)
+            metrics.update(self._latency_metrics(account))
+            summary[account] = metrics
+
+        paused = sum(m.get('paused_s', 0.0) for m in summary.values())
+        total = _rates(final_snapshot['totals'], elapsed, paused / max(len(summary), 1))
+        total.update(self._latency_metrics())
+        total['total_time'] = round(elapsed, 1)
+        total['accounts'] = len(summary)
+        summary[TOTAL] = total
+
+        self.sample(final_snapshot)
+        self.history.finish_run(self.run_id, summary, status)
+        return summary
+
+
+def _rates(values, seconds, paused_s):
+    minutes = max(seconds, 1e-9) / 60
+    sent = values['webhook_success'] + values['webhook_failed']
+    return {
+        'question_count': values['new'],
+        'skipped_count': values['skipped'],
+        'webhook_success': values['webhook_success'],
+        'webhook_failed': values['webhook_failed'],
+        'new_per_min': round(values['new'] / minutes, 2),
+        'processed_per_min': round((values['new'] + values['skipped']) / minutes, 2),
+        'webhook_failed_pct': round(100 * values['webhook_failed'] / sent, 2) if sent else 0.0,
+        'paused_s': round(paused_s, 1),
+        'paused_pct': round(100 * paused_s / max(seconds, 1e-9), 2),
+    }
+
+
+# ============================================================================
+# COMPARAÇÃO
+# ============================================================================
+
+def compare_runs(before, after, threshold=10.0, account=TOTAL):
+    """Linhas (métrica, antes, depois, variação %, regressão?) entre duas execuções."""
+    old = before['accounts'].get(account, {})
+    new = after['accounts'].get(account, {})
+    rows = []
+    for metric, (label, higher_is_better) in COMPARED_METRICS.items():
+        a, b = old.get(metric), new.get(metric)
+        if a is None or b is None:
+            continue
+        if a:
+            delta = 100 * (b - a) / abs(a)
+        else:
+            delta = 0.0 if not b else float('inf')
+        worse = -delta if higher_is_better else delta
+        rows.append({'metric': metric, 'label': label, 'before': a, 'after': b,
+                     'delta_pct': delta, 'regression': worse > threshold})
+    return rows
+
+
+def _print_compare(history, run_a, run_b, threshold, account):
+    before, after = history.run(run_a), history.run(run_b)
+    for run_id, run in ((run_a, before), (run_b, after)):
+        if run is None:
+            sys.exit(f"Execução {run_id} não encontrada")
+    rows = compare_runs(before, after, threshold, account)
+
+    print(f"\nComparação #{run_a} ({before['label'] or before['started_at']}) → "
+          f"#{run_b} ({after['label'] or after['started_at']}) | conta: {account} | limite: {threshold}%")
+    print("-" * 78)
+    for row in rows:
+        flag = "⚠️  REGRESSÃO" if row['regression'] else ""
+        delta = f"{row['delta_pct']:+.1f}%" if row['delta_pct'] != float('inf') else "novo"
+        print(f"  {row['label']:22} {row['before']:>10} → {row['after']:<10} {delta:>9}  {flag}")
+    changed = {k: (before['config'].get(k), v) for k, v in after['config'].items()
+               if before['config'].get(k) != v}
+    if changed:
+        print("\nConfiguração alterada:")
+        for key, (a, b) in sorted(changed.items()):
+            print(f"  {key}: {a} → {b}")
+    regressions = [row for row in rows if row['regression']]
+    print(f"\n{len(regressions)} regressão(ões) acima de {threshold}%")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Histórico de execuções do scraper")
+    parser.add_argument('--db', default=DEFAULT_PATH)
+    sub = parser.add_subparsers(dest='command', required=True)
+    p_list = sub.add_parser('list', help="Últimas execuções")
+    p_list.add_argument('--limit', type=int, default=20)
+    p_show = sub.add_parser('show', help="Resumo de uma execução por conta")
+    p_show.add_argument('run_id', type=int)
+    p_cmp = sub.add_parser('compare', help="Variação de vazão/latência entre duas execuções")
+    p_cmp.add_argument('runs', nargs='*', type=int, help="ANTES DEPOIS (padrão: penúltima e última)")
+    p_cmp.add_argument('--threshold', type=float, default=10.0, help="Piora (%%) considerada regressão")
+    p_cmp.add_argument('--account', default=TOTAL, help="Conta a comparar (padrão: total)")
+    p_series = sub.add_parser('series', help="Série temporal de uma métrica")
+    p_series.add_argument('run_id', type=int)
+    p_series.add_argument('metric')
+    p_series.add_argument('--account', default=TOTAL)
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        sys.exit(f"{args.db} não encontrado")
+    history = RunHistory(args.db)
+
+    if args.command == 'list':
+        for run in history.runs(args.limit):
+            m = run['metrics']
+            print(f"#{run['id']:<5} {run['started_at']}  {run['status']:<11} {run['label'] or '':<20} "
+                  f"novas {m.get('question_count', '-'):>6} | {m.get('new_per_min', '-'):>7}/min | "
+                  f"p95 extração {m.get('extract_p95_s', '-')}s")
+    elif args.command == 'show':
+        run = history.run(args.run_id)
+        if run is None:
+            sys.exit(f"Execução {args.run_id} não encontrada")
+        print(json.dumps(run, ensure_ascii=False, indent=2))
+    elif args.command == 'compare':
+        runs = args.runs or history.latest_ids(2)
+        if len(runs) != 2:
+            sys.exit("Informe duas execuções (ou tenha pelo menos duas finalizadas)")
+        regressions = _print_compare(history, runs[0], runs[1], args.threshold, args.account)
+        history.close()
+        sys.exit(1 if regressions else 0)
+    elif args.command == 'series':
+        for ts, value in history.series(args.run_id, args.metric, args.account):
+            print(f"{datetime.fromtimestamp(ts).isoformat(timespec='seconds')}  {value}")
+    history.close()
+
+
+if __name__ == "__main__":
+    main()
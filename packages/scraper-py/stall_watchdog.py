@@ -0,0 +1,235 @@
+"""
+Watchdog de contas travadas.
+
+Cada conta mantém um `Heartbeat` atualizado de dentro do loop (fase atual e
+último comando do WebDriver). Uma thread verifica periodicamente os heartbeats;
+quando uma conta passa do limite sem bater, grava em um arquivo de diagnóstico:
+- a pilha Python da thread da conta (sys._current_frames)
+- a fase atual e o último comando WebDriver (e há quanto tempo está em andamento)
+- o dump de todas as threads (faulthandler)
+
+Threads de trabalho (pipeline de pós-processamento) também podem registrar
+heartbeat: na fase `IDLE_PHASE` (esperando trabalho) não são monitoradas.
+
+O tempo travado é somado por causa (comando WebDriver, WebDriverWait, HTTP,
+pausa do operador ou fase) e gravado em <diagnostics>/stall_summary.json.
+"""
+import faulthandler
+import json
+import os
+import sys
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+from datetime import datetime
+
+# Fases em que a espera é esperada: contam tempo, mas não geram dump
+EXPECTED_PHASES = {'aguardando_login', 'aguardando_inicio', 'pausa'}
+# Thread sem trabalho (fila vazia): não conta tempo nem gera dump
+IDLE_PHASE = 'ocioso'
+
+
+class Heartbeat:
+    """Batimento de uma conta: fase atual e último comando do WebDriver."""
+
+    def __init__(self, name, thread_id):
+        self.name = name
+        self.thread_id = thread_id
+        self.phase = 'iniciando'
+        self.last_beat = time.time()
+        self.webdriver_command = None
+        self.webdriver_started = None
+        self.webdriver_in_flight = False
+        self.stalled_since = None
+        self.stall_cause = None
+        self.stall_seconds = {}
+        self.stall_count = {}
+        self.finished = False
+        self.lock = threading.Lock()
+
+    def beat(self, phase=None):
+        """Marca atividade (opcionalmente trocando de fase)."""
+        now = time.time()
+        with self.lock:
+            if phase is not None:
+                self.phase = phase
+            self.last_beat = now
+            if self.stalled_since is not None:
+                cause = self.stall_cause
+                self.stall_seconds[cause] = self.stall_seconds.get(cause, 0.0) + (now - self.stalled_since)
+                self.stalled_since = None
+                self.stall_cause = None
+
+    def finish(self):
+        """Marca a conta como encerrada (deixa de ser monitorada)."""
+        self.beat('finalizado')
+        self.finished = True
+
+    @contextmanager
+    def phase_scope(self, phase):
+        """Executa um bloco em uma fase e volta para a fase anterior ao sair."""
+        previous = self.phase
+        self.beat(phase)
+        try:
+            yield
+        finally:
+            self.beat(previous)
+
+    def webdriver_start(self, command):
+        with self.lock:
+            self.webdriver_command = command
+            self.webdriver_started = time.time()
+            self.webdriver_in_flight = True
+
+    def webdriver_end(self):
+        with self.lock:
+            self.webdriver_in_flight = False
+        self.beat()
+
+
+def instrument_driver(driver, heartbeat):
+    """Registra no heartbeat cada comando enviado ao chromedriver."""
+    original_execute = driver.execute
+
+    def execute(driver_command, params=None):
+        heartbeat.webdriver_start(driver_command)
+        try:
+            return original_execute(driver_command, params)
+        finally:
+            heartbeat.webdriver_end()
+
+    driver.execute = execute
+    return driver
+
+
+def classify_stall(heartbeat, stack_text, now):
+    """Determina a causa provável de uma conta estar parada."""
+    if heartbeat.phase in EXPECTED_PHASES:
+        return heartbeat.phase
+    if heartbeat.webdriver_in_flight:
+        return f"webdriver:{heartbeat.webdriver_command}"
+    if 'support/wait.py' in stack_text or 'support\\wait.py' in stack_text:
+        return 'webdriver_wait'
+    if 'requests/' in stack_text or 'urllib3/' in stack_text or 'requests\\' in stack_text:
+        return 'http'
+    if 'time.sleep' in stack_text or 'human_delay' in stack_text:
+        return f"delay:{heartbeat.phase}"
+    return f"fase:{heartbeat.phase}"
+
+
+class Watchdog:
+    """Thread que verifica os heartbeats e grava diagnósticos de contas travadas."""
+
+    def __init__(self, threshold=60, interval=5, diagnostics_dir='diagnostics'):
+        self.threshold = threshold
+        self.interval = interval
+        self.diagnostics_dir = diagnostics_dir
+        self.heartbeats = {}
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.dumps_written = 0
+
+    def register(self, name):
+        """Registra a thread atual como a conta `name` e retorna seu heartbeat."""
+        heartbeat = Heartbeat(name, threading.get_ident())
+        with self.lock:
+            self.heartbeats[name] = heartbeat
+        return heartbeat
+
+    def get(self, name):
+        with self.lock:
+            return self.heartbeats.get(name)
+
+    def start(self):
+        os.makedirs(self.diagnostics_dir, exist_ok=True)
+        self.thread = threading.Thread(target=self._run, name="Watchdog", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join(timeout=self.interval + 1)
+        self.check()
+        self.write_summary()
+
+    def _run(self):
+        while not self.stop_event.wait(self.interval):
+            try:
+                self.check()
+            except Exception as e:
+                print(f"⚠️  Watchdog: erro na verificação: {e}")
+
+    def check(self):
+        """Verifica todas as contas uma vez."""
+        now = time.time()
+        frames = sys._current_frames()
+        with self.lock:
+            heartbeats = list(self.heartbeats.values())
+
+        for hb in heartbeats:
+            with hb.lock:
+                idle = now - hb.last_beat
+                already = hb.stalled_since is not None
+            if hb.finished or hb.phase == IDLE_PHASE or idle < self.threshold or already:
+                continue
+
+            frame = frames.get(hb.thread_id)
+            stack_text = ''.join(traceback.format_stack(frame)) if frame else '(thread finalizada)\n'
+            cause = classify_stall(hb, stack_text, now)
+
+            with hb.lock:
+                hb.stalled_since = hb.last_beat
+                hb.stall_cause = cause
+                hb.stall_count[cause] = hb.stall_count.get(cause, 0) + 1
+
+            if hb.phase not in EXPECTED_PHASES:
+                self._dump(hb, cause, idle, stack_text)
+
+    def _dump(self, hb, cause, idle, stack_text):
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        path = os.path.join(self.diagnostics_dir, f"stall_{hb.name.replace(' ', '_')}_{timestamp}.txt")
+        webdriver_age = time.time() - hb.webdriver_started if hb.webdriver_started else None
+
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(f"Conta: {hb.name}\n")
+            f.write(f"Parada há: {idle:.1f}s (limite {self.threshold}s)\n")
+            f.write(f"Causa provável: {cause}\n")
+            f.write(f"Fase: {hb.phase}\n")
+            f.write(f"Último comando WebDriver: {hb.webdriver_command} "
+                    f"({'em andamento' if hb.webdriver_in_flight else 'concluído'}"
+                    f"{f', há {webdriver_age:.1f}s' if webdriver_age is not None else ''})\n")
+            f.write("\n--- Pilha da thread da conta ---\n")
+            f.write(stack_text)
+            f.write("\n--- Todas as threads (faulthandler) ---\n")
+            f.flush()
+            faulthandler.dump_traceback(file=f, all_threads=True)
+
+        self.dumps_written += 1
+        print(f"\n🐶 [{hb.name}] parada há {idle:.0f}s ({cause}) - diagnóstico: {path}")
+
+    def summary(self):
+        """Tempo parado (s) e ocorrências por causa, por conta."""
+        now = time.time()
+        result = {}
+        with self.lock:
+            heartbeats = list(self.heartbeats.values())
+        for hb in heartbeats:
+            with hb.lock:
+                seconds = dict(hb.stall_seconds)
+                if hb.stalled_since is not None:
+                    seconds[hb.stall_cause] = seconds.get(hb.stall_cause, 0.0) + (now - hb.stalled_since)
+                result[hb.name] = {
+                    'stall_seconds': {k: round(v, 1) for k, v in seconds.items()},
+                    'stall_count': dict(hb.stall_count),
+                    'phase': hb.phase,
+                }
+        return result
+
+    def write_summary(self):
+        os.makedirs(self.diagnostics_dir, exist_ok=True)
+        path = os.path.join(self.diagnostics_dir, 'stall_summary.json')
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.summary(), f, ensure_ascii=False, indent=2)
+        return path
@@ -0,0 +1,259 @@
+"""
+Gerador de corpus sintético no formato de `extract_question_data`.
+
+Produz questões realistas para testar a entrega e o armazenamento (webhook,
+checkpoint, dedup, carregadores) sem extrações reais:
+- enunciados e comentários longos (tamanho log-normal, cauda de vários KB)
+- múltipla escolha (A–E ou A–D) e certo/errado (CESPE), com gabarito coerente
+- listas de imagens no enunciado, nas alternativas e no comentário
+- `detalhes` com chaves variadas (ano, banca, órgão sempre; as demais com
+  frequências diferentes; às vezes vazio, como quando o painel não abre)
+- taxas controláveis de duplicatas exatas (mesmo ID e conteúdo, outra
+  extração) e quase duplicatas (mesmo ID com comentário, gabarito ou detalhes
+  alterados)
+
+A geração é em streaming (memória constante), então 1M+ questões vão direto
+para um JSONL (.gz). Junto vai `<saida>.meta.json` com os parâmetros e as
+contagens esperadas (únicas, duplicatas, quase duplicatas).
+
+Uso:
+    python synthetic_corpus.py -o corpus.jsonl.gz --records 1000000 --dup-rate 0.3 --near-dup-rate 0.05
+    python synthetic_corpus.py -o pequeno.jsonl --records 5000 --seed 42
+"""
+import argparse
+import json
+import math
+import random
+import time
+from datetime import datetime, timedelta
+
+from records_io import dumps_record, open_text
+
+WORDS = (
+    "administração pública princípio legalidade moralidade impessoalidade publicidade eficiência servidor "
+    "efetivo cargo comissão função confiança ato administrativo poder discricionário vinculado controle "
+    "judicial legislativo constituição federal direito fundamental garantia individual coletivo lei "
+    "complementar ordinária decreto regulamento competência união estados municípios distrito licitação "
+    "pregão concorrência contrato convênio tributo imposto taxa contribuição prazo recurso processo civil "
+    "penal crime pena sentença acórdão tribunal supremo superior julgamento jurisprudência súmula "
+    "vinculante doutrina majoritária entendimento responsabilidade objetiva subjetiva dano indenização "
+    "agente público particular empresa estatal autarquia fundação sociedade economia mista orçamento "
+    "receita despesa empenho liquidação pagamento concurso candidato edital banca examinadora"
+).split()
+BANCAS = ['CESPE/CEBRASPE', 'FCC', 'FGV', 'VUNESP', 'CESGRANRIO', 'IBFC', 'QUADRIX', 'AOCP', 'IDECAN', 'FUNDATEC']
+ORGAOS = ['TRF 1ª Região', 'Polícia Federal', 'Receita Federal', 'TJ-SP', 'INSS', 'Banco do Brasil', 'PGE-RJ',
+          'TCU', 'SEFAZ-MG', 'Câmara dos Deputados', 'MPU', 'TRT 2ª Região', 'Prefeitura de São Paulo']
+CARGOS = ['Analista Judiciário', 'Técnico Judiciário', 'Auditor Fiscal', 'Agente de Polícia', 'Procurador',
+          'Escriturário', 'Analista Legislativo', 'Técnico do Seguro Social', 'Delegado']
+MATERIAS = {
+    'Direito Constitucional': ['Direitos Fundamentais', 'Organização do Estado', 'Controle de Constitucionalidade'],
+    'Direito Administrativo': ['Atos Administrativos', 'Licitações', 'Agentes Públicos', 'Responsabilidade Civil'],
+    'Língua Portuguesa': ['Interpretação de Textos', 'Sintaxe', 'Concordância', 'Crase'],
+    'Direito Penal': ['Teoria do Crime', 'Crimes contra a Administração', 'Penas'],
+    'Contabilidade Geral': ['Demonstrações Contábeis', 'Patrimônio', 'Lançamentos'],
+    'Raciocínio Lógico': ['Proposições', 'Análise Combinatória', 'Probabilidade'],
+    'Direito Tributário': ['Obrigação Tributária', 'Crédito Tributário', 'Competência Tributária'],
+}
+# Chave de `detalhes` -> (probabilidade de aparecer, valores)
+OPTIONAL_DETAILS = {
+    'cargo_área_especialidade_edição': (0.85, None),
+    'tipo': (0.8, None),
+    'dificuldade': (0.6, ['Fácil', 'Média', 'Difícil', 'Muito Difícil']),
+    'nível': (0.5, ['Superior', 'Médio', 'Fundamental']),
+    'modalidade': (0.3, ['Prova Objetiva', 'Prova Discursiva']),
+    'área': (0.25, ['Jurídica', 'Fiscal', 'Policial', 'Bancária', 'Legislativa', 'Controle']),
+    'prova': (0.2, ['Tipo 1', 'Tipo 2', 'Caderno A', 'Caderno B']),
+    'aplicação': (0.1, None),
+    'questão_anulada': (0.03, ['Sim']),
+    'desatualizada': (0.05, ['Sim']),
+}
+CDN = "https://s3.amazonaws.com/tecconcursos/imagens"
+
+
+class CorpusGenerator:
+    """Gera questões sintéticas (iterável, infinito se `count` for None)."""
+
+    def __init__(self, seed=7, dup_rate=0.0, near_dup_rate=0.0, true_false_rate=0.35, image_rate=0.15,
+                 incomplete_rate=0.02, comment_median=1500, first_id=1_000_000, recent=20000):
+        self.rng = random.Random(seed)
+        self.dup_rate = dup_rate
+        self.near_dup_rate = near_dup_rate
+        self.true_false_rate = true_false_rate
+        self.image_rate = image_rate
+        self.incomplete_rate = incomplete_rate
+        self.comment_mu = math.log(comment_median)
+        self.next_id = first_id
+        self.recent = []
+        self.recent_size = recent
+        self.clock = datetime(2024, 1, 1)
+        self.counts = {'total': 0, 'unique': 0, 'duplicates': 0, 'near_duplicates': 0}
+        # Frases pré-montadas: textos longos saem de frases sorteadas, não palavra a palavra
+        self.sentences = [self._sentence() for _ in range(4000)]
+
+    def _sentence(self):
+        words = [self.rng.choice(WORDS) for _ in range(self.rng.randint(8, 28))]
+        return ' '.join(words).capitalize() + self.rng.choice(['.', '.', '.', ';', '?'])
+
+    def _text(self, chars):
+        parts, size = [], 0
+        while size < chars:
+            sentence = self.rng.choice(self.sentences)
+            parts.append(sentence)
+            size += len(sentence) + 1
+            if self.rng.random() < 0.12:
+                parts.append('\n\n')
+        return ' '.join(parts).replace(' \n\n ', '\n\n').strip()
+
+    def _images(self, rate, most=3):
+        if self.rng.random() >= rate:
+            return []
+        return [f"{CDN}/{self.rng.getrandbits(64):016x}.{self.rng.choice(['png', 'png', 'jpg', 'gif'])}"
+                for _ in range(self.rng.randint(1, most))]
+
+    def _tick(self):
+        self.clock += timedelta(seconds=self.rng.uniform(3, 25))
+        return self.clock.isoformat()
+
+    def _new_record(self):
+        rng = self.rng
+        question_id = str(self.next_id)
+        self.next_id += rng.randint(1, 3)
+        materia = rng.choice(list(MATERIAS))
+        banca = rng.choice(BANCAS)
+        true_false = rng.random() < (self.true_false_rate * 2.2 if banca == 'CESPE/CEBRASPE' else self.true_false_rate / 2)
+        orgao, cargo, ano = rng.choice(ORGAOS), rng.choice(CARGOS), rng.randint(2008, 2025)
+
+        if true_false:
+            alternativas = [{'letter': 'C', 'text': 'Certo'}, {'letter': 'E', 'text': 'Errado'}]
+        else:
+            alternativas = []
+            for letter in ('ABCDE' if rng.random() < 0.8 else 'ABCD'):
+                alt = {'letter': letter, 'text': self._text(int(rng.lognormvariate(4.6, 0.6)))}
+                images = self._images(self.image_rate / 4, most=1)
+                if images:
+                    alt['imagens'] = images
+                alternativas.append(alt)
+
+        detalhes = {'ano': str(ano), 'banca': banca, 'orgão': orgao}
+        for key, (probability, values) in OPTIONAL_DETAILS.items():
+            if rng.random() < probability:
+                if key == 'cargo_área_especialidade_edição':
+                    detalhes[key] = f"{cargo} / {rng.choice(MATERIAS[materia])}"
+                elif key == 'tipo':
+                    detalhes[key] = 'Certo/Errado' if true_false else 'Múltipla Escolha'
+                elif key == 'aplicação':
+                    detalhes[key] = f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/{ano}"
+                else:
+                    detalhes[key] = rng.choice(values)
+
+        record = {
+            'id': question_id,
+            'materia': materia,
+            'assunto': f"{rng.choice(MATERIAS[materia])} - {self.rng.choice(self.sentences)[:40].rstrip('.;? ')}",
+            'concurso': f"{banca} - {orgao} - {cargo} - {ano}",
+            'imagens_enunciado': self._images(self.image_rate),
+            'enunciado': self._text(int(rng.lognormvariate(6.4, 0.55))),
+            'alternativas': alternativas,
+            'gabarito': rng.choice('CE') if true_false else rng.choice([a['letter'] for a in alternativas]),
+            'comentario': self._text(int(rng.lognormvariate(self.comment_mu, 0.8))),
+            'detalhes': detalhes,
+        }
+        comment_images = self._images(self.image_rate * 1.5, most=4)
+        if comment_images:
+            record['imagens_comentario'] = comment_images
+
+        # Extrações incompletas (painel que não abriu a tempo)
+        if rng.random() < self.incomplete_rate:
+            missing = rng.choice(['gabarito', 'comentario', 'detalhes'])
+            record[missing] = {} if missing == 'detalhes' else None
+            record.pop('imagens_comentario', None) if missing == 'comentario' else None
+
+        total = (len(record['imagens_enunciado']) + len(record.get('imagens_comentario', []))
+                 + sum(len(a.get('imagens', [])) for a in alternativas))
+        if total:
+            record['total_imagens'] = total
+        return record
+
+    def _near_duplicate(self, original):
+        record = json.loads(json.dumps(original))
+        change = self.rng.choice(['comentario', 'gabarito', 'detalhes'])
+        if change == 'comentario' or not record.get('alternativas'):
+            record['comentario'] = ((record.get('comentario') or '') + ' ' + self.rng.choice(self.sentences)).strip()
+        elif change == 'gabarito':
+            letters = [a['letter'] for a in record['alternativas'] if a['letter'] != record.get('gabarito')]
+            record['gabarito'] = self.rng.choice(letters) if letters else record.get('gabarito')
+        else:
+            record['detalhes'] = dict(record.get('detalhes') or {}, desatualizada='Sim')
+        return record
+
+    def next(self):
+        roll = self.rng.random()
+        if self.recent and roll < self.dup_rate:
+            record = dict(self.rng.choice(self.recent))
+            self.counts['duplicates'] += 1
+        elif self.recent and roll < self.dup_rate + self.near_dup_rate:
+            record = self._near_duplicate(self.rng.choice(self.recent))
+            self.counts['near_duplicates'] += 1
+        else:
+            record = self._new_record()
+            self.counts['unique'] += 1
+            if len(self.recent) < self.recent_size:
+                self.recent.append(record)
+            else:
+                self.recent[self.rng.randrange(self.recent_size)] = record
+        record['extracted_at'] = self._tick()
+        self.counts['total'] += 1
+        return record
+
+    def iterate(self, count=None):
+        produced = 0
+        while count is None or produced < count:
+            yield self.next()
+            produced += 1
+
+
+def write_corpus(path, count, **params):
+    """Grava `count` questões em `path` (+ `<path>.meta.json`). Retorna as contagens."""
+    generator = CorpusGenerator(**params)
+    started = time.time()
+    size = 0
+    with open_text(path, 'wt') as f:
+        for index, record in enumerate(generator.iterate(count), 1):
+            line = dumps_record(record) + '\n'
+            size += len(line.encode('utf-8'))
+            f.write(line)
+            if index % 100_000 == 0:
+                print(f"  {index:,} questões ({size / 1048576:,.0f} MiB, {index / (time.time() - started):,.0f} q/s)")
+    meta = {'records': count, 'params': params, 'counts': generator.counts, 'json_bytes': size,
+            'generated_in_s': round(time.time() - started, 1)}
+    with open(f"{path}.meta.json", 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+    return meta
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Corpus sintético de questões (formato do scraper)")
+    parser.add_argument('-o', '--output', required=True, help="JSONL de saída (.gz comprime)")
+    parser.add_argument('--records', type=int, default=100_000)
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--dup-rate', type=float, default=0.0, help="Fração de duplicatas exatas")
+    parser.add_argument('--near-dup-rate', type=float, default=0.0, help="Fração de quase duplicatas")
+    parser.add_argument('--true-false-rate', type=float, default=0.35, help="Base da fração certo/errado")
+    parser.add_argument('--image-rate', type=float, default=0.15, help="Fração de enunciados com imagens")
+    parser.add_argument('--incomplete-rate', type=float, default=0.02, help="Fração sem gabarito/comentário/detalhes")
+    parser.add_argument('--comment-median', type=int, default=1500, help="Mediana do comentário (caracteres)")
+    args = parser.parse_args()
+
+    meta = write_corpus(args.output, args.records, seed=args.seed, dup_rate=args.dup_rate,
+                        near_dup_rate=args.near_dup_rate, true_false_rate=args.true_false_rate,
+                        image_rate=args.image_rate, incomplete_rate=args.incomplete_rate,
+                        comment_median=args.comment_median)
+    counts = meta['counts']
+    print(f"🧪 {counts['total']:,} questões → {args.output} ({meta['json_bytes'] / 1048576:,.1f} MiB de JSON, "
+          f"{meta['generated_in_s']}s)")
+    print(f"   únicas {counts['unique']:,} | duplicatas {counts['duplicates']:,} | "
+          f"quase duplicatas {counts['near_duplicates']:,}")
+
+
+if __name__ == "__main__":
+    main()
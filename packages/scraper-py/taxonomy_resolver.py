@@ -0,0 +1,284 @@
+"""
+Resolve o `assunto` em texto livre do scraper para um nó da taxonomia
+(`materias` + `assuntos_normalized`, hierarquia de até 3 níveis).
+
+A taxonomia é carregada uma única vez de uma exportação local e indexada em:
+- dicionários de nomes normalizados (sem acento, minúsculos, só alfanuméricos)
+- tries de tokens por matéria, para casar o prefixo mais longo
+
+As consultas são memorizadas (LRU). Cada questão recebe:
+    "taxonomia": {"materia_id", "assunto_id", "nivel", "confianca", "metodo"}
+
+Formatos de exportação aceitos (JSON ou CSV do Supabase):
+- um JSON {"materias": [...], "assuntos": [...]}
+- ou dois arquivos separados (--materias / --assuntos)
+
+Uso:
+    python taxonomy_resolver.py annotate output/*.jsonl -o anotadas.jsonl --taxonomia taxonomia.json
+    python taxonomy_resolver.py bench output/*.jsonl --taxonomia taxonomia.json
+"""
+import argparse
+import csv
+import json
+import re
+import time
+import unicodedata
+from functools import lru_cache
+
+from records_io import iter_records, open_text, write_jsonl
+
+CACHE_SIZE = 65536
+
+# Separadores usados pelo site em assuntos hierárquicos
+PATH_SEPARATORS = re.compile(r'\s+(?:-|–|>|/|\|)\s+|;')
+
+_NON_ALNUM = re.compile(r'[^0-9a-z]+')
+
+# Matéria reconhecida só por prefixo (nome abreviado ou com complemento): a
+# confiança do assunto é multiplicada por este fator
+MATERIA_PREFIX_CONFIDENCE = 0.8
+
+# Chave usada no nó da trie para guardar o ID do assunto que termina ali
+_END = ''
+
+
+def normalize(text):
+    """Normaliza um nome: sem acentos, minúsculo, só letras/números separados por espaço."""
+    if not text:
+        return ''
+    decomposed = unicodedata.normalize('NFKD', text)
+    ascii_text = ''.join(c for c in decomposed if not unicodedata.combining(c)).lower()
+    return _NON_ALNUM.sub(' ', ascii_text).strip()
+
+
+# ============================================================================
+# CARGA DA EXPORTAÇÃO
+# ============================================================================
+
+def _load_rows(path):
+    with open_text(path) as f:
+        if path.endswith(('.csv', '.csv.gz')):
+            return list(csv.DictReader(f))
+        return json.load(f)
+
+
+def load_taxonomy_export(path=None, materias_path=None, assuntos_path=None):
+    """Carrega materias e assuntos de uma exportação local. Retorna (materias, assuntos)."""
+    if path:
+        content = _load_rows(path)
+        return content.get('materias', []), content.get('assuntos', content.get('assuntos_normalized', []))
+    return _load_rows(materias_path), _load_rows(assuntos_path)
+
+
+# ============================================================================
+# RESOLVER
+# ============================================================================
+
+class TaxonomyResolver:
+    """Índice da taxonomia com resolução memorizada de (matéria, assunto)."""
+
+    def __init__(self, materias, assuntos, cache_size=CACHE_SIZE):
+        self.materia_by_name = {}
+        self.materia_names = {}
+        self.nodes = {}
+        # matéria -> {nome normalizado: [ids de assunto]}
+        self.names_by_materia = {}
+        # matéria -> trie de tokens
+        self.trie_by_materia = {}
+        # nome normalizado -> [(materia_id, assunto_id)] (busca sem matéria)
+        self.global_names = {}
+
+        for materia in materias:
+            materia_id = str(materia['id'])
+            self.materia_by_name[normalize(materia['nome'])] = materia_id
+            self.materia_names[materia_id] = materia['nome']
+            self.names_by_materia[materia_id] = {}
+            self.trie_by_materia[materia_id] = {}
+
+        for assunto in assuntos:
+            self._add_node(assunto)
+
+        self.resolve = lru_cache(maxsize=cache_size)(self._resolve)
+
+    def _add_node(self, assunto):
+        node_id = str(assunto['id'])
+        materia_id = str(assunto['materia_id'])
+        parent_id = assunto.get('parent_id') or None
+        self.nodes[node_id] = {
+            'materia_id': materia_id,
+            'parent_id': str(parent_id) if parent_id else None,
+            'nivel': int(assunto.get('nivel') or 1),
+            'nome': assunto['nome'],
+        }
+
+        name = normalize(assunto['nome'])
+        if not name:
+            return
+        self.names_by_materia.setdefault(materia_id, {}).setdefault(name, []).append(node_id)
+        self.global_names.setdefault(name, []).append((materia_id, node_id))
+
+        node = self.trie_by_materia.setdefault(materia_id, {})
+        for token in name.split():
+            node = node.setdefault(token, {})
+        node.setdefault(_END, node_id)
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def _pick(self, node_ids):
+        # Em nomes repetidos na mesma matéria, prefere o nó mais específico
+        return max(node_ids, key=lambda n: self.nodes[n]['nivel'])
+
+    def _resolve_materia(self, materia):
+        """Retorna (materia_id, fator de confiança); (None, 0.0) se vazia ou ambígua."""
+        name = normalize(materia)
+        if not name:
+            return None, 0.0
+        materia_id = self.materia_by_name.get(name)
+        if materia_id:
+            return materia_id, 1.0
+        # Nome do site pode vir abreviado ou com complemento: só vale se um único nome casar
+        # ("Direito" casa com várias matérias e fica sem matéria)
+        candidates = {known_id for known, known_id in self.materia_by_name.items()
+                      if known.startswith(name) or name.startswith(known + ' ')}
+        if len(candidates) == 1:
+            return candidates.pop(), MATERIA_PREFIX_CONFIDENCE
+        return None, 0.0
+
+    def _longest_prefix(self, materia_id, tokens):
+        node = self.trie_by_materia.get(materia_id)
+        best = None
+        depth = 0
+        for token in tokens:
+            node = node.get(token) if node else None
+            if node is None:
+                break
+            depth += 1
+            if _END in node:
+                best = (node[_END], depth)
+        return best
+
+    def _result(self, materia_id, node_id, confidence, method):
+        return {
+            'materia_id': materia_id,
+            'assunto_id': node_id,
+            'nivel': self.nodes[node_id]['nivel'] if node_id else None,
+            'confianca': round(confidence, 3),
+            'metodo': method,
+        }
+
+    def _resolve(self, materia, assunto):
+        materia_id, materia_confidence = self._resolve_materia(materia)
+        result = self._resolve_assunto(materia_id, assunto)
+        if materia_confidence < 1.0 and materia_id and result['materia_id'] == materia_id:
+            result['confianca'] = round(result['confianca'] * materia_confidence, 3)
+        return result
+
+    def _resolve_assunto(self, materia_id, assunto):
+        name = normalize(assunto)
+        if not name:
+            return self._result(materia_id, None, 0.0, 'vazio')
+
+        segments = [normalize(s) for s in PATH_SEPARATORS.split(assunto) if normalize(s)]
+
+        if materia_id:
+            names = self.names_by_materia.get(materia_id, {})
+
+            # 1. Nome exato
+            if name in names:
+                return self._result(materia_id, self._pick(names[name]), 1.0, 'exato')
+
+            # 2. Caminho hierárquico: o segmento mais específico que existir
+            for segment in reversed(segments if len(segments) > 1 else []):
+                if segment in names:
+                    return self._result(materia_id, self._pick(names[segment]), 0.9, 'segmento')
+
+            # 3. Prefixo mais longo na trie de tokens
+            tokens = name.split()
+            match = self._longest_prefix(materia_id, tokens)
+            if match:
+                node_id, depth = match
+                confidence = 0.8 * depth / max(len(tokens), len(normalize(self.nodes[node_id]['nome']).split()))
+                return self._result(materia_id, node_id, confidence, 'prefixo')
+
+        # 4. Sem matéria reconhecida: nome único em toda a taxonomia
+        candidates = self.global_names.get(name)
+        if candidates and len(candidates) == 1:
+            found_materia, node_id = candidates[0]
+            return self._result(found_materia, node_id, 0.7, 'global')
+
+        return self._result(materia_id, None, 0.0, 'nao_encontrado')
+
+    def annotate(self, record):
+        """Adiciona o campo `taxonomia` à questão (in-place) e a retorna."""
+        record['taxonomia'] = dict(self.resolve(record.get('materia'), record.get('assunto')))
+        return record
+
+
+def load_resolver(path=None, materias_path=None, assuntos_path=None):
+    """Carrega a exportação e constrói o resolver."""
+    materias, assuntos = load_taxonomy_export(path, materias_path, assuntos_path)
+    return TaxonomyResolver(materias, assuntos)
+
+
+# ============================================================================
+# BENCHMARK
+# ============================================================================
+
+def run_benchmark(resolver, records, repeat=3):
+    """Mede consultas/s sem cache (primeira passada) e com cache (passadas seguintes)."""
+    pairs = [(r.get('materia'), r.get('assunto')) for r in records]
+    if not pairs:
+        return {'records': 0}
+
+    resolver.resolve.cache_clear()
+    start = time.perf_counter()
+    results = [resolver.resolve(m, a) for m, a in pairs]
+    cold = time.perf_counter() - start
+
+    warm_times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for m, a in pairs:
+            resolver.resolve(m, a)
+        warm_times.append(time.perf_counter() - start)
+    warm = min(warm_times)
+
+    matched = sum(1 for r in results if r['assunto_id'])
+    info = resolver.resolve.cache_info()
+    return {
+        'records': len(pairs),
+        'distinct_pairs': info.currsize,
+        'matched_pct': round(100 * matched / len(pairs), 1),
+        'cold_lookups_per_s': round(len(pairs) / cold) if cold > 0 else None,
+        'warm_lookups_per_s': round(len(pairs) / warm) if warm > 0 else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Resolve assuntos para nós da taxonomia")
+    parser.add_argument('command', choices=['annotate', 'bench'])
+    parser.add_argument('inputs', nargs='+')
+    parser.add_argument('-o', '--output', help="JSONL de saída (annotate)")
+    parser.add_argument('--taxonomia', help="Exportação JSON com materias e assuntos")
+    parser.add_argument('--materias', help="Exportação da tabela materias (JSON/CSV)")
+    parser.add_argument('--assuntos', help="Exportação da tabela assuntos_normalized (JSON/CSV)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    resolver = load_resolver(args.taxonomia, args.materias, args.assuntos)
+    print(f"🌳 Taxonomia carregada: {len(resolver)} assuntos em {time.perf_counter() - start:.2f}s")
+
+    if args.command == 'annotate':
+        if not args.output:
+            parser.error("annotate requer -o/--output")
+        count = write_jsonl(args.output, (resolver.annotate(r) for r in iter_records(args.inputs)))
+        info = resolver.resolve.cache_info()
+        print(f"✅ {count} questões anotadas em {args.output} (cache: {info.hits} hits / {info.misses} misses)")
+    else:
+        result = run_benchmark(resolver, list(iter_records(args.inputs)))
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,44 @@
+import argparse
 import json
 import time
 import os
 import logging
 import requests
 import random
+import re
+import signal
+import sys
 import threading
 from datetime import datetime
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.common.by import By
-from selenium.webdriver.common.keys import Keys
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
-from selenium.webdriver.common.action_chains import ActionChains
-from webdriver_manager.chrome import ChromeDriverManager
+from records_io import dumps_record
+from taxonomy_resolver import load_resolver
+from checkpoint import AccountCheckpoint, CheckpointStore, STATUS_RUNNING
+from record_codec import load_codec
+from control_plane import ControlPlane
+from stall_watchdog import IDLE_PHASE, Watchdog, instrument_driver
+from thread_profiler import ThreadProfiler
+from memory_tracker import MemoryTracker, current_rss_bytes
+from live_stats import StatsReporter
+from content_hashes import HashStore, annotate_record, batch_idempotency_key, ensure_annotated, plan_delta
+from driver_provisioning import install_chromedriver, invalidate_chromedriver, resolve_chromedriver
+from image_cache import ImageCache
+from ndjson_upload import post_ndjson
+from drift_monitor import CONDITION as SCHEMA_DRIFT, FillRateMonitor, write_snapshot
+from id_snapshot import IdSnapshot, write_id_snapshot
+from process_supervisor import ProcessSupervisor, SharedIdIndex, WorkerLink
+from run_history import RunHistory, RunRecorder
+from repair_worklist import RepairWorklist, append_entry, merge_repair, missing_parts
+from dedup_service import DedupClient, ServiceIdIndex
+from enrichment import enrich_record
+from console_dashboard import ConsoleHandler, Dashboard
+from post_pipeline import OrderedDelivery, Pipeline
+
+# Selenium é carregado sob demanda por load_selenium() (ao abrir os navegadores),
+# para que ferramentas offline possam importar este módulo sem essa dependência
+webdriver = Service = By = Keys = WebDriverWait = EC = ActionChains = None
+TimeoutException = NoSuchElementException = None
+
+startup_t0 = time.perf_counter()
 
 # ============================================================================
 # 🔐 CONFIGURAÇÃO DE MÚLTIPLAS CONTAS
@@ -77,6 +101,155 @@ WEBHOOK_ENABLED = True
 WEBHOOK_BATCH_SIZE = 50
 WEBHOOK_REALTIME = True
 
+# Modo delta: envia só questões novas ou campos alterados desde o último envio
+# confirmado (hashes guardados localmente em HASH_STORE_PATH)
+WEBHOOK_DELTA_MODE = False
+HASH_STORE_PATH = "hash_store.sqlite3"
+
+# Streaming: lotes com WEBHOOK_STREAM_MIN_RECORDS questões ou mais são enviados
+# como NDJSON em streaming (Transfer-Encoding: chunked, gzip opcional): uma linha
+# de envelope + uma questão por linha, sem montar o JSON inteiro em memória.
+# O receptor precisa aceitar Content-Type application/x-ndjson.
+WEBHOOK_STREAMING = False
+WEBHOOK_STREAM_MIN_RECORDS = 200
+WEBHOOK_STREAM_GZIP = True
+
+# Saída local: grava cada questão extraída em JSONL (uma linha por questão)
+# Arquivo: <LOCAL_OUTPUT_DIR>/questoes_<conta>_<timestamp>.jsonl
+LOCAL_OUTPUT_ENABLED = True
+LOCAL_OUTPUT_DIR = "output"
+
+# Campos derivados (enrichment.py): alternativas como {letter, text}, tipo
+# (certo/errado x múltipla escolha), tamanhos, indicadores de imagem e ano,
+# gravados em "derivados" na própria questão (saída local e webhook).
+DERIVED_FIELDS_ENABLED = False
+
+# Cache local de imagens: baixa cada URL uma única vez (pool de IMAGE_CACHE_WORKERS
+# threads), grava por hash de conteúdo em IMAGE_CACHE_DIR e acrescenta à questão
+# "imagens_hashes" ({url: sha256}). Espera no máximo IMAGE_CACHE_WAIT s por questão.
+IMAGE_CACHE_ENABLED = False
+IMAGE_CACHE_DIR = "imagens"
+IMAGE_CACHE_WORKERS = 4
+IMAGE_CACHE_WAIT = 30
+
+# Pipeline de pós-processamento (post_pipeline.py): a thread da conta só captura
+# o DOM; normalização (imagens, extracted_at), inferência do gabarito pelo
+# comentário, enriquecimento (taxonomia, imagens, derivados, hashes), JSON e
+# entrega (saída local, checkpoint, webhook, contadores) rodam nestas threads
+# enquanto o navegador já vai para a próxima questão. Filas limitadas entre os
+# estágios: com a fila cheia, a conta espera. Tempos por estágio no final.
+PIPELINE_WORKERS = {'normalize': 1, 'infer': 1, 'enrich': 2, 'serialize': 1, 'deliver': 4}
+PIPELINE_QUEUE_SIZE = 100
+PIPELINE_DRAIN_TIMEOUT = 120         # Segundos para entregar o que falta ao encerrar uma conta
+
+# Reparo de questões incompletas (repair_worklist.py): questões extraídas sem
+# gabarito, comentário ou detalhes são anexadas a REPAIR_AUTO_WORKLIST (None
+# desativa). Com --repair <lista>, cada conta reabre só essas questões e só os
+# painéis que faltaram, mesclando o resultado na questão existente.
+REPAIR_AUTO_WORKLIST = "reparos_pendentes.jsonl"
+REPAIR_QUESTION_URL = "https://www.tecconcursos.com.br/questoes/{id}"
+
+# Deriva de esquema: taxa de preenchimento por campo nas últimas DRIFT_WINDOW
+# questões de cada conta (limites em drift_monitor.DEFAULT_THRESHOLDS, ajustáveis
+# em DRIFT_THRESHOLDS). Abaixo do limite, 'schema_drift' pausa ('pause') ou encerra
+# ('stop') as contas, ou só registra ('log'). Snapshots da página em DIAGNOSTICS_DIR.
+# Os limites padrão ainda não foram medidos contra taxas reais (um timeout no painel
+# de detalhes ou gabarito já derruba a taxa): por isso o padrão só registra. Passe
+# para 'pause' (e DRIFT_ALL_ACCOUNTS) depois de conferir as taxas nos logs/snapshots.
+DRIFT_DETECTION_ENABLED = True
+DRIFT_WINDOW = 50
+DRIFT_MIN_SAMPLES = 20
+DRIFT_THRESHOLDS = {}
+DRIFT_ACTION = 'log'
+DRIFT_ALL_ACCOUNTS = False           # True: mudança de layout afeta todas, age em todas as contas
+DRIFT_MAX_SNAPSHOTS = 5              # Por conta
+
+# Taxonomia: exportação local de materias/assuntos_normalized (JSON com as chaves
+# "materias" e "assuntos"). Se definida, cada questão recebe o campo "taxonomia"
+# com o nó resolvido e a confiança. None = desativado.
+TAXONOMY_EXPORT_PATH = None
+
+# Checkpoint: salva o estado de cada conta (contadores, última questão, lote
+# pendente e IDs novos) para retomar com `--resume` após uma queda do processo
+CHECKPOINT_ENABLED = True
+CHECKPOINT_PATH = "checkpoint.sqlite3"
+CHECKPOINT_INTERVAL = 1              # Grava a cada N questões processadas
+CHECKPOINT_SKIP_URL_INTERVAL = 20    # Questões puladas: URL (um comando WebDriver) só a cada N
+CHECKPOINT_IDS_MAX_AGE = 6 * 3600    # Idade máxima (s) do snapshot de IDs reaproveitado no --resume
+ZDICT_DIR = "zdict"                  # Dicionário (python record_codec.py train) das questões pendentes; sem ele, JSON
+
+# Canal de controle local (status/pause/resume/drain/stop por conta). Comandos
+# exigem o token da execução (impresso no início e gravado em .control_token)
+# Ex.: python control_plane.py resume conta1
+CONTROL_HTTP_ENABLED = True
+CONTROL_HOST = "127.0.0.1"
+CONTROL_PORT = 8765
+
+# Watchdog: grava pilha, fase e último comando WebDriver de contas paradas
+# há mais de WATCHDOG_STALL_THRESHOLD segundos em DIAGNOSTICS_DIR
+WATCHDOG_ENABLED = True
+WATCHDOG_STALL_THRESHOLD = 90
+WATCHDOG_INTERVAL = 5
+DIAGNOSTICS_DIR = "diagnostics"
+
+# Profiling de CPU por conta: None, 'sampling' ou 'deterministic' (ou --profile)
+# Perfis em PROFILING_DIR ao final (ou sob demanda com `kill -USR1 <pid>`)
+PROFILING_MODE = None
+PROFILING_DIR = "profiles"
+PROFILING_SAMPLE_INTERVAL = 0.005
+
+# Rastreamento de memória (tracemalloc + RSS + tamanhos), ativado também por --memory
+# Relatórios de crescimento e medidores a cada MEMORY_INTERVAL segundos em MEMORY_DIR
+MEMORY_TRACKING_ENABLED = False
+MEMORY_INTERVAL = 300
+MEMORY_DIR = "memory"
+
+# Estatísticas: contadores por conta agregados por uma única thread a cada
+# STATS_INTERVAL segundos (taxas EWMA de 1/5/15min); painel impresso a cada
+# STATS_PRINT_INTERVAL segundos (0 = só no final)
+STATS_INTERVAL = 5
+STATS_PRINT_INTERVAL = 60
+
+# Console: por padrão só avisos/erros do log e o painel periódico. Com
+# CONSOLE_PER_QUESTION = True volta a imprimir cada questão extraída/pulada.
+# Com DASHBOARD_ENABLED (ou --dashboard) em um terminal interativo, um painel em
+# tela cheia (console_dashboard.py) assume o console durante a extração e é
+# redesenhado a cada DASHBOARD_REFRESH segundos por uma única thread.
+CONSOLE_PER_QUESTION = False
+CONSOLE_LOG_LEVEL = logging.WARNING
+DASHBOARD_ENABLED = False
+DASHBOARD_REFRESH = 0.25
+
+# Histórico de execuções (run_history.py): resumo por conta e amostras a cada
+# RUN_HISTORY_SAMPLE_INTERVAL segundos, para comparar execuções
+# (python run_history.py compare)
+RUN_HISTORY_ENABLED = True
+RUN_HISTORY_PATH = "run_history.sqlite3"
+RUN_HISTORY_SAMPLE_INTERVAL = 60
+
+# Inicialização: o chromedriver é resolvido uma vez por processo (PATH, cache em
+# DRIVER_CACHE_PATH, Selenium Manager; webdriver-manager só se o Chrome não abrir) e a lista de IDs é baixada em segundo plano enquanto os
+# navegadores abrem. Tempos de cada etapa são anexados a STARTUP_TIMINGS_PATH.
+DRIVER_CACHE_PATH = ".chromedriver_cache.json"
+DRIVER_CACHE_MAX_AGE = 24 * 3600
+BROWSER_LAUNCH_STAGGER = 0.5         # Intervalo (s) entre a abertura de cada navegador
+STARTUP_TIMINGS_PATH = "diagnostics/startup_timings.jsonl"
+
+# Modo multiprocesso (--processes): um processo por conta, coordenado por um
+# supervisor. Os IDs já extraídos são compartilhados por um snapshot mmap
+# somente leitura (IDS_SNAPSHOT_PATH) + IDs novos repassados entre processos.
+# Uma conta que cai é reiniciada a partir do checkpoint.
+WORKER_PROCESSES = False
+MAX_WORKER_RESTARTS = 3
+WORKER_RESTART_BACKOFF = 15          # Segundos antes de reiniciar uma conta que caiu
+IDS_SNAPSHOT_PATH = "ids_snapshot.bin"
+
+# Serviço de deduplicação compartilhado (python dedup_service.py serve): com um
+# endereço aqui (ou --dedup), os IDs são consultados/reservados no daemon em vez
+# do conjunto em memória baixado do webhook - vale para vários scrapers na mesma
+# máquina ou na rede local. None = conjunto em memória (padrão).
+DEDUP_SERVICE = None                 # Ex.: "unix:/tmp/tec_dedup.sock" ou "tcp:192.168.0.10:8766"
+
 # ============================================================================
 # CONFIGURAÇÕES DE COMPORTAMENTO HUMANO
 # ============================================================================
@@ -117,20 +290,34 @@ WAIT_TIMEOUT = 4
 ids_lock = threading.Lock()
 shared_ids = set()
 start_extraction_event = threading.Event()
+hash_store_lock = threading.Lock()
+hash_store = None
+taxonomy_lock = threading.Lock()
+taxonomy_resolver = None
+image_cache_lock = threading.Lock()
+image_cache = None
+post_pipeline_lock = threading.Lock()
+post_pipeline = None
+checkpoint_store = None
+thread_profiler = None
+run_recorder = None
+repair_path = None
+activity_sink = None                      # Painel de terminal: recebe a última ação de cada conta
+resume_mode = False
+resume_ids_loaded = False
 login_complete_event = threading.Event()  # 🆕 Evento para sincronizar logins
+ids_ready_event = threading.Event()       # Lista de IDs carregada (em segundo plano)
+startup_marks = {}
+control_plane = ControlPlane()
+stall_watchdog = Watchdog(WATCHDOG_STALL_THRESHOLD, WATCHDOG_INTERVAL, DIAGNOSTICS_DIR)
+# Gabarito só no comentário conta como preenchido (a inferência fica no estágio infer)
+drift_monitor = FillRateMonitor(DRIFT_WINDOW, DRIFT_MIN_SAMPLES, DRIFT_THRESHOLDS,
+                                checks={'gabarito': lambda record: gabarito_filled(record)})
 
 # ============================================================================
 # ESTATÍSTICAS GLOBAIS PARA MONITORAMENTO
 # ============================================================================
-stats_lock = threading.Lock()
-global_stats = {
-    'total_new': 0,
-    'total_skipped': 0,
-    'total_webhook_success': 0,
-    'total_webhook_failed': 0,
-    'start_time': None,
-    'accounts': {}  # Dict com estatísticas por conta
-}
+stats_reporter = StatsReporter(STATS_INTERVAL, STATS_PRINT_INTERVAL)
 
 # ============================================================================
 # FUNÇÕES AUXILIARES
@@ -309,7 +496,8 @@ def setup_logging(account_name):
     file_handler.setFormatter(logging.Formatter(log_format, date_format))
     logger.addHandler(file_handler)
     
-    console_handler = logging.StreamHandler()
+    console_handler = ConsoleHandler()
+    console_handler.setLevel(CONSOLE_LOG_LEVEL)
     console_handler.setFormatter(logging.Formatter(log_format, date_format))
     logger.addHandler(console_handler)
     
@@ -321,124 +509,274 @@ def setup_logging(account_name):
     
     return logger, log_filename
 
+def close_logging(logger):
+    """Fecha e remove os handlers da conta (libera o arquivo de log ao fim da thread)."""
+    for handler in list(logger.handlers):
+        try:
+            handler.close()
+        except Exception:
+            pass
+    logger.handlers = []
+
+def open_local_output(account_name, logger):
+    """Abre o arquivo JSONL de saída local da conta (None se desativado)."""
+    if not LOCAL_OUTPUT_ENABLED:
+        return None, None
+
+    os.makedirs(LOCAL_OUTPUT_DIR, exist_ok=True)
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    output_filename = os.path.join(
+        LOCAL_OUTPUT_DIR, f"questoes_{account_name.replace(' ', '_')}_{timestamp}.jsonl"
+    )
+    output_file = open(output_filename, 'a', encoding='utf-8', buffering=1)
+    logger.info(f"💾 Saída local: {output_filename}")
+    return output_file, output_filename
+
+def write_local_record(output_file, data, logger, line=None):
+    """Acrescenta uma questão ao arquivo JSONL de saída local (`line`: JSON já serializado)."""
+    if output_file is None:
+        return
+    try:
+        output_file.write((line or dumps_record(data)) + '\n')
+    except Exception as e:
+        logger.error(f"Erro ao gravar saída local: {e}")
+
 def load_shared_ids(logger):
     """Carrega IDs compartilhados via webhook."""
     global shared_ids
 
-    with ids_lock:
-        ids_from_webhook = set()
-        
-        # SEMPRE carregar IDs via webhook para evitar duplicatas
-        max_retries = 3
-        retry_count = 0
-        
-        webhook_ids_url = "https://n8n.appcodigodavida.com.br/webhook/q"
-        
-        while retry_count < max_retries:
-            try:
-                logger.info(f"🔍 Carregando IDs existentes via webhook... (tentativa {retry_count + 1}/{max_retries})")
-                
-                response = requests.get(webhook_ids_url, timeout=60)
-                response.raise_for_status()
-                
-                data = response.json()
+    ids_from_webhook = set()
 
-                # Extrair IDs do JSON
-                ids_from_webhook = set(str(item['id']) for item in data if 'id' in item)
+    # SEMPRE carregar IDs via webhook para evitar duplicatas
+    max_retries = 3
+    retry_count = 0
 
-                logger.info(f"✅ {len(ids_from_webhook)} IDs carregados via webhook!")
-                break  # Sucesso, sair do loop de retry
+    webhook_ids_url = "https://n8n.appcodigodavida.com.br/webhook/q"
 
-            except Exception as e:
-                retry_count += 1
-                logger.error(f"⚠️ Erro ao carregar IDs via webhook (tentativa {retry_count}/{max_retries}): {e}")
+    while retry_count < max_retries:
+        try:
+            logger.info(f"🔍 Carregando IDs existentes via webhook... (tentativa {retry_count + 1}/{max_retries})")
 
-                if retry_count < max_retries:
-                    wait_time = 2 ** retry_count  # Exponential backoff: 2s, 4s, 8s
-                    logger.info(f"   ⏳ Aguardando {wait_time}s antes de tentar novamente...")
-                    time.sleep(wait_time)
-                else:
-                    logger.warning("❌ FALHA ao carregar IDs após 3 tentativas!")
-                    logger.warning("⚠️ CONTINUANDO SEM IDs - Questões podem ser re-extraídas!")
-                    logger.info("   💡 Verifique se o webhook está acessível")
-                    ids_from_webhook = set()
+            response = requests.get(webhook_ids_url, timeout=60)
+            response.raise_for_status()
+
+            data = response.json()
+
+            # Extrair IDs do JSON
+            ids_from_webhook = set(str(item['id']) for item in data if 'id' in item)
 
-        # Usar IDs carregados
+            logger.info(f"✅ {len(ids_from_webhook)} IDs carregados via webhook!")
+
+            if checkpoint_store:
+                checkpoint_store.save_id_snapshot(ids_from_webhook)
+            break  # Sucesso, sair do loop de retry
+
+        except Exception as e:
+            retry_count += 1
+            logger.error(f"⚠️ Erro ao carregar IDs via webhook (tentativa {retry_count}/{max_retries}): {e}")
+
+            if retry_count < max_retries:
+                wait_time = 2 ** retry_count  # Exponential backoff: 2s, 4s, 8s
+                logger.info(f"   ⏳ Aguardando {wait_time}s antes de tentar novamente...")
+                time.sleep(wait_time)
+            else:
+                logger.warning("❌ FALHA ao carregar IDs após 3 tentativas!")
+                logger.warning("⚠️ CONTINUANDO SEM IDs - Questões podem ser re-extraídas!")
+                logger.info("   💡 Verifique se o webhook está acessível")
+                ids_from_webhook = set()
+
+    # Usar IDs carregados (o download acontece fora do lock)
+    with ids_lock:
         shared_ids = ids_from_webhook
         logger.info(f"📚 TOTAL: {len(shared_ids)} IDs únicos já extraídos")
-        
         return shared_ids.copy()
 
+def load_ids_for_resume(logger):
+    """Restaura os IDs do checkpoint (snapshot do webhook + IDs novos) sem novo download."""
+    global shared_ids, resume_ids_loaded
+
+    with ids_lock:
+        if resume_ids_loaded:
+            return
+        snapshot, age = checkpoint_store.load_id_snapshot(CHECKPOINT_IDS_MAX_AGE)
+        if snapshot is not None:
+            shared_ids = snapshot
+            logger.info(f"♻️ {len(snapshot)} IDs restaurados do checkpoint (snapshot de {int(age)}s)")
+
+    if snapshot is None:
+        logger.warning("⚠️ Snapshot de IDs ausente ou antigo - baixando novamente")
+        load_shared_ids(logger)
+
+    with ids_lock:
+        seen = checkpoint_store.all_seen_ids()
+        shared_ids |= seen
+        resume_ids_loaded = True
+        logger.info(f"♻️ {len(seen)} IDs novos da execução anterior restaurados")
+
+def connect_dedup_service(address):
+    """Conecta ao daemon de deduplicação. Retorna o índice ou None (usa o conjunto em memória)."""
+    client = DedupClient(address)
+    try:
+        stats = client.stats()
+    except (OSError, RuntimeError) as e:
+        print(f"⚠️  Dedup em {address} indisponível ({e}) - usando a lista de IDs em memória")
+        return None
+    print(f"🧮 Dedup compartilhado em {address}: {stats['ids']} IDs")
+    return ServiceIdIndex(client)
+
+def start_id_loader():
+    """Carrega a lista de IDs uma vez por processo, em segundo plano, enquanto os navegadores abrem."""
+    def run():
+        logger, _ = setup_logging('startup')
+        try:
+            if resume_mode and checkpoint_store:
+                load_ids_for_resume(logger)
+            else:
+                load_shared_ids(logger)
+            print(f"📚 Total de {len(shared_ids)} IDs carregados (serão pulados automaticamente)")
+        except Exception as e:
+            logger.error(f"Erro ao carregar IDs: {e}", exc_info=True)
+        finally:
+            mark_startup('ids_loaded')
+            ids_ready_event.set()
+            close_logging(logger)
+
+    thread = threading.Thread(target=run, name="IdLoader", daemon=True)
+    thread.start()
+    return thread
+
+def start_driver_resolver():
+    """Importa o Selenium e resolve o chromedriver em segundo plano (antes de abrir os navegadores)."""
+    def run():
+        try:
+            load_selenium()
+            resolve_chromedriver(DRIVER_CACHE_PATH, DRIVER_CACHE_MAX_AGE)
+        except Exception as e:
+            print(f"⚠️  Falha ao preparar o chromedriver: {e}")
+        mark_startup('driver_resolved')
+
+    thread = threading.Thread(target=run, name="DriverResolver", daemon=True)
+    thread.start()
+    return thread
+
+def mark_startup(name):
+    """Registra (uma vez) o instante de uma etapa da inicialização, em segundos desde o início."""
+    startup_marks.setdefault(name, time.perf_counter() - startup_t0)
+
+def report_startup_timings():
+    """Imprime e anexa a STARTUP_TIMINGS_PATH os tempos de inicialização desta execução."""
+    marks = dict(startup_marks)
+    browsers = [v for k, v in marks.items() if k.endswith(':browser_ready')]
+    firsts = [v for k, v in marks.items() if k.endswith(':first_extraction')]
+    row = {
+        'ts': datetime.now().isoformat(timespec='seconds'),
+        'accounts': len(ACCOUNTS),
+        'marks': {k: round(v, 2) for k, v in sorted(marks.items(), key=lambda item: item[1])},
+    }
+    # Descontando a espera pelo operador (ENTER) antes de abrir e antes de iniciar
+    if browsers and 'open_released' in marks:
+        row['browsers_ready_s'] = round(max(browsers) - marks['open_released'], 2)
+    if firsts and 'start_released' in marks:
+        row['time_to_first_extraction_s'] = round(min(firsts) - marks['start_released'], 2)
+
+    print("⏱️  Inicialização: " + ' | '.join(
+        f"{label} {row[key]:.1f}s" for key, label in (
+            ('browsers_ready_s', 'navegadores prontos'),
+            ('time_to_first_extraction_s', '1ª extração após ENTER'),
+        ) if key in row
+    ))
+    try:
+        os.makedirs(os.path.dirname(STARTUP_TIMINGS_PATH) or '.', exist_ok=True)
+        with open(STARTUP_TIMINGS_PATH, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(row, ensure_ascii=False) + "\n")
+    except OSError as e:
+        print(f"⚠️  Não foi possível gravar {STARTUP_TIMINGS_PATH}: {e}")
+    return row
+
 def add_shared_id(question_id):
     """Adiciona um ID ao conjunto compartilhado de forma thread-safe."""
     global shared_ids
     with ids_lock:
         shared_ids.add(question_id)
 
+def merge_shared_ids(ids):
+    """Adiciona vários IDs (extraídos em outros processos) ao conjunto compartilhado."""
+    with ids_lock:
+        shared_ids.update(ids)
+
 def is_id_extracted(question_id):
     """Verifica se um ID já foi extraído de forma thread-safe."""
     global shared_ids
     with ids_lock:
         return question_id in shared_ids
 
-def update_stats(account_name, new_questions=0, skipped=0, webhook_success=0, webhook_failed=0):
-    """Atualiza estatísticas globais de forma thread-safe."""
-    global global_stats
-    with stats_lock:
-        global_stats['total_new'] += new_questions
-        global_stats['total_skipped'] += skipped
-        global_stats['total_webhook_success'] += webhook_success
-        global_stats['total_webhook_failed'] += webhook_failed
-
-        if account_name not in global_stats['accounts']:
-            global_stats['accounts'][account_name] = {
-                'new': 0,
-                'skipped': 0,
-                'webhook_success': 0,
-                'last_update': time.time()
-            }
-
-        global_stats['accounts'][account_name]['new'] += new_questions
-        global_stats['accounts'][account_name]['skipped'] += skipped
-        global_stats['accounts'][account_name]['webhook_success'] += webhook_success
-        global_stats['accounts'][account_name]['last_update'] = time.time()
+def report_activity(account_name, message):
+    """Ação de uma conta por questão: vai para o painel, ou para o console com CONSOLE_PER_QUESTION."""
+    if activity_sink:
+        activity_sink(account_name, message)
+    elif CONSOLE_PER_QUESTION:
+        print(f"[{account_name}] {message}")
+
+def print_global_stats(snapshot=None):
+    """Imprime estatísticas consolidadas de todas as contas (snapshot do StatsReporter)."""
+    snapshot = snapshot or stats_reporter.latest
+    if snapshot is None or stats_reporter.start_time is None:
+        return
+
+    totals = snapshot['totals']
+    elapsed = snapshot['elapsed_s']
+    elapsed_min = elapsed / 60
+    total_processed = totals['new'] + totals['skipped']
+    average_rate = (totals['new'] / elapsed_min) if elapsed_min > 0 else 0
+    rate = snapshot['rate_new']
 
-def print_global_stats():
-    """Imprime estatísticas consolidadas de todas as contas."""
-    global global_stats
-    with stats_lock:
-        if global_stats['start_time'] is None:
-            return
-
-        elapsed = time.time() - global_stats['start_time']
-        elapsed_min = elapsed / 60
-
-        total_processed = global_stats['total_new'] + global_stats['total_skipped']
-        rate_per_min = (global_stats['total_new'] / elapsed_min) if elapsed_min > 0 else 0
-
-        print("\n" + "="*70)
-        print("📊 ESTATÍSTICAS GLOBAIS EM TEMPO REAL")
-        print("="*70)
-        print(f"⏱️  Tempo decorrido: {int(elapsed_min)}min {int(elapsed % 60)}s")
-        print(f"🆕 Questões novas: {global_stats['total_new']}")
-        print(f"⏭️  Duplicadas puladas: {global_stats['total_skipped']}")
-        print(f"📊 Total processadas: {total_processed}")
-        print(f"📤 Enviadas ao webhook: {global_stats['total_webhook_success']}")
-        if global_stats['total_webhook_failed'] > 0:
-            print(f"⚠️  Falhas no webhook: {global_stats['total_webhook_failed']}")
-        print(f"⚡ Taxa: {rate_per_min:.1f} questões/min")
-        print("-"*70)
-        print("📋 POR CONTA:")
-
-        for acc_name, acc_stats in sorted(global_stats['accounts'].items()):
-            time_since = int(time.time() - acc_stats['last_update'])
-            status = "🟢 Ativo" if time_since < 30 else "🟡 Inativo"
-            print(f"  [{acc_name}] {status} - Novas: {acc_stats['new']} | Puladas: {acc_stats['skipped']}")
-
-        print("="*70 + "\n")
+    print("\n" + "="*70)
+    print("📊 ESTATÍSTICAS GLOBAIS EM TEMPO REAL")
+    print("="*70)
+    print(f"⏱️  Tempo decorrido: {int(elapsed_min)}min {int(elapsed % 60)}s")
+    print(f"🆕 Questões novas: {totals['new']}")
+    print(f"⏭️  Duplicadas puladas: {totals['skipped']}")
+    print(f"📊 Total processadas: {total_processed}")
+    print(f"📤 Enviadas ao webhook: {totals['webhook_success']}")
+    if totals['webhook_failed'] > 0:
+        print(f"⚠️  Falhas no webhook: {totals['webhook_failed']}")
+    print(f"⚡ Taxa (novas/min): 1m {rate['1m']:.1f} | 5m {rate['5m']:.1f} | 15m {rate['15m']:.1f} "
+          f"| média {average_rate:.1f}")
+    print(f"⚡ Processadas/min: 1m {snapshot['rate_processed']['1m']:.1f}")
+    print("-"*70)
+    print("📋 POR CONTA:")
+
+    for acc_name, acc_stats in sorted(snapshot['accounts'].items()):
+        status = "🟢 Ativo" if acc_stats['idle_s'] < 30 else "🟡 Inativo"
+        print(f"  [{acc_name}] {status} - Novas: {acc_stats['new']} | Puladas: {acc_stats['skipped']} "
+              f"| 1m: {acc_stats['rate_new']['1m']:.1f}/min | 5m: {acc_stats['rate_new']['5m']:.1f}/min")
+
+    print("="*70 + "\n")
+
+def load_selenium():
+    """Importa o Selenium na primeira chamada (nomes usados pelo restante do módulo)."""
+    global webdriver, Service, By, Keys, WebDriverWait, EC, ActionChains
+    global TimeoutException, NoSuchElementException
+    if webdriver is not None:
+        return
+
+    from selenium import webdriver as selenium_webdriver
+    from selenium.webdriver.chrome.service import Service as ChromeService
+    from selenium.webdriver.common.by import By as SeleniumBy
+    from selenium.webdriver.common.keys import Keys as SeleniumKeys
+    from selenium.webdriver.support.ui import WebDriverWait as SeleniumWait
+    from selenium.webdriver.support import expected_conditions
+    from selenium.common.exceptions import TimeoutException as SeleniumTimeout, NoSuchElementException as NoSuchElement
+    from selenium.webdriver.common.action_chains import ActionChains as SeleniumActionChains
+
+    Service, By, Keys, WebDriverWait, EC = ChromeService, SeleniumBy, SeleniumKeys, SeleniumWait, expected_conditions
+    ActionChains = SeleniumActionChains
+    TimeoutException, NoSuchElementException = SeleniumTimeout, NoSuchElement
+    webdriver = selenium_webdriver
 
 def setup_driver(account_name, logger):
     """Configura e retorna o WebDriver do Chrome com User-Agent randomizado."""
+    load_selenium()
     selected_ua = random.choice(USER_AGENTS)
     logger.info(f"🎭 User-Agent: {selected_ua[:80]}...")
     
@@ -456,25 +794,41 @@ def setup_driver(account_name, logger):
     options.page_load_strategy = 'eager'
     options.add_argument(f'user-agent={selected_ua}')
     options.add_argument(f'--window-name={account_name}')
-    
+
+    # PATH/cache, resolvidos uma vez por processo; sem eles, o Selenium Manager
+    driver_path = resolve_chromedriver(DRIVER_CACHE_PATH, DRIVER_CACHE_MAX_AGE, logger)
+
+    driver = None
     try:
-        driver = webdriver.Chrome(options=options)
-        driver.execute_script(f"document.title = '{account_name} - TEC Concursos'")
-        logger.info("✓ WebDriver configurado com sucesso")
-        return driver
-    except Exception as path_error:
-        logger.warning(f"ChromeDriver não encontrado no PATH: {path_error}")
-        
+        if driver_path:
+            driver = webdriver.Chrome(service=Service(driver_path), options=options)
+        else:
+            driver = webdriver.Chrome(options=options)
+    except Exception as driver_error:
+        logger.warning(f"Falha ao abrir o Chrome ({driver_path or 'Selenium Manager'}): {driver_error}")
+        if driver_path:
+            # Ex.: chromedriver em cache incompatível com o Chrome atualizado
+            invalidate_chromedriver(DRIVER_CACHE_PATH)
+            try:
+                driver = webdriver.Chrome(options=options)
+            except Exception as manager_error:
+                logger.warning(f"Selenium Manager também falhou: {manager_error}")
+
+    if driver is None:
+        # Último recurso, como no setup original: webdriver-manager
+        fallback_path = install_chromedriver(DRIVER_CACHE_PATH, logger)
+        if not fallback_path:
+            raise RuntimeError("Não foi possível abrir o Chrome (PATH, cache, Selenium Manager e webdriver-manager)")
         try:
-            service = Service(ChromeDriverManager().install())
-            driver = webdriver.Chrome(service=service, options=options)
-            driver.execute_script(f"document.title = '{account_name} - TEC Concursos'")
-            logger.info("✓ WebDriver configurado com sucesso (webdriver-manager)")
-            return driver
-        except Exception as manager_error:
-            logger.error(f"Erro ao configurar WebDriver: {manager_error}", exc_info=True)
+            driver = webdriver.Chrome(service=Service(fallback_path), options=options)
+        except Exception as e:
+            logger.error(f"Erro ao configurar WebDriver: {e}", exc_info=True)
             raise
 
+    driver.execute_script(f"document.title = '{account_name} - TEC Concursos'")
+    logger.info("✓ WebDriver configurado com sucesso")
+    return driver
+
 def disable_popups(driver, logger):
     """Injeta JavaScript para desabilitar popups Alertify permanentemente."""
     try:
@@ -663,6 +1017,7 @@ def pause_for_manual_intervention(account_name, logger, problem_type='unknown'):
         'captcha': '🔒 CAPTCHA DETECTADO',
         'layout_change': '🎨 MUDANÇA NO LAYOUT DA PÁGINA',
         'loading_error': '❌ ERRO DE CARREGAMENTO',
+        SCHEMA_DRIFT: '🧬 DERIVA DE ESQUEMA (campos deixaram de ser extraídos)',
         'unknown': '⚠️ PROBLEMA NÃO IDENTIFICADO'
     }
 
@@ -688,6 +1043,11 @@ def pause_for_manual_intervention(account_name, logger, problem_type='unknown'):
             "   2. Verifique sua conexão",
             "   3. Confirme que a página carregou"
         ],
+        SCHEMA_DRIFT: [
+            f"   1. Veja os snapshots em {DIAGNOSTICS_DIR}/drift_<conta>_*/",
+            "   2. Se for só a página desta conta, corrija e retome",
+            "   3. Se o layout do site mudou, encerre (stop all) e ajuste os seletores"
+        ],
         'unknown': [
             "   1. Verifique a janela do navegador",
             "   2. Resolva qualquer problema visível",
@@ -707,30 +1067,137 @@ def pause_for_manual_intervention(account_name, logger, problem_type='unknown'):
         print(instruction)
     print(f"\n💡 IMPORTANTE:")
     print(f"   - NÃO feche o navegador")
-    print(f"   - O scraper aguardará você resolver")
-    print(f"   - Pressione ENTER quando estiver pronto para continuar")
+    print(f"   - O scraper aguardará você resolver (as outras contas continuam)")
+    print(f"   - Para continuar: digite 'resume {account_name}' no console")
+    print(f"     (ou só ENTER se esta for a única conta pausada)")
+    if CONTROL_HTTP_ENABLED:
+        print(f"   - Ou: python control_plane.py resume {account_name}")
     print(f"{'='*70}")
 
     logger.warning(f"⏸️ PAUSADO: {message}")
     logger.warning("Aguardando intervenção manual do usuário...")
 
-    input(f"\n[{account_name}] 🔓 Pressione ENTER para CONTINUAR após resolver... ")
+    control = control_plane.register(account_name)
+    heartbeat = stall_watchdog.get(account_name)
+    if heartbeat:
+        with heartbeat.phase_scope('pausa'):
+            paused = control.wait_for_operator(problem_type)
+    else:
+        paused = control.wait_for_operator(problem_type)
+
+    if control.should_exit:
+        logger.info(f"Pausa encerrada por comando {'stop' if control.stop_requested else 'drain'} ({paused:.0f}s)")
+        return False
 
     print(f"\n[{account_name}] ✅ Retomando extração...")
-    logger.info("✓ Extração retomada pelo usuário")
+    logger.info(f"✓ Extração retomada pelo usuário após {paused:.0f}s")
 
     # Aguarda um pouco para garantir estabilidade
     time.sleep(2)
 
     return True
 
-def send_webhook(data, account_name, logger, batch_info=None):
-    """Envia dados para webhook via POST."""
+def check_schema_drift(driver, account_name, record, logger):
+    """
+    Registra a questão recém-extraída no detector de deriva. Ao entrar em
+    'schema_drift', grava um snapshot da página atual (a da questão, antes de
+    navegar) e aplica DRIFT_ACTION (pausa/encerra esta conta ou todas); enquanto a
+    janela continua abaixo do limite não avisa de novo. Retorna o relatório ou None.
+    """
+    missing, report = drift_monitor.observe(account_name, record)
+    if not drift_monitor.set_alerting(account_name, report is not None):
+        return report
+    if report is None:
+        logger.info(f"🧬 {SCHEMA_DRIFT} encerrado: preenchimento de volta acima dos limites")
+        print(f"\n[{account_name}] 🧬 {SCHEMA_DRIFT}: preenchimento de volta acima dos limites")
+        control_plane.register(account_name).update(schema_drift=None)
+        return None
+
+    failing = ', '.join(f"{field} {rate:.0%}" for field, rate in report['failing'].items())
+    logger.error(f"🧬 {SCHEMA_DRIFT}: preenchimento abaixo do limite nas últimas {report['window']} "
+                 f"questões - {failing}")
+    print(f"\n[{account_name}] 🧬 {SCHEMA_DRIFT.upper()}: {failing}")
+    control_plane.register(account_name).update(schema_drift=report['failing'])
+
+    if drift_monitor.should_snapshot(account_name, DRIFT_MAX_SNAPSHOTS):
+        try:
+            path = write_snapshot(DIAGNOSTICS_DIR, account_name, record, missing,
+                                  driver.page_source, driver.current_url, report)
+            logger.info(f"📸 Snapshot da página: {path}")
+        except Exception as e:
+            logger.error(f"Erro ao gravar snapshot de deriva: {e}")
+
+    if DRIFT_ACTION == 'log':
+        return report
+
+    if DRIFT_ALL_ACCOUNTS:
+        others = [w['name'] for w in control_plane.statuses()['workers'] if w['name'] != account_name]
+        for name in others:
+            worker = control_plane.get(name)
+            if DRIFT_ACTION == 'stop':
+                worker.stop()
+            else:
+                worker.pause(SCHEMA_DRIFT)
+            drift_monitor.reset(name)
+        if others:
+            print(f"[{account_name}] 🧬 {'Encerrando' if DRIFT_ACTION == 'stop' else 'Pausando'} "
+                  f"também: {', '.join(others)}")
+
+    if DRIFT_ACTION == 'stop':
+        control_plane.register(account_name).stop()
+    else:
+        pause_for_manual_intervention(account_name, logger, SCHEMA_DRIFT)
+    drift_monitor.reset(account_name)
+    return report
+
+def get_taxonomy_resolver(logger):
+    """Carrega a taxonomia uma única vez por processo (None se desativada ou com erro)."""
+    global taxonomy_resolver
+    if not TAXONOMY_EXPORT_PATH:
+        return None
+    with taxonomy_lock:
+        if taxonomy_resolver is None:
+            try:
+                taxonomy_resolver = load_resolver(TAXONOMY_EXPORT_PATH)
+                logger.info(f"🌳 Taxonomia carregada: {len(taxonomy_resolver)} assuntos")
+            except Exception as e:
+                logger.error(f"Erro ao carregar taxonomia ({TAXONOMY_EXPORT_PATH}): {e}")
+                taxonomy_resolver = False
+        return taxonomy_resolver or None
+
+def get_image_cache():
+    """Retorna o cache de imagens (criado sob demanda) ou None se desativado."""
+    global image_cache
+    if not IMAGE_CACHE_ENABLED:
+        return None
+    with image_cache_lock:
+        if image_cache is None:
+            image_cache = ImageCache(IMAGE_CACHE_DIR, workers=IMAGE_CACHE_WORKERS)
+        return image_cache
+
+def get_hash_store():
+    """Retorna o armazenamento de hashes confirmados (criado sob demanda)."""
+    global hash_store
+    with hash_store_lock:
+        if hash_store is None:
+            hash_store = HashStore(HASH_STORE_PATH)
+        return hash_store
+
+def send_webhook(data, account_name, logger, batch_info=None, encoded=None):
+    """Envia dados para webhook via POST (`encoded`: as questões já serializadas, na mesma ordem)."""
     if not WEBHOOK_ENABLED or not WEBHOOK_URL:
         return False
     
     if isinstance(data, dict):
         data = [data]
+
+    full_records = data
+    if WEBHOOK_DELTA_MODE:
+        encoded = None
+        data, full_records = plan_delta(data, get_hash_store())
+        if not data:
+            logger.info("⏭️ Webhook: nenhuma alteração desde o último envio confirmado (delta)")
+            return True
     
     try:
         payload = {
@@ -738,7 +1205,6 @@ def send_webhook(data, account_name, logger, batch_info=None):
             "total_questions": len(data),
             "source": f"TEC Scraper - {account_name}",
             "account": account_name,
-            "data": data
         }
         
         if batch_info:
@@ -746,13 +1212,30 @@ def send_webhook(data, account_name, logger, batch_info=None):
         
         headers = {
             "Content-Type": "application/json",
-            "User-Agent": "TEC-Scraper/2.0"
+            "User-Agent": "TEC-Scraper/2.0",
+            "Idempotency-Key": batch_idempotency_key([ensure_annotated(r) for r in data])
         }
         
-        response = requests.post(WEBHOOK_URL, json=payload, headers=headers, timeout=30)
+        sent_at = time.perf_counter()
+        if WEBHOOK_STREAMING and len(data) >= WEBHOOK_STREAM_MIN_RECORDS:
+            # Envelope na primeira linha, questões serializadas uma a uma durante o envio
+            response = post_ndjson(WEBHOOK_URL, payload, data, headers=headers,
+                                   compress=WEBHOOK_STREAM_GZIP, timeout=120)
+        elif encoded is not None and len(encoded) == len(data):
+            # JSON das questões já pronto (estágio serialize): só o envelope é codificado aqui
+            envelope = json.dumps(payload, ensure_ascii=False)
+            body = f'{envelope[:-1]}, "data": [{",".join(encoded)}]}}'
+            response = requests.post(WEBHOOK_URL, data=body.encode('utf-8'), headers=headers, timeout=30)
+        else:
+            payload["data"] = data
+            response = requests.post(WEBHOOK_URL, json=payload, headers=headers, timeout=30)
+        if run_recorder:
+            run_recorder.observe(account_name, 'webhook_s', time.perf_counter() - sent_at)
         
         if response.status_code in [200, 201, 202]:
             logger.info(f"✓ Webhook enviado! Status: {response.status_code}")
+            if WEBHOOK_DELTA_MODE:
+                get_hash_store().ack(full_records)
             return True
         else:
             logger.warning(f"⚠️ Webhook status {response.status_code}")
@@ -798,8 +1281,155 @@ def extract_images_from_element(element, logger):
         logger.debug(f"Erro ao extrair imagens: {e}")
         return []
 
+def extract_gabarito_from_page(driver):
+    """Gabarito exibido na página (resolução ou alternativa correta); None se não houver."""
+    try:
+        gabarito_text = driver.find_element(By.CSS_SELECTOR, "div.questao-enunciado-resolucao-errou strong")
+        return gabarito_text.text.strip()
+    except:
+        pass
+
+    try:
+        correct_options = driver.find_elements(By.CSS_SELECTOR, "li.questao-enunciado-alternativa-correta")
+        if correct_options:
+            correct_element = correct_options[0].find_element(By.CSS_SELECTOR, "span.questao-enunciado-alternativa-opcao label")
+            return correct_element.text.strip()
+    except:
+        pass
+    return None
+
+def extract_comment_pane(driver, logger, data):
+    """Abre o comentário (atalho "o") e o grava em `data` (o gabarito no texto fica para infer_gabarito)."""
+    try:
+        delay = human_delay('comment_open')
+        logger.debug(f"Delay antes de abrir comentário: {delay:.2f}s")
+
+        # Usar atalho "o" para abrir comentário (mais rápido e confiável)
+        body = driver.find_element(By.TAG_NAME, 'body')
+        body.send_keys('o')
+        human_delay('page_load')
+
+        try:
+            comment_element = driver.find_element(By.CSS_SELECTOR, "div.questao-complementos-comentario-conteudo-texto")
+            data['comentario'] = comment_element.text.strip()
+
+            comment_images = extract_images_from_element(comment_element, logger)
+            if comment_images:
+                data['imagens_comentario'] = comment_images
+                logger.info(f"🖼️ {len(comment_images)} imagem(ns) no comentário")
+
+            # Fechar comentário (usando ESC ou botão)
+            body.send_keys(Keys.ESCAPE)
+            human_delay('click')
+        except:
+            data['comentario'] = None
+    except Exception as e:
+        logger.debug(f"Erro ao extrair comentário: {e}")
+        data['comentario'] = None
+
+def extract_details_pane(driver, logger, data):
+    """Abre os detalhes (atalho "i") e preenche `data['detalhes']`."""
+    data['detalhes'] = {}
+    try:
+        delay = human_delay('details_open')
+        logger.debug(f"Delay antes de abrir detalhes: {delay:.2f}s")
+
+        # Usar atalho "i" para abrir informações da questão (mais rápido e confiável)
+        body = driver.find_element(By.TAG_NAME, 'body')
+        body.send_keys('i')
+        human_delay('page_load')
+
+        try:
+            # Aguardar container de detalhes aparecer com NOVO seletor
+            details_container = WebDriverWait(driver, 4).until(
+                EC.presence_of_element_located((By.CSS_SELECTOR, "div.detalhes-questao"))
+            )
+
+            detail_items = details_container.find_elements(By.CSS_SELECTOR, "div.item-detalhe")
+            logger.debug(f"🔍 Encontrados {len(detail_items)} itens de detalhe")
+
+            for item in detail_items:
+                try:
+                    # Verificar se é item múltiplo (Ano e Banca juntos, por exemplo)
+                    if "item-detalhe-multiplo" in item.get_attribute("class"):
+                        # Buscar sub-itens dentro do item múltiplo
+                        sub_items = item.find_elements(By.XPATH, "./div")
+                        for sub_item in sub_items:
+                            try:
+                                sub_title_elem = sub_item.find_elements(By.CSS_SELECTOR, "div.detalhe-titulo")
+                                sub_value_elem = sub_item.find_elements(By.CSS_SELECTOR, "div.ng-binding")
+
+                                if sub_title_elem and sub_value_elem:
+                                    sub_title = sub_title_elem[0].text.strip()
+                                    sub_value = sub_value_elem[0].text.strip()
+
+                                    if sub_title and sub_value:
+                                        # Normalizar chave
+                                        key = sub_title.lower().replace(' ', '_')
+                                        data['detalhes'][key] = sub_value
+                                        logger.debug(f"  ✓ {sub_title}: {sub_value}")
+                            except Exception as e:
+                                logger.debug(f"  Erro ao extrair sub-item: {e}")
+                                continue
+                    else:
+                        # Item simples
+                        title_elem = item.find_elements(By.CSS_SELECTOR, "div.detalhe-titulo")
+
+                        if title_elem:
+                            title = title_elem[0].text.strip()
+
+                            # Primeiro tentar campo composto (ex: Cargo / Área / Especialidade / Edição)
+                            value_elem = item.find_elements(By.CSS_SELECTOR, "div.detalhe-concurso-composto")
+
+                            # Se não encontrar, tentar div.ng-binding normal
+                            if not value_elem:
+                                value_elem = item.find_elements(By.CSS_SELECTOR, "div.ng-binding")
+
+                            if value_elem:
+                                value = value_elem[0].text.strip()
+
+                                if title and value:
+                                    # Normalizar chave (substituir caracteres especiais)
+                                    key = title.lower().replace(' / ', '_').replace('/', '_').replace(' ', '_')
+                                    data['detalhes'][key] = value
+                                    logger.debug(f"  ✓ {title}: {value[:50]}...")
+                except Exception as e:
+                    logger.debug(f"  Erro ao processar item de detalhe: {e}")
+                    continue
+
+            logger.info(f"✓ {len(data['detalhes'])} campos de detalhes extraídos")
+
+            # Fechar detalhes (usando ESC)
+            body.send_keys(Keys.ESCAPE)
+            human_delay('click')
+
+        except TimeoutException:
+            logger.warning("⚠️ Timeout ao aguardar detalhes da questão")
+            data['detalhes'] = {}
+        except Exception as e:
+            logger.warning(f"⚠️ Erro ao extrair detalhes: {e}")
+            data['detalhes'] = {}
+
+    except Exception as e:
+        logger.debug(f"Erro ao abrir detalhes: {e}")
+        data['detalhes'] = {}
+
+def repair_question(driver, logger, missing):
+    """Abre só os painéis que faltam na questão aberta e retorna as partes extraídas."""
+    data = {}
+    if 'gabarito' in missing:
+        data['gabarito'] = extract_gabarito_from_page(driver)
+    # Sem gabarito na página, ele ainda pode vir do comentário
+    if 'comentario' in missing or ('gabarito' in missing and data['gabarito'] is None):
+        extract_comment_pane(driver, logger, data)
+        if 'gabarito' in missing:
+            infer_gabarito(data, logger)
+    if 'detalhes' in missing:
+        extract_details_pane(driver, logger, data)
+    return data
+
 def extract_question_data(driver, logger, quick_check=False):
-    """Extrai os dados de uma única questão da página atual."""
+    """Lê do DOM os dados crus de uma única questão da página atual (o resto é feito no pipeline)."""
     data = {}
     try:
         delay = human_delay('page_load')
@@ -889,169 +1519,15 @@ def extract_question_data(driver, logger, quick_check=False):
             data['alternativas'] = []
 
         # Gabarito
-        data['gabarito'] = None
-        gabarito_obtido = False
-        try:
-            gabarito_text = driver.find_element(By.CSS_SELECTOR, "div.questao-enunciado-resolucao-errou strong")
-            data['gabarito'] = gabarito_text.text.strip()
-            gabarito_obtido = True
-        except:
-            pass
-        
-        if not gabarito_obtido:
-            try:
-                correct_options = driver.find_elements(By.CSS_SELECTOR, "li.questao-enunciado-alternativa-correta")
-                if correct_options:
-                    correct_element = correct_options[0].find_element(By.CSS_SELECTOR, "span.questao-enunciado-alternativa-opcao label")
-                    data['gabarito'] = correct_element.text.strip()
-                    gabarito_obtido = True
-            except:
-                pass
+        data['gabarito'] = extract_gabarito_from_page(driver)
 
         # Comentário e suas imagens (usando atalho de teclado "o")
-        try:
-            delay = human_delay('comment_open')
-            logger.debug(f"Delay antes de abrir comentário: {delay:.2f}s")
-
-            # Usar atalho "o" para abrir comentário (mais rápido e confiável)
-            body = driver.find_element(By.TAG_NAME, 'body')
-            body.send_keys('o')
-            human_delay('page_load')
-
-            try:
-                comment_element = driver.find_element(By.CSS_SELECTOR, "div.questao-complementos-comentario-conteudo-texto")
-                data['comentario'] = comment_element.text.strip()
-
-                comment_images = extract_images_from_element(comment_element, logger)
-                if comment_images:
-                    data['imagens_comentario'] = comment_images
-                    logger.info(f"🖼️ {len(comment_images)} imagem(ns) no comentário")
-
-                # Extrair gabarito do comentário se ainda não obtido
-                if not gabarito_obtido or data['gabarito'] is None:
-                    import re
-                    # Procurar por padrões: "Gabarito: C", "Letra C", "C ou E" etc
-                    gabarito_match = re.search(r'Gabarito:\s*(?:Letra\s*)?([A-E]|CERTO|ERRADO)', data['comentario'], re.IGNORECASE)
-                    if gabarito_match:
-                        gabarito_text = gabarito_match.group(1).upper()
-                        # Converter CERTO/ERRADO para C/E se necessário
-                        if gabarito_text == 'CERTO':
-                            data['gabarito'] = 'C'
-                        elif gabarito_text == 'ERRADO':
-                            data['gabarito'] = 'E'
-                        else:
-                            data['gabarito'] = gabarito_text
-                        gabarito_obtido = True
-                        logger.info(f"✓ Gabarito extraído do comentário: {data['gabarito']}")
-
-                # Fechar comentário (usando ESC ou botão)
-                body.send_keys(Keys.ESCAPE)
-                human_delay('click')
-            except:
-                data['comentario'] = None
-        except Exception as e:
-            logger.debug(f"Erro ao extrair comentário: {e}")
-            data['comentario'] = None
+        extract_comment_pane(driver, logger, data)
 
         # Detalhes adicionais (usando atalho de teclado "i")
-        data['detalhes'] = {}
-        try:
-            delay = human_delay('details_open')
-            logger.debug(f"Delay antes de abrir detalhes: {delay:.2f}s")
-
-            # Usar atalho "i" para abrir informações da questão (mais rápido e confiável)
-            body = driver.find_element(By.TAG_NAME, 'body')
-            body.send_keys('i')
-            human_delay('page_load')
-
-            try:
-                # Aguardar container de detalhes aparecer com NOVO seletor
-                details_container = WebDriverWait(driver, 4).until(
-                    EC.presence_of_element_located((By.CSS_SELECTOR, "div.detalhes-questao"))
-                )
-
-                detail_items = details_container.find_elements(By.CSS_SELECTOR, "div.item-detalhe")
-                logger.debug(f"🔍 Encontrados {len(detail_items)} itens de detalhe")
-
-                for item in detail_items:
-                    try:
-                        # Verificar se é item múltiplo (Ano e Banca juntos, por exemplo)
-                        if "item-detalhe-multiplo" in item.get_attribute("class"):
-                            # Buscar sub-itens dentro do item múltiplo
-                            sub_items = item.find_elements(By.XPATH, "./div")
-                            for sub_item in sub_items:
-                                try:
-                                    sub_title_elem = sub_item.find_elements(By.CSS_SELECTOR, "div.detalhe-titulo")
-                                    sub_value_elem = sub_item.find_elements(By.CSS_SELECTOR, "div.ng-binding")
-
-                                    if sub_title_elem and sub_value_elem:
-                                        sub_title = sub_title_elem[0].text.strip()
-                                        sub_value = sub_value_elem[0].text.strip()
-
-                                        if sub_title and sub_value:
-                                            # Normalizar chave
-                                            key = sub_title.lower().replace(' ', '_')
-                                            data['detalhes'][key] = sub_value
-                                            logger.debug(f"  ✓ {sub_title}: {sub_value}")
-                                except Exception as e:
-                                    logger.debug(f"  Erro ao extrair sub-item: {e}")
-                                    continue
-                        else:
-                            # Item simples
-                            title_elem = item.find_elements(By.CSS_SELECTOR, "div.detalhe-titulo")
-
-                            if title_elem:
-                                title = title_elem[0].text.strip()
-
-                                # Primeiro tentar campo composto (ex: Cargo / Área / Especialidade / Edição)
-                                value_elem = item.find_elements(By.CSS_SELECTOR, "div.detalhe-concurso-composto")
-
-                                # Se não encontrar, tentar div.ng-binding normal
-                                if not value_elem:
-                                    value_elem = item.find_elements(By.CSS_SELECTOR, "div.ng-binding")
-
-                                if value_elem:
-                                    value = value_elem[0].text.strip()
-
-                                    if title and value:
-                                        # Normalizar chave (substituir caracteres especiais)
-                                        key = title.lower().replace(' / ', '_').replace('/', '_').replace(' ', '_')
-                                        data['detalhes'][key] = value
-                                        logger.debug(f"  ✓ {title}: {value[:50]}...")
-                    except Exception as e:
-                        logger.debug(f"  Erro ao processar item de detalhe: {e}")
-                        continue
-
-                logger.info(f"✓ {len(data['detalhes'])} campos de detalhes extraídos")
-
-                # Fechar detalhes (usando ESC)
-                body.send_keys(Keys.ESCAPE)
-                human_delay('click')
-
-            except TimeoutException:
-                logger.warning("⚠️ Timeout ao aguardar detalhes da questão")
-                data['detalhes'] = {}
-            except Exception as e:
-                logger.warning(f"⚠️ Erro ao extrair detalhes: {e}")
-                data['detalhes'] = {}
-
-        except Exception as e:
-            logger.debug(f"Erro ao abrir detalhes: {e}")
-            data['detalhes'] = {}
-
-        # Contador total de imagens
-        total_images = 0
-        total_images += len(data.get('imagens_enunciado', []))
-        total_images += len(data.get('imagens_comentario', []))
-        for alt in data.get('alternativas', []):
-            total_images += len(alt.get('imagens', []))
-        
-        if total_images > 0:
-            data['total_imagens'] = total_images
-            logger.info(f"🖼️ Total de {total_images} imagem(ns) na questão")
-
-        data['extracted_at'] = datetime.now().isoformat()
+        extract_details_pane(driver, logger, data)
 
+        # Total de imagens, extracted_at e gabarito pelo comentário ficam para o pipeline (normalize/infer)
         if not data.get('id') or data['id'] == "ID não encontrado":
             logger.error("ID da questão não encontrado - dados inválidos")
             return None
@@ -1067,6 +1543,258 @@ def extract_question_data(driver, logger, quick_check=False):
     logger.info(f"✓ Questão {data.get('id', 'N/A')} extraída com sucesso")
     return data
 
+# ============================================================================
+# PIPELINE DE PÓS-PROCESSAMENTO (fora da thread da conta)
+# ============================================================================
+
+GABARITO_COMMENT_RE = re.compile(r'Gabarito:\s*(?:Letra\s*)?([A-E]|CERTO|ERRADO)', re.IGNORECASE)
+
+def infer_gabarito(data, logger):
+    """Sem gabarito na página, procura no comentário ("Gabarito: C", "Gabarito: Letra C", "Gabarito: CERTO")."""
+    if data.get('gabarito') is not None or not data.get('comentario'):
+        return
+    match = GABARITO_COMMENT_RE.search(data['comentario'])
+    if match:
+        gabarito_text = match.group(1).upper()
+        # Converter CERTO/ERRADO para C/E
+        data['gabarito'] = {'CERTO': 'C', 'ERRADO': 'E'}.get(gabarito_text, gabarito_text)
+        logger.info(f"✓ Gabarito extraído do comentário: {data['gabarito']}")
+
+def gabarito_filled(data):
+    """Gabarito na página ou inferível do comentário, sem alterar a questão (detector de deriva)."""
+    if data.get('gabarito'):
+        return True
+    return bool(data.get('comentario')) and GABARITO_COMMENT_RE.search(data['comentario']) is not None
+
+def normalize_capture(capture):
+    """Estágio normalize: total de imagens e extracted_at (horário da captura)."""
+    data = capture['data']
+    total_images = len(data.get('imagens_enunciado', [])) + len(data.get('imagens_comentario', []))
+    for alt in data.get('alternativas', []):
+        total_images += len(alt.get('imagens', []))
+    if total_images > 0:
+        data['total_imagens'] = total_images
+        capture['logger'].info(f"🖼️ Total de {total_images} imagem(ns) na questão {data['id']}")
+    data['extracted_at'] = datetime.fromtimestamp(capture['captured_at']).isoformat()
+    return capture
+
+def infer_capture(capture):
+    """Estágio infer: gabarito pelo comentário."""
+    infer_gabarito(capture['data'], capture['logger'])
+    return capture
+
+def enrich_capture(capture):
+    """Estágio enrich: taxonomia, cache de imagens, campos derivados e hashes de conteúdo."""
+    data, logger = capture['data'], capture['logger']
+    resolver = get_taxonomy_resolver(logger)
+    if resolver:
+        resolver.annotate(data)
+    images = get_image_cache()
+    if images:
+        images.annotate(data, timeout=IMAGE_CACHE_WAIT)
+    if DERIVED_FIELDS_ENABLED:
+        enrich_record(data)
+    annotate_record(data)
+    return capture
+
+def serialize_capture(capture):
+    """Estágio serialize: JSON da questão, usado na saída local e no corpo do webhook."""
+    capture['line'] = dumps_record(capture['data'])
+    return capture
+
+def deliver_capture(capture):
+    """Estágio deliver: repassa à entrega ordenada da conta."""
+    capture['delivery']['ordered'].put(capture['seq'], capture)
+
+def on_pipeline_error(capture, stage, error):
+    """Questão que falhou em um estágio: registra e libera as seguintes da mesma conta."""
+    capture['logger'].error(f"Erro no pipeline ({stage}) - questão {capture['data'].get('id')}: {error}",
+                            exc_info=error)
+    capture['delivery']['ordered'].skip(capture['seq'])
+
+def on_pipeline_thread(thread_name, stage, event):
+    """Threads do pipeline no watchdog e no profiler, como as contas (fase = estágio em andamento)."""
+    if event == 'start':
+        stall_watchdog.register(thread_name).beat(IDLE_PHASE)
+        if thread_profiler:
+            thread_profiler.register(thread_name)
+        return
+    heartbeat = stall_watchdog.get(thread_name)
+    if event == 'stop':
+        heartbeat.finish()
+        if thread_profiler:
+            thread_profiler.unregister(thread_name)
+    elif event == 'busy':
+        heartbeat.beat(stage)
+        if thread_profiler:
+            thread_profiler.checkpoint(thread_name)
+    else:
+        heartbeat.beat(IDLE_PHASE)
+
+def get_post_pipeline():
+    """Retorna o pipeline de pós-processamento do processo (criado sob demanda)."""
+    global post_pipeline
+    with post_pipeline_lock:
+        if post_pipeline is None:
+            post_pipeline = Pipeline([
+                ('normalize', normalize_capture, PIPELINE_WORKERS.get('normalize', 1)),
+                ('infer', infer_capture, PIPELINE_WORKERS.get('infer', 1)),
+                ('enrich', enrich_capture, PIPELINE_WORKERS.get('enrich', 1)),
+                ('serialize', serialize_capture, PIPELINE_WORKERS.get('serialize', 1)),
+                ('deliver', deliver_capture, PIPELINE_WORKERS.get('deliver', 1)),
+            ], PIPELINE_QUEUE_SIZE, on_error=on_pipeline_error, name='PostPipeline',
+               on_thread=on_pipeline_thread).start()
+        return post_pipeline
+
+def close_post_pipeline():
+    """Encerra o pipeline (após as contas) e imprime o tempo por estágio."""
+    global post_pipeline
+    with post_pipeline_lock:
+        pipeline, post_pipeline = post_pipeline, None
+    if pipeline is None:
+        return
+    pipeline.close()
+    print("⚙️  Pipeline de pós-processamento (por questão):")
+    for stage, timing in pipeline.stats().items():
+        print(f"   {stage:10} {timing['items']:>7} itens | ocupado {timing['busy_ms']:>8.2f} ms "
+              f"(máx {timing['max_ms']:.1f}) | fila {timing['wait_ms']:>8.2f} ms | {timing['workers']} thread(s)"
+              + (f" | {timing['errors']} erro(s)" if timing['errors'] else ''))
+
+def new_account_delivery(account_name, logger, stats, control, checkpoint, output_file, pending_batch, counters):
+    """
+    Estado de entrega de uma conta. O estágio deliver o atualiza na ordem de
+    captura (OrderedDelivery); `lock` protege o checkpoint, que a thread da conta
+    também atualiza (questões puladas).
+    """
+    delivery = {
+        'account': account_name,
+        'logger': logger,
+        'stats': stats,
+        'control': control,
+        'checkpoint': checkpoint,
+        'output_file': output_file,
+        'question_count': counters.get('question_count', 0),
+        'webhook_success': counters.get('webhook_success', 0),
+        'webhook_failed': counters.get('webhook_failed', 0),
+        'pending_batch': list(pending_batch),
+        'pending_lines': [dumps_record(r) for r in pending_batch],
+        'failed_pending': 0,
+        'lock': threading.Lock(),
+    }
+    delivery['ordered'] = OrderedDelivery(
+        lambda capture: deliver_question(capture, delivery),
+        on_error=lambda capture, e: logger.error(f"Erro ao entregar questão {capture['data'].get('id')}: {e}",
+                                                 exc_info=e),
+    )
+    return delivery
+
+def submit_capture(delivery, data, url, extract_s):
+    """Entrega a captura crua ao pipeline (bloqueia se ele estiver cheio)."""
+    get_post_pipeline().submit({
+        'data': data,
+        'url': url,
+        'captured_at': time.time(),
+        'extract_s': extract_s,
+        'logger': delivery['logger'],
+        'delivery': delivery,
+        'seq': delivery['ordered'].ticket(),
+    })
+
+def drain_deliveries(delivery, logger):
+    """Espera o pipeline entregar as capturas desta conta. Retorna False no timeout."""
+    if delivery['ordered'].wait_idle(PIPELINE_DRAIN_TIMEOUT):
+        return True
+    logger.warning(f"⚠️ {delivery['ordered'].pending()} questão(ões) ainda no pipeline após "
+                   f"{PIPELINE_DRAIN_TIMEOUT}s")
+    return False
+
+def add_pending_delivery(delivery, data, line):
+    """Questão ainda não aceita pelo webhook: lote pendente e checkpoint (o --resume reenvia)."""
+    delivery['pending_batch'].append(data)
+    delivery['pending_lines'].append(line)
+    if delivery['checkpoint']:
+        with delivery['lock']:
+            delivery['checkpoint'].add_pending(data)
+
+def send_pending_batch(delivery, batch_info):
+    """Envia o lote pendente; só com sucesso ele sai do lote e do checkpoint. Retorna True/False."""
+    batch, stats = delivery['pending_batch'], delivery['stats']
+    if not send_webhook(batch, delivery['account'], delivery['logger'], batch_info,
+                        encoded=delivery['pending_lines']):
+        # Falha conta uma vez por questão, mesmo que o lote seja tentado de novo
+        new_failures = len(batch) - delivery['failed_pending']
+        delivery['webhook_failed'] += new_failures
+        delivery['failed_pending'] = len(batch)
+        stats.add(webhook_failed=new_failures)
+        delivery['logger'].warning(f"⚠️ Lote de {len(batch)} questões não enviado - mantido como pendente")
+        return False
+    delivery['webhook_success'] += len(batch)
+    stats.add(webhook_success=len(batch))
+    delivery['pending_batch'], delivery['pending_lines'], delivery['failed_pending'] = [], [], 0
+    if delivery['checkpoint']:
+        with delivery['lock']:
+            delivery['checkpoint'].clear_pending()
+    return True
+
+def deliver_question(capture, delivery):
+    """Saída local, lista de reparos, checkpoint, webhook e contadores de uma questão (em ordem por conta)."""
+    data, line = capture['data'], capture['line']
+    name, logger = delivery['account'], delivery['logger']
+    checkpoint, stats = delivery['checkpoint'], delivery['stats']
+    question_id = data['id']
+    # Um mesmo trabalhador pode entregar várias questões seguidas (OrderedDelivery)
+    heartbeat = stall_watchdog.get(threading.current_thread().name)
+    if heartbeat:
+        heartbeat.beat('deliver')
+
+    delivery['question_count'] += 1
+    question_count = delivery['question_count']
+    write_local_record(delivery['output_file'], data, logger, line)
+    if REPAIR_AUTO_WORKLIST:
+        parts = missing_parts(data)
+        if parts:
+            append_entry(REPAIR_AUTO_WORKLIST, data, parts)
+    if checkpoint:
+        with delivery['lock']:
+            checkpoint.add_seen_id(question_id)
+
+    logger.info(f"✓ Questão {question_count} extraída em {capture['extract_s']:.1f}s - ID: {question_id}")
+    report_activity(name, f"✓ Questão {question_count}: {question_id} | {data.get('materia', 'N/A')}")
+
+    # 📤 WEBHOOK (o que não foi aceito fica pendente, no checkpoint, até um envio com sucesso)
+    if WEBHOOK_ENABLED and WEBHOOK_URL and WEBHOOK_REALTIME:
+        if send_webhook(data, name, logger, encoded=[line]):
+            delivery['webhook_success'] += 1
+            stats.add(webhook_success=1)
+        else:
+            delivery['webhook_failed'] += 1
+            stats.add(webhook_failed=1)
+            add_pending_delivery(delivery, data, line)
+            delivery['failed_pending'] += 1
+
+    stats.add(new=1)
+
+    if WEBHOOK_ENABLED and WEBHOOK_URL and not WEBHOOK_REALTIME:
+        add_pending_delivery(delivery, data, line)
+
+        # Depois de uma falha o lote continua crescendo: nova tentativa a cada WEBHOOK_BATCH_SIZE questões
+        pending = len(delivery['pending_batch'])
+        if pending >= WEBHOOK_BATCH_SIZE and pending % WEBHOOK_BATCH_SIZE == 0:
+            batch_info = {
+                "batch_number": (question_count // WEBHOOK_BATCH_SIZE),
+                "batch_size": pending
+            }
+            send_pending_batch(delivery, batch_info)
+
+    if checkpoint:
+        with delivery['lock']:
+            checkpoint.update(question_count=question_count, webhook_success=delivery['webhook_success'],
+                              webhook_failed=delivery['webhook_failed'], last_question_id=question_id,
+                              last_url=capture['url'])
+    delivery['control'].update(question_count=question_count, last_question_id=question_id,
+                               pending=len(delivery['pending_batch']))
+
+
 # ============================================================================
 # FUNÇÃO PRINCIPAL POR CONTA (Thread)
 # ============================================================================
@@ -1075,6 +1803,13 @@ def scrape_account(account, account_index):
     """Função principal que executa o scraping para uma conta específica."""
     logger, log_filename = setup_logging(account['name'])
     driver = None
+    output_file = None
+    checkpoint = None
+    delivery = None
+    control = control_plane.register(account['name'])
+    heartbeat = stall_watchdog.register(account['name'])
+    if thread_profiler:
+        thread_profiler.register(account['name'])
 
     try:
         logger.info(f"Iniciando thread para {account['name']}")
@@ -1082,16 +1817,39 @@ def scrape_account(account, account_index):
         print(f"🚀 INICIANDO {account['name'].upper()}")
         print(f"{'='*70}\n")
 
-        # Carregar IDs já extraídos via webhook
-        load_shared_ids(logger)
-        print(f"[{account['name']}] 📚 Total de {len(shared_ids)} IDs carregados (serão pulados automaticamente)")
-        
+        # A lista de IDs é carregada em segundo plano (start_id_loader) enquanto o navegador abre
         driver = setup_driver(account['name'], logger)
-        new_questions = []
-        pending_batch = []
-
-        # Inicializar estatísticas da conta
-        update_stats(account['name'])
+        mark_startup(f"{account['name']}:browser_ready")
+        instrument_driver(driver, heartbeat)
+        output_file, output_filename = open_local_output(account['name'], logger)
+
+        # Checkpoint da conta (restaura no --resume, descarta o anterior caso contrário)
+        restored = None
+        if checkpoint_store:
+            checkpoint = AccountCheckpoint(checkpoint_store, account['name'], CHECKPOINT_INTERVAL)
+            if resume_mode:
+                restored = checkpoint.restore()
+                if restored and restored['status'] != STATUS_RUNNING:
+                    logger.info("Checkpoint anterior já finalizado - iniciando do zero")
+                    restored = None
+            if restored:
+                pending_batch = list(restored['pending'])
+                logger.info(f"♻️ Checkpoint restaurado: {checkpoint.state}")
+                print(f"[{account['name']}] ♻️ Retomando: {checkpoint.state['question_count']} novas, "
+                      f"{checkpoint.state['skipped_count']} puladas, {len(pending_batch)} pendentes")
+
+                # Em tempo real não há lote: envia já o que ficou pendente
+                if pending_batch and WEBHOOK_REALTIME:
+                    if send_webhook(pending_batch, account['name'], logger):
+                        pending_batch = []
+                        checkpoint.clear_pending()
+            else:
+                checkpoint.start_fresh()
+        if not restored:
+            pending_batch = []
+
+        # Contadores da conta: esta thread soma as puladas, o estágio deliver o resto (lock por conta)
+        stats = stats_reporter.register(account['name'])
 
         # Login
         if not login(driver, account, logger):
@@ -1104,7 +1862,9 @@ def scrape_account(account, account_index):
         print(f"[{account['name']}] ⏸️  Aguardando confirmação de login...")
         
         # 🆕 AGUARDA o evento de login ao invés de input individual
+        heartbeat.beat('aguardando_login')
         login_complete_event.wait()
+        heartbeat.beat('preparando')
         
         logger.info("Login confirmado pelo usuário")
         
@@ -1118,11 +1878,31 @@ def scrape_account(account, account_index):
         print(f"\n[{account['name']}] 🔍 Aplique os FILTROS desejados nesta janela")
         print(f"[{account['name']}] ⏸️  Aguardando você pressionar ENTER no console principal...")
         
+        heartbeat.beat('aguardando_inicio')
         start_extraction_event.wait()
+        heartbeat.beat('preparando')
         
         print(f"\n[{account['name']}] 🚀 Iniciando extração!")
         logger.info("Sinal recebido - iniciando extração")
+
+        if not ids_ready_event.is_set():
+            logger.info("Aguardando a lista de IDs terminar de carregar...")
+            heartbeat.beat('aguardando_ids')
+            ids_ready_event.wait()
+            heartbeat.beat('preparando')
         
+        if repair_path:
+            run_repairs(driver, account, account_index, logger, control, heartbeat, stats, output_file)
+            if checkpoint and not control.stop_requested:
+                checkpoint.finish()
+            return
+
+        # Retomar na última questão processada, se houver checkpoint com URL
+        if restored and restored['state'].get('last_url'):
+            logger.info(f"♻️ Retomando na URL do checkpoint: {restored['state']['last_url']}")
+            driver.get(restored['state']['last_url'])
+            human_delay('page_load')
+
         # Desabilitar popups novamente antes de começar
         disable_popups(driver, logger)
         
@@ -1135,21 +1915,42 @@ def scrape_account(account, account_index):
             print(f"[{account['name']}] ⚠️ Nenhuma questão encontrada. Encerrando...")
             return
         
-        # Loop de extração
+        # Loop de extração (question_count = capturadas; as entregues ficam em `delivery`)
         question_count = 0
         skipped_count = 0
-        webhook_success = 0
-        webhook_failed = 0
+        counters = {}
+        if restored:
+            counters = checkpoint.state
+            question_count = checkpoint.state['question_count']
+            skipped_count = checkpoint.state['skipped_count']
+            stats.add(new=question_count, skipped=skipped_count,
+                      webhook_success=checkpoint.state['webhook_success'],
+                      webhook_failed=checkpoint.state['webhook_failed'])
+        delivery = new_account_delivery(account['name'], logger, stats, control, checkpoint, output_file,
+                                        pending_batch, counters)
         consecutive_errors = 0
         max_consecutive_errors = 3
+        skip_url_at = skipped_count
         start_time = time.time()
         
         logger.info("="*70)
         logger.info("INICIANDO LOOP DE EXTRAÇÃO")
         logger.info("="*70)
+        control.set_running()
         
         while True:
+            # Ponto seguro: pausa pedida pelo operador, drain ou stop
+            if not control.wait_if_paused():
+                logger.info(f"Encerrando por comando {'stop' if control.stop_requested else 'drain'}")
+                print(f"[{account['name']}] 🛑 Encerrando por comando do operador")
+                break
+
+            if thread_profiler:
+                thread_profiler.checkpoint(account['name'])
+
             try:
+                heartbeat.beat('verificando')
+
                 # 🆕 NOVA VERIFICAÇÃO: Detecta problemas reais (não mais texto "limite")
                 problem = detect_extraction_problem(driver, logger)
                 
@@ -1171,6 +1972,7 @@ def scrape_account(account, account_index):
                 question_start = time.time()
                 
                 # Verificação rápida do ID
+                heartbeat.beat('lendo_id')
                 quick_data = extract_question_data(driver, logger, quick_check=True)
                 
                 if not quick_data:
@@ -1201,17 +2003,24 @@ def scrape_account(account, account_index):
                     consecutive_errors = 0
                     question_time = time.time() - question_start
 
-                    # Atualizar estatísticas
-                    update_stats(account['name'], skipped=1)
+                    stats.add(skipped=1)
+                    if checkpoint:
+                        fields = {'skipped_count': skipped_count, 'last_question_id': question_id}
+                        # No --resume, no máximo CHECKPOINT_SKIP_URL_INTERVAL questões são puladas de novo.
+                        # Com capturas ainda no pipeline (fora do checkpoint) a URL não avança além delas
+                        if (skipped_count - skip_url_at >= CHECKPOINT_SKIP_URL_INTERVAL
+                                and delivery['ordered'].idle()):
+                            fields['last_url'] = driver.current_url
+                            skip_url_at = skipped_count
+                        with delivery['lock']:
+                            checkpoint.update(**fields)
+                    control.update(skipped_count=skipped_count, last_question_id=question_id)
 
                     logger.info(f"⏭️ Questão {question_id} JÁ EXISTE - Pulando com comportamento humano ({question_time:.2f}s)")
-                    print(f"[{account['name']}] ⏭️ PULOU: {question_id} (já existe)")
+                    report_activity(account['name'], f"⏭️ PULOU: {question_id} (já existe)")
 
-                    # Mostrar estatísticas globais a cada 50 questões puladas (todas as contas)
-                    if global_stats['total_skipped'] % 50 == 0 and global_stats['total_skipped'] > 0:
-                        print_global_stats()
-                    
                     # 🆕 USA A NOVA FUNÇÃO DE COMPORTAMENTO HUMANO
+                    heartbeat.beat('pulando')
                     if human_skip_duplicate(driver, logger, question_id):
                         continue
                     else:
@@ -1227,52 +2036,27 @@ def scrape_account(account, account_index):
                             break
                 
                 # QUESTÃO NOVA - Extração completa
+                heartbeat.beat('extraindo')
                 question_data = extract_question_data(driver, logger, quick_check=False)
                 question_time = time.time() - question_start
                 
                 if question_data:
                     question_count += 1
                     consecutive_errors = 0
+                    mark_startup(f"{account['name']}:first_extraction")
+                    if run_recorder:
+                        run_recorder.observe(account['name'], 'extract_s', question_time)
 
+                    # Só o que precisa ser imediato fica aqui: o ID entra já no conjunto
+                    # compartilhado; o resto segue para o pipeline enquanto o navegador navega
                     add_shared_id(question_id)
-                    new_questions.append(question_data)
-
-                    logger.info(f"✓ Questão {question_count} extraída em {question_time:.1f}s - ID: {question_id}")
-                    print(f"[{account['name']}] ✓ Questão {question_count}: {question_id} | {question_data.get('materia', 'N/A')}")
-
-                    # 📤 WEBHOOK
-                    webhook_sent = False
-                    if WEBHOOK_ENABLED and WEBHOOK_URL:
-                        if WEBHOOK_REALTIME:
-                            if send_webhook(question_data, account['name'], logger):
-                                webhook_success += 1
-                                webhook_sent = True
-                            else:
-                                webhook_failed += 1
-
-                    # Atualizar estatísticas
-                    update_stats(account['name'], new_questions=1,
-                                webhook_success=1 if webhook_sent else 0,
-                                webhook_failed=0 if webhook_sent else 1)
-
-                    # Mostrar estatísticas globais a cada 20 questões novas (todas as contas)
-                    if global_stats['total_new'] % 20 == 0 and global_stats['total_new'] > 0:
-                        print_global_stats()
-
-                    if not WEBHOOK_REALTIME:
-                        pending_batch.append(question_data)
-
-                        if len(pending_batch) >= WEBHOOK_BATCH_SIZE:
-                                batch_info = {
-                                    "batch_number": (question_count // WEBHOOK_BATCH_SIZE),
-                                    "batch_size": len(pending_batch)
-                                }
-                                if send_webhook(pending_batch, account['name'], logger, batch_info):
-                                    webhook_success += len(pending_batch)
-                                    pending_batch = []
-                                else:
-                                    webhook_failed += len(pending_batch)
-                                    pending_batch = []
+                    page_url = driver.current_url
+                    if DRIFT_DETECTION_ENABLED:
+                        # Antes de entregar e navegar: o snapshot é desta página e a pausa
+                        # vale já a partir desta questão
+                        check_schema_drift(driver, account['name'], question_data, logger)
+                    heartbeat.beat('pipeline')
+                    submit_capture(delivery, question_data, page_url, question_time)
 
                     if question_count % 10 == 0:
                         # 🆕 Verificação periódica de problemas (a cada 10 questões)
@@ -1294,6 +2078,7 @@ def scrape_account(account, account_index):
                     break
 
                 # Próxima questão
+                heartbeat.beat('navegando')
                 try:
                     next_button = WebDriverWait(driver, WAIT_TIMEOUT).until(
                         EC.element_to_be_clickable((By.CSS_SELECTOR, "button.questao-navegacao-botao-proxima"))
@@ -1386,20 +2171,34 @@ def scrape_account(account, account_index):
 
         # FINALIZAÇÃO
         total_time = time.time() - start_time
+        control.update(total_time=round(total_time, 1))
 
         logger.info("="*70)
         logger.info("FINALIZANDO EXTRAÇÃO")
         logger.info("="*70)
 
-        # 📤 Enviar lote pendente do webhook
-        if pending_batch and WEBHOOK_ENABLED and not WEBHOOK_REALTIME:
+        # O que ainda está no pipeline é entregue antes do lote final. Sem drain completo os
+        # trabalhadores ainda mexem no lote: ele fica no checkpoint, que não é finalizado
+        heartbeat.beat('pipeline')
+        drained = drain_deliveries(delivery, logger)
+        pending_batch = delivery['pending_batch']
+        delivered = drained
+
+        # 📤 Enviar lote pendente do webhook (no stop ele fica no checkpoint para o --resume)
+        if drained and pending_batch and WEBHOOK_ENABLED and WEBHOOK_URL and not control.stop_requested:
             print(f"\n[{account['name']}] 📤 Enviando lote final de {len(pending_batch)} questões...")
             batch_info = {
                 "batch_number": "final",
                 "batch_size": len(pending_batch)
             }
-            if send_webhook(pending_batch, account['name'], logger, batch_info):
-                webhook_success += len(pending_batch)
+            delivered = send_pending_batch(delivery, batch_info)
+            if not delivered:
+                print(f"[{account['name']}] ⚠️ Lote final não enviado: fica no checkpoint para o --resume")
+        question_count = delivery['question_count']
+        webhook_success = delivery['webhook_success']
+
+        if checkpoint and delivered and not control.stop_requested:
+            checkpoint.finish()
 
         print(f"\n{'='*70}")
         print(f"✅ {account['name'].upper()} - EXTRAÇÃO CONCLUÍDA!")
@@ -1409,6 +2208,8 @@ def scrape_account(account, account_index):
         print(f"[{account['name']}] 📤 Enviadas webhook: {webhook_success}")
         print(f"[{account['name']}] ⏱️ Tempo total: {total_time:.1f}s")
         print(f"[{account['name']}] 📋 Log: {log_filename}")
+        if output_filename:
+            print(f"[{account['name']}] 💾 Saída local: {output_filename}")
         print(f"{'='*70}\n")
 
         logger.info(f"Questões novas: {question_count}")
@@ -1420,17 +2221,33 @@ def scrape_account(account, account_index):
         logger.warning("Extração interrompida pelo usuário (Ctrl+C)")
         print(f"\n[{account['name']}] ⚠️ Extração interrompida!")
 
-        if 'pending_batch' in locals() and pending_batch:
-            send_webhook(pending_batch, account['name'], logger)
+        if delivery and drain_deliveries(delivery, logger) and delivery['pending_batch']:
+            send_pending_batch(delivery, {"batch_number": "final", "batch_size": len(delivery['pending_batch'])})
 
     except Exception as e:
         logger.critical(f"Erro fatal: {e}", exc_info=True)
         print(f"\n[{account['name']}] ✗ Erro fatal: {e}")
+        control.update(fatal_error=str(e))
 
-        if 'pending_batch' in locals() and pending_batch:
-            send_webhook(pending_batch, account['name'], logger)
+        if delivery and drain_deliveries(delivery, logger) and delivery['pending_batch']:
+            send_pending_batch(delivery, {"batch_number": "final", "batch_size": len(delivery['pending_batch'])})
     
     finally:
+        control.finish()
+        heartbeat.finish()
+        if thread_profiler:
+            thread_profiler.unregister(account['name'])
+
+        if checkpoint:
+            try:
+                with delivery['lock'] if delivery else threading.Lock():
+                    checkpoint.flush()
+            except Exception as e:
+                logger.error(f"Erro ao gravar checkpoint: {e}")
+
+        if output_file:
+            output_file.close()
+
         if driver:
             logger.info("Fechando navegador...")
             time.sleep(1)
@@ -1443,14 +2260,296 @@ def scrape_account(account, account_index):
         logger.info("="*70)
         logger.info(f"THREAD {account['name']} FINALIZADA")
         logger.info("="*70)
+        close_logging(logger)
+
+# ============================================================================
+# MODO REPARO - COMPLETA QUESTÕES JÁ EXTRAÍDAS
+# ============================================================================
+
+def send_repairs(batch, account_name, logger, stats, worklist):
+    """
+    Envia questões reparadas (mescladas) ao webhook, marcadas com mode=repair.
+    `batch` = [(questão, partes reparadas)]; só com o webhook aceitando elas vão
+    para `<lista>.done` (senão entram de novo na próxima execução).
+    """
+    records = [merged for merged, _ in batch]
+    if send_webhook(records, account_name, logger, {"mode": "repair", "batch_size": len(records)}):
+        stats.add(webhook_success=len(records))
+        for merged, fixed in batch:
+            worklist.done(merged['id'], fixed)
+        return True
+    stats.add(webhook_failed=len(records))
+    logger.warning(f"🔧 {len(records)} reparo(s) não enviados - ficam fora de .done para a próxima execução")
+    return False
+
+def run_repairs(driver, account, account_index, logger, control, heartbeat, stats, output_file):
+    """Modo --repair: percorre a fatia da lista de reparos desta conta."""
+    name = account['name']
+    worklist = RepairWorklist(repair_path, account_index, len(ACCOUNTS))
+    print(f"[{name}] 🔧 Modo reparo: {len(worklist)} questões nesta conta ({repair_path})")
+    logger.info(f"Modo reparo: {len(worklist)} questões")
+
+    repaired = failed = 0
+    pending_batch = []
+    control.set_running()
+    while control.wait_if_paused():
+        entry = worklist.next()
+        if entry is None:
+            break
+        question_start = time.time()
+        heartbeat.beat('navegando')
+        driver.get(REPAIR_QUESTION_URL.format(id=entry['id']))
+        page = extract_question_data(driver, logger, quick_check=True)
+        if not page or page.get('id') != entry['id']:
+            # Não marca como feita: entra de novo na próxima execução
+            logger.warning(f"🔧 Questão {entry['id']} não abriu (página: {page and page.get('id')})")
+            failed += 1
+            stats.add(skipped=1)
+            continue
+
+        heartbeat.beat('reparando')
+        parts = repair_question(driver, logger, entry['missing'])
+        merged, fixed = merge_repair(entry['record'], parts, entry['missing'])
+        control.update(question_count=repaired, last_question_id=entry['id'])
+        if not fixed:
+            worklist.done(entry['id'], fixed)
+            logger.warning(f"🔧 Questão {entry['id']}: {', '.join(entry['missing'])} continuam faltando")
+            failed += 1
+            stats.add(skipped=1)
+            continue
+
+        repaired += 1
+        stats.add(new=1)
+        if DERIVED_FIELDS_ENABLED:
+            enrich_record(merged, force=True)
+        annotate_record(merged)
+        write_local_record(output_file, merged, logger)
+        if run_recorder:
+            run_recorder.observe(name, 'repair_s', time.time() - question_start)
+        logger.info(f"🔧 Questão {entry['id']} reparada ({', '.join(fixed)}) em {time.time() - question_start:.1f}s")
+        report_activity(name, f"🔧 {entry['id']}: {', '.join(fixed)}")
+
+        if not (WEBHOOK_ENABLED and WEBHOOK_URL):
+            worklist.done(entry['id'], fixed)
+            continue
+        pending_batch.append((merged, fixed))
+        if WEBHOOK_REALTIME or len(pending_batch) >= WEBHOOK_BATCH_SIZE:
+            heartbeat.beat('webhook')
+            send_repairs(pending_batch, name, logger, stats, worklist)
+            pending_batch = []
+
+    if pending_batch:
+        send_repairs(pending_batch, name, logger, stats, worklist)
+    print(f"[{name}] 🔧 Reparo concluído: {repaired} reparadas, {failed} sem sucesso, "
+          f"{len(worklist)} restantes")
+
+# ============================================================================
+# MODO MULTIPROCESSO - UM PROCESSO POR CONTA
+# ============================================================================
+
+def worker_process_main(account, account_index, inbox, events, resume, restarted, options):
+    """Entrada do processo de uma conta (--processes): roda scrape_account com estado próprio."""
+    global checkpoint_store, resume_mode, shared_ids, repair_path, activity_sink
+
+    # Ctrl+C é tratado pelo supervisor, que pede stop a cada conta
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    name = account['name']
+    if CHECKPOINT_ENABLED:
+        checkpoint_store = CheckpointStore(CHECKPOINT_PATH, load_codec(ZDICT_DIR))
+    resume_mode = resume and checkpoint_store is not None
+    repair_path = options.get('repair')
+    link = WorkerLink(name, inbox, events)
+    if options.get('dashboard'):
+        # O painel roda no supervisor: console e ações desta conta seguem pela fila
+        link.redirect_console()
+        activity_sink = lambda account_name, message: link.send_activity(message)
+    dedup_index = connect_dedup_service(options['dedup']) if options.get('dedup') else None
+    if dedup_index:
+        shared_ids = dedup_index
+        ids_ready_event.set()
+    else:
+        shared_ids = SharedIdIndex(publish=link.publish_id)
+    stall_watchdog.diagnostics_dir = os.path.join(DIAGNOSTICS_DIR, name.replace(' ', '_'))
+
+    def on_snapshot(path):
+        if path:
+            shared_ids.attach_snapshot(IdSnapshot(path))
+        ids_ready_event.set()
+
+    def on_event(stage):
+        if stage == 'login':
+            login_complete_event.set()
+        elif stage == 'start' and not start_extraction_event.is_set():
+            if WATCHDOG_ENABLED:
+                stall_watchdog.start()
+            start_extraction_event.set()
+
+    # Conta reiniciada: os dois primeiros 'resume' liberam o login e o início desta conta
+    stages = ['login', 'start'] if restarted else []
+
+    def on_command(command):
+        if command == 'resume' and stages:
+            on_event(stages.pop(0))
+        else:
+            control_plane.command(name, command)
+
+    def status():
+        control = control_plane.get(name)
+        return {
+            'control': control.status() if control else {'name': name, 'state': 'starting'},
+            'counters': stats_reporter.register(name).values(),
+        }
+
+    handlers = {'event': on_event, 'cmd': on_command}
+    if not dedup_index:
+        handlers.update({'snapshot': on_snapshot, 'ids': shared_ids.merge})
+    link.start(handlers)
+    link.start_status_loop(STATS_INTERVAL, status)
+
+    scrape_account(account, account_index)
+    close_post_pipeline()
+
+    if WATCHDOG_ENABLED and start_extraction_event.is_set():
+        stall_watchdog.stop()
+    control = control_plane.get(name)
+    failed = bool(control and control.info.get('fatal_error'))
+    link.close({'fatal_error': control.info.get('fatal_error') if control else None})
+    if checkpoint_store:
+        checkpoint_store.close()
+    # Código != 0 faz o supervisor reiniciar a conta a partir do checkpoint
+    sys.exit(1 if failed else 0)
+
+def start_snapshot_publisher(supervisor):
+    """Quando a lista de IDs termina de carregar, grava o snapshot mmap e o entrega às contas."""
+    def run():
+        ids_ready_event.wait()
+        with ids_lock:
+            ids = list(shared_ids)
+        try:
+            count = write_id_snapshot(IDS_SNAPSHOT_PATH, ids)
+            supervisor.publish_snapshot(os.path.abspath(IDS_SNAPSHOT_PATH))
+            print(f"🗂️  Snapshot de {count} IDs compartilhado com as contas: {IDS_SNAPSHOT_PATH}")
+        except OSError as e:
+            print(f"⚠️  Não foi possível gravar {IDS_SNAPSHOT_PATH} ({e}) - enviando os IDs pela fila")
+            supervisor.broadcast(('ids', ids))
+            supervisor.publish_snapshot(None)
+
+    thread = threading.Thread(target=run, name="SnapshotPublisher", daemon=True)
+    thread.start()
+    return thread
 
 # ============================================================================
 # MAIN - COORDENA TODAS AS THREADS
 # ============================================================================
 
+def parse_args():
+    """Argumentos de linha de comando do scraper."""
+    parser = argparse.ArgumentParser(description="TEC Concursos Scraper - multi-contas paralelo")
+    parser.add_argument('--resume', action='store_true',
+                        help="Retoma a partir do checkpoint (contadores, lote pendente, IDs e última URL)")
+    parser.add_argument('--memory', action='store_true', default=MEMORY_TRACKING_ENABLED,
+                        help="Rastreia crescimento de memória (tracemalloc/RSS) em MEMORY_DIR")
+    parser.add_argument('--profile', choices=['sampling', 'deterministic'], default=PROFILING_MODE,
+                        help="Perfil de CPU por conta (grava em PROFILING_DIR)")
+    parser.add_argument('--processes', action='store_true', default=WORKER_PROCESSES,
+                        help="Um processo por conta, com supervisor que reinicia contas que caírem")
+    parser.add_argument('--label', help="Rótulo desta execução no histórico (ex.: 'delay menor')")
+    parser.add_argument('--repair', metavar='LISTA',
+                        help="Modo reparo: completa as questões da lista (repair_worklist.py build)")
+    parser.add_argument('--dashboard', action='store_true', default=DASHBOARD_ENABLED,
+                        help="Painel de terminal em tela cheia durante a extração")
+    parser.add_argument('--dedup', metavar='ENDERECO', default=DEDUP_SERVICE,
+                        help="Usa o serviço de deduplicação (unix:/caminho ou tcp:host:porta)")
+    return parser.parse_args()
+
+def run_config(args):
+    """Configuração registrada com a execução (mostrada no compare quando muda)."""
+    return {
+        'accounts': len(ACCOUNTS),
+        'processes': args.processes,
+        'resume': args.resume,
+        'profile': args.profile,
+        'webhook_realtime': WEBHOOK_REALTIME,
+        'webhook_batch_size': WEBHOOK_BATCH_SIZE,
+        'webhook_streaming': WEBHOOK_STREAMING,
+        'webhook_delta_mode': WEBHOOK_DELTA_MODE,
+        'image_cache': IMAGE_CACHE_ENABLED,
+        'drift_detection': DRIFT_DETECTION_ENABLED,
+        'delay_ranges': DELAY_RANGES,
+        'wait_timeout': WAIT_TIMEOUT,
+    }
+
+def start_run_recorder(args):
+    """Abre o histórico e registra a execução atual como listener do StatsReporter."""
+    global run_recorder
+    try:
+        history = RunHistory(RUN_HISTORY_PATH)
+    except Exception as e:
+        print(f"⚠️  Histórico de execuções indisponível ({e})")
+        return None
+    run_recorder = RunRecorder(history, args.label, run_config(args), RUN_HISTORY_SAMPLE_INTERVAL)
+    run_recorder.add_gauge('rss_mb', lambda: round((current_rss_bytes() or 0) / 1048576, 1))
+    run_recorder.add_gauge('paused_accounts', lambda: sum(
+        1 for w in control_plane.statuses()['workers'] if w.get('state') == 'paused'))
+    stats_reporter.add_listener(run_recorder.on_tick)
+    return run_recorder
+
+def finish_run_recorder(final_stats, interrupted):
+    """Grava o resumo da execução (por conta e total) no histórico."""
+    statuses = {w['name']: w for w in control_plane.statuses()['workers']}
+    stalls = stall_watchdog.summary() if WATCHDOG_ENABLED else {}
+    info = {
+        name: {
+            'total_time': status.get('total_time'),
+            'paused_s': status.get('total_paused_s', 0.0),
+            'stall_seconds': stalls.get(name, {}).get('stall_seconds', {}),
+        } for name, status in statuses.items()
+    }
+    try:
+        run_recorder.finish(final_stats, info, 'interrupted' if interrupted else 'finished')
+        print(f"🗃️  Execução #{run_recorder.run_id} registrada em {RUN_HISTORY_PATH} "
+              f"(python run_history.py compare)")
+    except Exception as e:
+        print(f"⚠️  Não foi possível gravar o histórico da execução: {e}")
+    run_recorder.history.close()
+
 def main():
     """Função principal que coordena a execução paralela de múltiplas contas."""
-    global global_stats
+    global checkpoint_store, resume_mode, thread_profiler, repair_path, shared_ids, activity_sink
+
+    args = parse_args()
+    if args.dashboard and not Dashboard.supported():
+        print("⚠️  --dashboard precisa de um terminal interativo - usando o console normal")
+        args.dashboard = False
+    repair_path = args.repair
+    if CHECKPOINT_ENABLED:
+        checkpoint_store = CheckpointStore(CHECKPOINT_PATH, load_codec(ZDICT_DIR))
+    resume_mode = args.resume and checkpoint_store is not None
+    if args.profile:
+        thread_profiler = ThreadProfiler(args.profile, PROFILING_DIR, PROFILING_SAMPLE_INTERVAL)
+        thread_profiler.install_signal_handler()
+        thread_profiler.start()
+
+    memory_tracker = None
+    if args.memory:
+        memory_tracker = MemoryTracker(MEMORY_INTERVAL, MEMORY_DIR)
+        memory_tracker.register_gauge('shared_ids', lambda: len(shared_ids))
+        memory_tracker.register_gauge('pending_batch_total', lambda: sum(
+            w['pending'] for w in control_plane.statuses()['workers'] if 'pending' in w))
+        memory_tracker.register_gauge('loggers', lambda: len(logging.Logger.manager.loggerDict))
+        memory_tracker.register_gauge('threads', threading.active_count)
+        memory_tracker.register_gauge('pipeline_in_flight', lambda: post_pipeline.in_flight() if post_pipeline else 0)
+        memory_tracker.start()
+        print(f"🧠 Rastreamento de memória a cada {MEMORY_INTERVAL}s: {MEMORY_DIR}/")
+
+    # Download dos IDs e preparo do chromedriver começam já, enquanto o operador lê as instruções
+    dedup_index = connect_dedup_service(args.dedup) if args.dedup else None
+    if dedup_index:
+        shared_ids = dedup_index
+        ids_ready_event.set()
+    else:
+        start_id_loader()
+    start_driver_resolver()
 
     print("\n" + "="*70)
     print("🚀 TEC CONCURSOS SCRAPER - MODO MULTI-CONTAS PARALELO")
@@ -1458,6 +2557,10 @@ def main():
     print(f"📊 Contas configuradas: {len(ACCOUNTS)}")
     print(f"🔄 Modo: {'TEMPO REAL' if WEBHOOK_REALTIME else f'LOTES DE {WEBHOOK_BATCH_SIZE}'}")
     print(f"🌐 Webhook: {'ATIVADO' if WEBHOOK_ENABLED else 'DESATIVADO'}")
+    if resume_mode:
+        print(f"♻️  Retomando do checkpoint: {CHECKPOINT_PATH}")
+    if repair_path:
+        print(f"🔧 Modo reparo: {repair_path} (só as questões e painéis que faltaram)")
     print("="*70)
 
     print(f"\n{'='*70}")
@@ -1472,21 +2575,45 @@ def main():
     print("7️⃣  Todas as contas trabalharão em PARALELO")
     print("="*70)
     
-    input("\n⏸️  Pressione ENTER para ABRIR os navegadores... ")
+    # Único leitor do console: ENTER libera a etapa atual; comandos controlam cada conta
+    control_plane.start_console()
+    if CONTROL_HTTP_ENABLED:
+        try:
+            control_plane.start_http(CONTROL_HOST, CONTROL_PORT)
+            print(f"🎛️  Controle: http://{CONTROL_HOST}:{CONTROL_PORT}/status "
+                  f"(comandos com o cabeçalho X-Control-Token: {control_plane.http_token})")
+        except OSError as e:
+            print(f"⚠️  Canal de controle HTTP indisponível ({e}) - use os comandos no console")
+
+    control_plane.wait_barrier('open', "\n⏸️  Pressione ENTER para ABRIR os navegadores... ")
+    mark_startup('open_released')
     
     threads = []
+    supervisor = None
     
     print(f"\n🚀 Abrindo {len(ACCOUNTS)} navegador(es)...\n")
     
-    for i, account in enumerate(ACCOUNTS):
-        thread = threading.Thread(
-            target=scrape_account,
-            args=(account, i),
-            name=f"Thread-{account['name']}"
+    if args.processes:
+        supervisor = ProcessSupervisor(
+            worker_process_main, ACCOUNTS, control_plane, stats_reporter, resume=resume_mode,
+            max_restarts=MAX_WORKER_RESTARTS, restart_backoff=WORKER_RESTART_BACKOFF,
+            on_new_ids=merge_shared_ids, on_activity=report_activity,
+            options={'repair': repair_path, 'dedup': dedup_index and args.dedup, 'dashboard': args.dashboard},
         )
-        threads.append(thread)
-        thread.start()
-        time.sleep(3)
+        supervisor.start(BROWSER_LAUNCH_STAGGER)
+        if not dedup_index:
+            start_snapshot_publisher(supervisor)
+        print(f"🧩 Modo multiprocesso: {len(ACCOUNTS)} processo(s) de conta")
+    else:
+        for i, account in enumerate(ACCOUNTS):
+            thread = threading.Thread(
+                target=scrape_account,
+                args=(account, i),
+                name=f"Thread-{account['name']}"
+            )
+            threads.append(thread)
+            thread.start()
+            time.sleep(BROWSER_LAUNCH_STAGGER)
     
     print(f"\n{'='*70}")
     print(f"✓ Todos os navegadores foram abertos!")
@@ -1499,14 +2626,17 @@ def main():
     print(f"⏸️  pressione ENTER para CONTINUAR")
     print(f"{'='*70}\n")
     
-    input("⏸️  [ETAPA 1/2] Pressione ENTER após FAZER LOGIN em todas as contas... ")
+    control_plane.wait_barrier('login', "⏸️  [ETAPA 1/2] Pressione ENTER após FAZER LOGIN em todas as contas... ")
     
     print(f"\n{'='*70}")
     print(f"✅ LOGIN CONFIRMADO - Liberando todas as contas para aplicar filtros...")
     print(f"{'='*70}\n")
     
     # 🆕 LIBERA todas as threads do login
-    login_complete_event.set()
+    if supervisor:
+        supervisor.broadcast_event('login')
+    else:
+        login_complete_event.set()
     
     # Pequena pausa para threads processarem
     time.sleep(2)
@@ -1517,35 +2647,89 @@ def main():
     print(f"⏸️  pressione ENTER para INICIAR a extração")
     print(f"{'='*70}\n")
     
-    input("⏸️  [ETAPA 2/2] Pressione ENTER para INICIAR a extração em todas as contas... ")
-
-    # Iniciar timer global
-    global_stats['start_time'] = time.time()
+    control_plane.wait_barrier('start', "⏸️  [ETAPA 2/2] Pressione ENTER para INICIAR a extração em todas as contas... ")
+    mark_startup('start_released')
+
+    # Iniciar timer global e o agregador de estatísticas
+    dashboard = None
+    if args.dashboard:
+        dashboard = Dashboard(control_plane, stats_reporter, DASHBOARD_REFRESH)
+        stats_reporter.add_listener(dashboard.on_stats)
+        activity_sink = dashboard.event
+    else:
+        stats_reporter.printer = print_global_stats
+    if RUN_HISTORY_ENABLED:
+        start_run_recorder(args)
+    stats_reporter.start()
+    # No modo multiprocesso cada processo de conta roda o próprio watchdog
+    if WATCHDOG_ENABLED and not supervisor:
+        stall_watchdog.start()
 
     print(f"\n🚀 Iniciando extração em todas as contas...")
     print(f"📊 Monitoramento em tempo real: Estatísticas serão exibidas periodicamente\n")
-    start_extraction_event.set()
+    if dashboard:
+        dashboard.start()
+    if supervisor:
+        supervisor.broadcast_event('start')
+    else:
+        start_extraction_event.set()
     
+    interrupted = False
     try:
+        if supervisor:
+            while not supervisor.join(1):
+                pass
         for thread in threads:
             thread.join()
     except KeyboardInterrupt:
+        interrupted = True
         print("\n\n⚠️  INTERRUPÇÃO DETECTADA (Ctrl+C)")
         print("⏳ Aguardando threads finalizarem...")
         
+        if supervisor:
+            supervisor.shutdown()
+            supervisor.join(10)
         for thread in threads:
             if thread.is_alive():
                 thread.join(timeout=10)
+
+    if dashboard:
+        activity_sink = None
+        dashboard.stop()
+    control_plane.shutdown()
+    if WATCHDOG_ENABLED and not supervisor:
+        stall_watchdog.stop()
+    if thread_profiler:
+        thread_profiler.stop()
+        print(f"🔬 Perfis de CPU ({thread_profiler.mode}): {PROFILING_DIR}/")
+    if memory_tracker:
+        memory_tracker.stop()
+        print(f"🧠 Relatório de memória: {memory_tracker.report_path}")
+    close_post_pipeline()
+    if image_cache:
+        image_cache.close()
+        print(f"🖼️  Imagens: {image_cache.stats['downloads']} baixadas, {image_cache.stats['hits']} do cache, "
+              f"{image_cache.stats['failures']} falhas → {IMAGE_CACHE_DIR}/")
     
     # Estatísticas finais
-    print_global_stats()
+    final_stats = stats_reporter.stop()
+    print_global_stats(final_stats)
+    report_startup_timings()
+    if run_recorder:
+        finish_run_recorder(final_stats, interrupted)
 
     print("\n" + "="*70)
     print("🎉 TODAS AS EXTRAÇÕES FINALIZADAS!")
     print("="*70)
     print(f"📚 Total de IDs únicos no sistema: {len(shared_ids)}")
-    print(f"🆕 Questões novas extraídas: {global_stats['total_new']}")
-    print(f"📤 Enviadas ao webhook com sucesso: {global_stats['total_webhook_success']}")
+    print(f"🆕 Questões novas extraídas: {final_stats['totals']['new']}")
+    print(f"📤 Enviadas ao webhook com sucesso: {final_stats['totals']['webhook_success']}")
+    if WATCHDOG_ENABLED:
+        for acc_name, acc_stalls in sorted(stall_watchdog.summary().items()):
+            if acc_stalls['stall_seconds']:
+                causes = ', '.join(f"{c}: {sec:.0f}s" for c, sec in acc_stalls['stall_seconds'].items())
+                print(f"🐶 [{acc_name}] Tempo parado - {causes}")
+        print(f"🐶 Diagnósticos: {DIAGNOSTICS_DIR}/")
     print("="*70)
 
 if __name__ == "__main__":
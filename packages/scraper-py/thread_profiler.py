@@ -0,0 +1,244 @@
+"""
+Perfil de CPU por conta (thread), opcional.
+
+Modos:
+- 'sampling'      -> thread amostradora lê sys._current_frames() a cada intervalo;
+                     só conta a amostra se a thread consumiu CPU desde a anterior
+                     (Linux; em outros sistemas conta tempo de parede). Baixo custo.
+- 'deterministic' -> cProfile habilitado dentro de cada thread de conta.
+
+Saídas em <out_dir>/, por conta:
+- sampling:      <conta>.collapsed (formato flamegraph.pl) e <conta>.txt (top funções)
+- deterministic: <conta>.prof (pstats) e <conta>.txt (relatório filtrado)
+
+Os relatórios .txt e as pilhas colapsadas são filtrados para o código do scraper
+(a função externa chamada por último é mantida, ex. json.encoder:encode).
+
+Dump sob demanda: SIGUSR1 (Unix) grava os perfis acumulados até o momento.
+"""
+import cProfile
+import io
+import os
+import pstats
+import re
+import signal
+import sys
+import threading
+import time
+from collections import Counter
+
+MODE_SAMPLING = 'sampling'
+MODE_DETERMINISTIC = 'deterministic'
+
+SCRAPER_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def _thread_cpu_clock(thread_id):
+    """Relógio de CPU da thread (None se a plataforma não suportar)."""
+    try:
+        return time.pthread_getcpuclockid(thread_id)
+    except (AttributeError, OSError):
+        return None
+
+
+class ThreadProfiler:
+    """Perfis de CPU separados por conta."""
+
+    def __init__(self, mode=MODE_SAMPLING, out_dir='profiles', interval=0.005, root=SCRAPER_ROOT):
+        if mode not in (MODE_SAMPLING, MODE_DETERMINISTIC):
+            raise ValueError(f"Modo de profiling desconhecido: {mode}")
+        self.mode = mode
+        self.out_dir = out_dir
+        self.interval = interval
+        self.root = root
+        self.lock = threading.Lock()
+        self.threads = {}
+        self.profiles = {}
+        self.samples = {}
+        self.cpu_clocks = {}
+        self.last_cpu = {}
+        self.dump_requested = {}
+        self.stop_event = threading.Event()
+        self.sampler = None
+        os.makedirs(out_dir, exist_ok=True)
+
+    # --- registro das contas ---------------------------------------------------
+
+    def register(self, name):
+        """Inicia o perfil da thread atual como a conta `name`."""
+        thread_id = threading.get_ident()
+        with self.lock:
+            self.threads[name] = thread_id
+            self.dump_requested[name] = False
+            if self.mode == MODE_SAMPLING:
+                self.samples[name] = Counter()
+                self.cpu_clocks[name] = _thread_cpu_clock(thread_id)
+                self.last_cpu[name] = None
+
+        if self.mode == MODE_DETERMINISTIC:
+            profile = cProfile.Profile()
+            self.profiles[name] = profile
+            profile.enable()
+
+    def unregister(self, name):
+        """Encerra o perfil da conta e grava o resultado final."""
+        if self.mode == MODE_DETERMINISTIC and name in self.profiles:
+            self.profiles[name].disable()
+        self.dump(name)
+        with self.lock:
+            self.threads.pop(name, None)
+
+    def checkpoint(self, name):
+        """Ponto seguro no loop da conta: atende um dump pedido por sinal (modo determinístico)."""
+        if self.mode != MODE_DETERMINISTIC or not self.dump_requested.get(name):
+            return
+        profile = self.profiles[name]
+        profile.disable()
+        try:
+            self.dump(name)
+        finally:
+            self.dump_requested[name] = False
+            profile.enable()
+
+    # --- dump sob demanda --------------------------------------------------------
+
+    def request_dump(self, *_):
+        """Pede o dump de todas as contas (seguro para chamar de um handler de sinal)."""
+        if self.mode == MODE_SAMPLING:
+            threading.Thread(target=self.dump_all, name="ProfilerDump", daemon=True).start()
+            return
+        for name in list(self.dump_requested):
+            self.dump_requested[name] = True
+
+    def install_signal_handler(self):
+        """Associa SIGUSR1 ao dump sob demanda (somente Unix, chamar da thread principal)."""
+        if hasattr(signal, 'SIGUSR1'):
+            signal.signal(signal.SIGUSR1, self.request_dump)
+            return True
+        return False
+
+    # --- amostragem ---------------------------------------------------------------
+
+    def start(self):
+        if self.mode == MODE_SAMPLING:
+            self.sampler = threading.Thread(target=self._sample_loop, name="ProfilerSampler", daemon=True)
+            self.sampler.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.sampler:
+            self.sampler.join(timeout=2)
+        self.dump_all()
+
+    def _frame_label(self, code):
+        filename = code.co_filename
+        module = os.path.splitext(os.path.basename(filename))[0]
+        return f"{module}:{code.co_name}"
+
+    def _is_scraper_code(self, filename):
+        return filename.startswith(self.root) and 'site-packages' not in filename
+
+    def _collapse(self, frame):
+        """Pilha colapsada filtrada: frames do scraper + o frame externo mais interno."""
+        labels = []
+        leaf_external = None
+        while frame is not None:
+            code = frame.f_code
+            if self._is_scraper_code(code.co_filename):
+                labels.append(self._frame_label(code))
+            elif not labels and leaf_external is None:
+                leaf_external = self._frame_label(code)
+            frame = frame.f_back
+        if not labels:
+            return None
+        labels.reverse()
+        if leaf_external:
+            labels.append(leaf_external)
+        return ';'.join(labels)
+
+    def _sample_loop(self):
+        while not self.stop_event.wait(self.interval):
+            frames = sys._current_frames()
+            with self.lock:
+                targets = list(self.threads.items())
+            for name, thread_id in targets:
+                frame = frames.get(thread_id)
+                if frame is None:
+                    continue
+
+                clock = self.cpu_clocks.get(name)
+                if clock is not None:
+                    try:
+                        cpu = time.clock_gettime(clock)
+                    except OSError:
+                        continue
+                    previous = self.last_cpu.get(name)
+                    self.last_cpu[name] = cpu
+                    if previous is None or cpu <= previous:
+                        continue
+
+                stack = self._collapse(frame)
+                if stack:
+                    with self.lock:
+                        self.samples[name][stack] += 1
+
+    # --- escrita -------------------------------------------------------------------
+
+    def _path(self, name, extension):
+        return os.path.join(self.out_dir, f"{name.replace(' ', '_')}{extension}")
+
+    def dump_all(self):
+        with self.lock:
+            if self.mode == MODE_SAMPLING:
+                names = list(self.samples)
+            else:
+                # Perfis de threads ainda ativas só podem ser gravados pela própria thread
+                names = [n for n in self.profiles if n not in self.threads]
+        for name in names:
+            self.dump(name)
+
+    def dump(self, name):
+        """Grava os arquivos de perfil da conta."""
+        if self.mode == MODE_SAMPLING:
+            self._dump_samples(name)
+        else:
+            self._dump_pstats(name)
+
+    def _dump_samples(self, name):
+        with self.lock:
+            samples = Counter(self.samples.get(name, {}))
+        with open(self._path(name, '.collapsed'), 'w', encoding='utf-8') as f:
+            for stack, count in samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+        self_counts = Counter()
+        total_counts = Counter()
+        for stack, count in samples.items():
+            frames = stack.split(';')
+            self_counts[frames[-1]] += count
+            for label in set(frames):
+                total_counts[label] += count
+        total = sum(samples.values()) or 1
+
+        with open(self._path(name, '.txt'), 'w', encoding='utf-8') as f:
+            f.write(f"Conta: {name} | amostras de CPU: {sum(samples.values())} "
+                    f"(intervalo {self.interval * 1000:.1f}ms)\n\n")
+            f.write(f"{'self%':>7} {'total%':>7}  função\n")
+            for label, count in self_counts.most_common(40):
+                f.write(f"{100 * count / total:6.1f}% {100 * total_counts[label] / total:6.1f}%  {label}\n")
+
+    def _dump_pstats(self, name):
+        profile = self.profiles.get(name)
+        if profile is None:
+            return
+        profile.dump_stats(self._path(name, '.prof'))
+
+        stream = io.StringIO()
+        stats = pstats.Stats(profile, stream=stream)
+        stats.sort_stats('cumulative')
+        stats.print_stats(re.escape(self.root), 60)
+        stats.sort_stats('tottime')
+        stats.print_stats(25)
+        with open(self._path(name, '.txt'), 'w', encoding='utf-8') as f:
+            f.write(f"Conta: {name}\n")
+            f.write(stream.getvalue())